@@ -7,7 +7,8 @@ find media -type d -exec chown nginx {} \;
 # Run database migrations
 # python manage.py migrate --noinput
 
-# Start gunicorn
+# Start gunicorn.  PDF exports render in the request, so keep --timeout above
+# PDF_EXPORT_QUEUE_TIMEOUT + PDF_EXPORT_TIMEOUT (see website/settings/base.py)
 gunicorn --timeout 90 --access-logfile - --workers 6 --bind unix:/tmp/scan.sock website.wsgi:application &
 
 # Start nginx
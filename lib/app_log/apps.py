@@ -1,6 +1,8 @@
 from django.apps import AppConfig
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import request_finished
+from django.db.models.signals import post_delete, post_save
 from django.utils.module_loading import import_string
 
 
@@ -19,7 +21,17 @@ class AppLogConfig(AppConfig):
         """
         Pre-loads the notifiers and stores them in the `notifiers` dict.
         """
+        from app_log.models import Subscription
+        from app_log.subscriptions import invalidate_subscription_index, subscription_index
+        from app_log.writer import flush_after_request
+
         self.load_notifiers()
+        version_stamp_path = getattr(settings, "APP_LOG", self.DEFAULT_SETTINGS).get("version_stamp")
+        if version_stamp_path:
+            subscription_index.stamp = import_string(version_stamp_path)("app_log.subscriptions")
+        post_save.connect(invalidate_subscription_index, sender=Subscription)
+        post_delete.connect(invalidate_subscription_index, sender=Subscription)
+        request_finished.connect(flush_after_request)
 
     def load_notifiers(self):
         app_log_settings = getattr(settings, "APP_LOG", self.DEFAULT_SETTINGS)
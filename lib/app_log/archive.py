@@ -0,0 +1,201 @@
+import datetime
+import gzip
+import json
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from app_log.facets import log_facets
+from app_log.models import AppLogEntry
+
+DEFAULT_RETENTION_MONTHS = 12
+DEFAULT_BATCH_SIZE = 5000
+
+ARCHIVED_FIELDS = [
+    "id",
+    "timestamp",
+    "actor_user_id",
+    "actor_name",
+    "action",
+    "message",
+    "content_type_id",
+    "object_id",
+]
+ARCHIVE_NAME_RE = re.compile(r"^app-log-(\d{4})-(\d{2})\.jsonl\.gz$")
+
+
+def month_start(year: int, month: int) -> datetime.datetime:
+    """The start of `month`, in the current time zone."""
+    return timezone.make_aware(datetime.datetime(year, month, 1))
+
+
+def next_month(year: int, month: int) -> tuple[int, int]:
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+class LogArchive:
+    """
+    Whole months of log entries, moved out of the `AppLogEntry` table into gzipped JSON lines files in
+    `APP_LOG_ARCHIVE_DIR`, one per month, e.g. `app-log-2024-01.jsonl.gz`.
+
+    Months are segments of the (timestamp, id) index rather than table partitions, so archiving a month is
+    one range scan to write its file, then deleting its rows in batches of `APP_LOG_ARCHIVE_BATCH_SIZE`,
+    each in its own short transaction, so neither blocks logging or the admin for long.  A month can be
+    restored back into the table, and archiving it again writes one file with the entries from both.
+    """
+
+    @property
+    def directory(self) -> Path:
+        return Path(settings.APP_LOG_ARCHIVE_DIR)
+
+    @property
+    def retention_months(self) -> int:
+        return getattr(settings, "APP_LOG_RETENTION_MONTHS", DEFAULT_RETENTION_MONTHS)
+
+    @property
+    def batch_size(self) -> int:
+        return getattr(settings, "APP_LOG_ARCHIVE_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+
+    def path(self, year: int, month: int) -> Path:
+        return self.directory / f"app-log-{year:04}-{month:02}.jsonl.gz"
+
+    def archives(self) -> list[tuple[int, int]]:
+        """The (year, month) of each archived month, oldest first."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            (int(match[1]), int(match[2]))
+            for match in map(ARCHIVE_NAME_RE.match, os.listdir(self.directory))
+            if match
+        )
+
+    def months_to_archive(self, retention_months: int | None = None) -> list[tuple[int, int]]:
+        """The (year, month) of each month with entries that are all older than the retention period."""
+        if retention_months is None:
+            retention_months = self.retention_months
+        now = timezone.localtime()
+        months = now.year * 12 + now.month - 1 - retention_months
+        cutoff = month_start(months // 12, months % 12 + 1)
+
+        oldest = AppLogEntry.objects.filter(timestamp__lt=cutoff).order_by("timestamp").first()
+        if oldest is None:
+            return []
+        timestamp = timezone.localtime(oldest.timestamp)
+        year, month = timestamp.year, timestamp.month
+        result = []
+        while month_start(year, month) < cutoff:
+            result.append((year, month))
+            year, month = next_month(year, month)
+        return result
+
+    def archive(self, year: int, month: int) -> int:
+        """Move the entries logged in `month` into its archive, returning how many were moved."""
+        entries = self._month(year, month)
+        # Entries logged from here on get higher ids, and are left for the next run
+        last = entries.order_by("-id").values_list("id", flat=True).first()
+        if last is None:
+            return 0
+        entries = entries.filter(id__lte=last)
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(year, month)
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as file:
+                for values in (
+                    entries.order_by("timestamp", "id")
+                    .values(*ARCHIVED_FIELDS)
+                    .iterator(chunk_size=self.batch_size)
+                ):
+                    file.write(_dumps(values))
+                # Entries restored from the existing archive and archived again are written once
+                for batch in _batches(self._read(path), self.batch_size):
+                    in_table = set(
+                        entries.filter(id__in=[values["id"] for values in batch]).values_list("id", flat=True)
+                    )
+                    for values in batch:
+                        if values["id"] not in in_table:
+                            file.write(_dumps(values))
+                file.flush()
+                os.fsync(raw.fileno())
+            os.replace(temporary_path, path)
+        finally:
+            Path(temporary_path).unlink(missing_ok=True)
+
+        deleted = 0
+        while True:
+            with transaction.atomic():
+                ids = list(entries.order_by().values_list("id", flat=True)[: self.batch_size])
+                if not ids:
+                    break
+                deleted += AppLogEntry.objects.filter(id__in=ids).delete()[0]
+        log_facets.invalidate()
+        return deleted
+
+    def read(self, year: int, month: int):
+        """The archived entries of `month`, as unsaved `AppLogEntry` instances."""
+        for values in self._read(self.path(year, month)):
+            yield AppLogEntry(**values)
+
+    def restore(self, year: int, month: int) -> int:
+        """
+        Copy the entries archived for `month` back into the table, returning how many were read.  Entries
+        still in the table are left as they are.
+        """
+        user_ids = set(get_user_model().objects.values_list("pk", flat=True))
+        content_type_ids = set(ContentType.objects.values_list("pk", flat=True))
+        restored = 0
+        for batch in _batches(self.read(year, month), self.batch_size):
+            for entry in batch:
+                # The user or content type may have been deleted since, as `on_delete=SET_NULL` would
+                if entry.actor_user_id not in user_ids:
+                    entry.actor_user_id = None
+                if entry.content_type_id not in content_type_ids:
+                    entry.content_type_id = None
+            restored += len(AppLogEntry.objects.bulk_create(batch, ignore_conflicts=True))
+        log_facets.invalidate()
+        return restored
+
+    def _month(self, year: int, month: int):
+        return AppLogEntry.objects.filter(
+            timestamp__gte=month_start(year, month), timestamp__lt=month_start(*next_month(year, month))
+        )
+
+    @staticmethod
+    def _read(path: Path):
+        try:
+            file = gzip.open(path, "rt", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with file:
+            for line in file:
+                values = json.loads(line)
+                values["timestamp"] = parse_datetime(values["timestamp"])
+                yield values
+
+
+def _dumps(values: dict) -> str:
+    # `isoformat()` keeps the timestamp's microseconds, which DjangoJSONEncoder would drop
+    return json.dumps({**values, "timestamp": values["timestamp"].isoformat()}) + "\n"
+
+
+def _batches(iterable, size: int):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+log_archive = LogArchive()
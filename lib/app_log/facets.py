@@ -0,0 +1,60 @@
+from django.core.cache import cache
+
+from app_log.models import AppLogEntry
+
+FACET_FIELDS = ["actor_name", "action", "content_type_id"]
+
+
+class LogFacets:
+    """
+    The distinct actors, actions and content types in the log, for filter and subscription choices.
+
+    Reading them from the table scans the whole log, so they're read once into the shared cache, then kept
+    up to date by `record()` as entries are written.  Two processes recording new values at the same moment
+    can lose one of them, and deleting entries leaves their values behind, so the cached facets are also
+    read again from the table every `TIMEOUT` seconds, or after `invalidate()`.
+    """
+
+    CACHE_KEY = "app_log:facets"
+    TIMEOUT = 60 * 60
+
+    def get(self) -> dict[str, list]:
+        facets = cache.get(self.CACHE_KEY)
+        if facets is None:
+            facets = {
+                field: sorted(
+                    AppLogEntry.objects.exclude(**{f"{field}__isnull": True})
+                    .order_by()
+                    .values_list(field, flat=True)
+                    .distinct(),
+                    key=_sort_key,
+                )
+                for field in FACET_FIELDS
+            }
+            cache.set(self.CACHE_KEY, facets, self.TIMEOUT)
+        return facets
+
+    def record(self, entries: list[AppLogEntry]):
+        """Add the values of newly written `entries` to the cached facets."""
+        facets = cache.get(self.CACHE_KEY)
+        if facets is None:
+            # They'll be read from the table, new entries included, when next needed
+            return
+        changed = False
+        for field in FACET_FIELDS:
+            new_values = {getattr(entry, field) for entry in entries} - {None} - set(facets[field])
+            if new_values:
+                facets[field] = sorted([*facets[field], *new_values], key=_sort_key)
+                changed = True
+        if changed:
+            cache.set(self.CACHE_KEY, facets, self.TIMEOUT)
+
+    def invalidate(self):
+        cache.delete(self.CACHE_KEY)
+
+
+def _sort_key(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+log_facets = LogFacets()
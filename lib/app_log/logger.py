@@ -4,13 +4,15 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.db import models
-from django.db.models import Q
 
-from app_log.models import AppLogEntry, Subscription
+from app_log.facets import log_facets
+from app_log.models import AppLogEntry
 from app_log.notifiers import get_notifier
+from app_log.subscriptions import subscription_index
+from app_log.writer import log_writer
 
 
-def log(actor=None, action=None, obj=None, message=None):
+def log(actor=None, action=None, obj=None, message=None, immediate=False):
     """
     Logs an action.
 
@@ -18,14 +20,19 @@ def log(actor=None, action=None, obj=None, message=None):
     :param action: The short name for the action completed, e.g. "Updated"
     :param obj: The object that the action happened to
     :param message: The full message to log
+    :param immediate: Write the entry before returning, e.g. for audit records of logins
     :type actor: User model or string
     :type action: string
     :type obj: Model instance or Model class
     :type message: string
+    :type immediate: bool
+
+    Unless `immediate`, the entry is written, and matching subscriptions notified, in a batch with other
+    entries soon after (see `app_log.writer.LogWriter`), so the returned entry may not be saved yet.
     """
     try:
-        entry = create_entry(actor=actor, action=action, obj=obj, message=message)
-        entry = notify_of_log_entry(entry)
+        entry = build_entry(actor=actor, action=action, obj=obj, message=message)
+        log_writer.add(entry, immediate=immediate)
         return entry
     except Exception as e:
         if settings.DEBUG:
@@ -42,6 +49,16 @@ def create_entry(actor=None, action=None, obj=None, message=None, **kwargs):
 
     `actor` can be either a string or a user model instance.
     """
+    entry = build_entry(actor=actor, action=action, obj=obj, message=message)
+    entry.save()
+    log_facets.record([entry])
+    return entry
+
+
+def build_entry(actor=None, action=None, obj=None, message=None):
+    """
+    Builds an unsaved log entry, see `create_entry()`.
+    """
     actor_name = None
     actor_user = None
     if isinstance(actor, str):
@@ -66,8 +83,7 @@ def create_entry(actor=None, action=None, obj=None, message=None, **kwargs):
             # obj is a class, try to wire up the content type:
             create_kwargs["content_type"] = ContentType.objects.get_for_model(obj)
 
-    entry = AppLogEntry.objects.create(**create_kwargs)
-    return entry
+    return AppLogEntry(**create_kwargs)
 
 
 def notify_of_log_entry(entry):
@@ -83,41 +99,4 @@ def get_subscriptions_for_entry(entry):
     """
     Returns a list of Subscription objects that match the given entry.
     """
-    timestamp_start_query = Q(timestamp_start__isnull=True) | Q(timestamp_start__lt=entry.timestamp)
-
-    timestamp_end_query = Q(timestamp_end__isnull=True) | Q(timestamp_end__gt=entry.timestamp)
-
-    actor_name_query = Q(actor_name__isnull=True) | Q(actor_name=entry.actor_name)
-
-    action_query = Q(action__isnull=True) | Q(action=entry.action)
-
-    content_type_query = Q(content_type__isnull=True) | Q(content_type=entry.content_type)
-
-    subscriptions = Subscription.objects.filter(
-        timestamp_start_query,
-        timestamp_end_query,
-        actor_name_query,
-        action_query,
-        content_type_query,
-    )
-
-    subscriptions = filter(make_message_keywords_filter_fn(entry.message), subscriptions)
-
-    return list(subscriptions)
-
-
-def make_message_keywords_filter_fn(message):
-    """
-    Returns a function to use with `filter()` that captures the message to
-    search in the function scope.
-    """
-
-    def filter_fn(subscription):
-        if message and subscription.message_keywords:
-            return subscription.message_keywords.lower() in message.lower()
-        elif subscription.message_keywords and not message:
-            return False
-        else:
-            return True
-
-    return filter_fn
+    return subscription_index.match(entry)
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from app_log.archive import log_archive
+
+# Held while archiving, so two runs don't archive the same month at once
+ADVISORY_LOCK_ID = 0x6170705F6C6F67
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves app log entries older than APP_LOG_RETENTION_MONTHS whole months into gzipped files in "
+        "APP_LOG_ARCHIVE_DIR, one per month.  Safe to run while the site is serving requests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--retention-months",
+            type=int,
+            default=None,
+            help="Keep this many whole months of entries, besides the current month, instead of the setting.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="List the months that would be archived without archiving them.",
+        )
+
+    def handle(self, *args, **options):
+        months = log_archive.months_to_archive(options["retention_months"])
+        if not months:
+            self.stdout.write(self.style.SUCCESS("No entries to archive."))
+            return
+        if options["dry_run"]:
+            for year, month in months:
+                self.stdout.write(f"Would archive {year:04}-{month:02} to {log_archive.path(year, month)}")
+            return
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [ADVISORY_LOCK_ID])
+            if not cursor.fetchone()[0]:
+                raise CommandError("The app log is already being archived.")
+        try:
+            for year, month in months:
+                archived = log_archive.archive(year, month)
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"Archived {archived} entries from {year:04}-{month:02} to {log_archive.path(year, month)}"
+                    )
+                )
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [ADVISORY_LOCK_ID])
@@ -4,7 +4,10 @@ from app_log.notifiers import SendEmailNotifier
 
 
 class Command(BaseCommand):
-    help = "Sends any emails queued for sending by SendEmailNotifier."
+    help = (
+        "Sends the emails queued for sending by SendEmailNotifier that are due.  Several can run at once "
+        "without sending an email twice."
+    )
 
     def handle(self, *args, **kwargs):
         notifier = SendEmailNotifier()
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.4 on 2026-10-19 17:10
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class RebuildIndexConcurrently(AddIndexConcurrently):
+    """
+    Like AddIndexConcurrently, but drops the index first, so that the migration can be run again after it
+    stopped half way: a concurrent build that fails leaves an invalid index behind.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        schema_editor.execute(
+            f"DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(self.index.name)}"
+        )
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    # The log can be large, so its indexes are built without locking out writes, one at a time outside a
+    # transaction
+    atomic = False
+
+    dependencies = [
+        ("app_log", "0003_alter_subscription_notifier_config"),
+        ("contenttypes", "0002_remove_content_type_name"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        RebuildIndexConcurrently(
+            model_name="applogentry",
+            index=models.Index(fields=["timestamp", "id"], name="app_log_entry_timestamp_idx"),
+        ),
+        RebuildIndexConcurrently(
+            model_name="applogentry",
+            index=models.Index(fields=["actor_name", "timestamp", "id"], name="app_log_entry_actor_idx"),
+        ),
+        RebuildIndexConcurrently(
+            model_name="applogentry",
+            index=models.Index(fields=["action", "timestamp", "id"], name="app_log_entry_action_idx"),
+        ),
+        RebuildIndexConcurrently(
+            model_name="applogentry",
+            index=models.Index(
+                fields=["content_type", "timestamp", "id"],
+                name="app_log_entry_content_type_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+import logging
+
+from django.db import DatabaseError, migrations
+
+# Keyword search filters with `icontains`, which PostgreSQL runs as `UPPER(column::text) LIKE UPPER(...)`,
+# so the trigram indexes are over that expression.
+TRIGRAM_INDEXES = {
+    "app_log_entry_message_trgm": "message",
+    "app_log_entry_actor_name_trgm": "actor_name",
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Create the search indexes if the pg_trgm extension is installed, or can be.  Without it the migration
+    only warns: search works, but scans the whole log.  Run it again (migrate to 0005 and back) once the
+    extension is available.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            logging.warning(
+                "The pg_trgm extension isn't available, so the app_log search indexes weren't created"
+            )
+            return
+        try:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError:
+            logging.warning(
+                "Could not create the pg_trgm extension, so the app_log search indexes weren't created",
+                exc_info=True,
+            )
+            return
+    for name, column in TRIGRAM_INDEXES.items():
+        # Dropped first, as a concurrent build that failed leaves an invalid index behind
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY {name} "
+            f"ON app_log_applogentry USING gin ((UPPER({column}::text)) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+    # The indexes are built without locking out writes, which can't run in a transaction.  Each step can be
+    # run again, so a migration that stopped half way can simply be rerun.
+    atomic = False
+
+    dependencies = [
+        ("app_log", "0005_email_retries"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -31,6 +31,14 @@ class AppLogEntry(models.Model):
         ordering = ["-timestamp"]
         verbose_name = "Log Entry"
         verbose_name_plural = "Log Entries"
+        # For paging through the log newest (or oldest) first, on its own or filtered.  Message search
+        # uses trigram indexes, created by migration 0006 when the pg_trgm extension is available.
+        indexes = [
+            models.Index(fields=["timestamp", "id"], name="app_log_entry_timestamp_idx"),
+            models.Index(fields=["actor_name", "timestamp", "id"], name="app_log_entry_actor_idx"),
+            models.Index(fields=["action", "timestamp", "id"], name="app_log_entry_action_idx"),
+            models.Index(fields=["content_type", "timestamp", "id"], name="app_log_entry_content_type_idx"),
+        ]
 
     @property
     def content_type_name(self):
@@ -54,19 +62,22 @@ class AppLogEntry(models.Model):
 
     @classmethod
     def get_content_type_choices_queryset(cls):
-        content_type_pks_used = AppLogEntry.objects.values_list("content_type", flat=True).distinct()
-        return ContentType.objects.filter(pk__in=content_type_pks_used)
+        from app_log.facets import log_facets
+
+        return ContentType.objects.filter(pk__in=log_facets.get()["content_type_id"])
 
     @classmethod
     def get_action_choices(cls):
-        choices = list(AppLogEntry.objects.order_by("action").values_list("action", flat=True).distinct())
+        from app_log.facets import log_facets
+
+        choices = log_facets.get()["action"]
         return list(zip(choices, choices))
 
     @classmethod
     def get_actor_choices(cls):
-        choices = list(
-            AppLogEntry.objects.order_by("actor_name").values_list("actor_name", flat=True).distinct()
-        )
+        from app_log.facets import log_facets
+
+        choices = log_facets.get()["actor_name"]
         return list(zip(choices, choices))
 
 
@@ -119,6 +130,9 @@ class Email(models.Model):
     to_address = models.CharField(max_length=255)
     body = models.TextField()
     body_html = models.TextField(null=True)
+    # Failed sends are retried, further apart each time, until `APP_LOG_EMAIL_MAX_ATTEMPTS` is reached
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ["created_at"]
@@ -1,10 +1,19 @@
+import datetime
+import logging
+
 from django.apps import apps
 from django.conf import settings
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
 from django.template.loader import render_to_string
+from django.utils import timezone
 
 from app_log.models import Email
 
+DEFAULT_EMAIL_BATCH_SIZE = 100
+DEFAULT_EMAIL_MAX_ATTEMPTS = 5
+DEFAULT_EMAIL_RETRY_DELAY = 60
+
 
 def get_notifier(notifier_path):
     app_config = apps.get_app_config("app_log")
@@ -55,27 +64,89 @@ class SendEmailNotifier(Notifier):
             body_html=body_html,
         )
 
+    @property
+    def batch_size(self) -> int:
+        return getattr(settings, "APP_LOG_EMAIL_BATCH_SIZE", DEFAULT_EMAIL_BATCH_SIZE)
+
+    @property
+    def max_attempts(self) -> int:
+        return getattr(settings, "APP_LOG_EMAIL_MAX_ATTEMPTS", DEFAULT_EMAIL_MAX_ATTEMPTS)
+
+    @property
+    def retry_delay(self) -> float:
+        return getattr(settings, "APP_LOG_EMAIL_RETRY_DELAY", DEFAULT_EMAIL_RETRY_DELAY)
+
     def send_emails(self):
-        emails_to_send = Email.objects.all()
+        """
+        Send the queued emails that are due, in batches of `APP_LOG_EMAIL_BATCH_SIZE` over one connection
+        to the mail server each.
+
+        A batch's rows stay locked while it's sent, and are claimed with SKIP LOCKED, so senders running at
+        the same time send different emails rather than duplicates.  Sent emails are deleted together.
+        Failed ones are retried by later runs, `APP_LOG_EMAIL_RETRY_DELAY` seconds later, doubling after
+        each failure, until they have been tried `APP_LOG_EMAIL_MAX_ATTEMPTS` times.
+        """
         results = {
             "sent": 0,
             "not_sent": 0,
         }
-        for email in emails_to_send:
-            sent_successfully = send_mail(
-                email.subject,
-                email.body,
-                settings.DEFAULT_FROM_EMAIL,
-                [email.to_address],
-                html_message=email.body_html,
-            )
-            if sent_successfully:
-                results["sent"] += 1
-                email.delete()
-            else:
-                results["not_sent"] += 1
+        while True:
+            with transaction.atomic():
+                emails = list(
+                    Email.objects.select_for_update(skip_locked=True)
+                    .filter(next_attempt_at__lte=timezone.now(), attempts__lt=self.max_attempts)
+                    .order_by("created_at")[: self.batch_size]
+                )
+                if not emails:
+                    break
+                sent, not_sent = self._send_batch(emails)
+
+                Email.objects.filter(pk__in=[email.pk for email in sent]).delete()
+                now = timezone.now()
+                for email in not_sent:
+                    email.attempts += 1
+                    email.next_attempt_at = now + datetime.timedelta(
+                        seconds=self.retry_delay * 2 ** (email.attempts - 1)
+                    )
+                Email.objects.bulk_update(not_sent, ["attempts", "next_attempt_at"])
+
+            results["sent"] += len(sent)
+            results["not_sent"] += len(not_sent)
+            if not sent:
+                # The mail server is likely unavailable, leave the rest for the next run
+                break
         return results
 
+    def _send_batch(self, emails: list[Email]) -> tuple[list[Email], list[Email]]:
+        """Send `emails` over one connection, returning the ones sent and the ones that weren't."""
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception:
+            logging.exception("Error connecting to send app_log emails")
+            return [], emails
+
+        sent, not_sent = [], []
+        try:
+            for email in emails:
+                message = EmailMultiAlternatives(
+                    email.subject,
+                    email.body,
+                    settings.DEFAULT_FROM_EMAIL,
+                    [email.to_address],
+                    connection=connection,
+                )
+                if email.body_html:
+                    message.attach_alternative(email.body_html, "text/html")
+                try:
+                    (sent if message.send() else not_sent).append(email)
+                except Exception:
+                    logging.exception("Error sending app_log email")
+                    not_sent.append(email)
+        finally:
+            connection.close()
+        return sent, not_sent
+
 
 def get_notifier_choices():
     app_config = apps.get_app_config("app_log")
@@ -0,0 +1,89 @@
+import threading
+
+from app_log.models import Subscription
+
+
+class LocalVersionStamp:
+    """A version stamp that only this process sees, see `SubscriptionIndex`."""
+
+    def __init__(self, name: str):
+        self._version = 0
+
+    def get(self) -> int:
+        return self._version
+
+    def invalidate(self):
+        self._version += 1
+
+
+class SubscriptionIndex:
+    """
+    In-memory index of the `Subscription` rows, for matching log entries without querying.
+
+    Subscriptions are grouped by the action they match (None for any action), so an entry is only checked
+    against the subscriptions for its own action and the catch-all ones.  The index is loaded under a
+    version stamp; saving or deleting a subscription sets a new stamp, and the index is reloaded the next
+    time it matches an entry.
+
+    The stamp is an instance of the class named by `settings.APP_LOG["version_stamp"]`, given a name, with
+    `get()` and `invalidate()` methods.  It defaults to `LocalVersionStamp`, which only reaches the process
+    the subscription was saved in, so projects with several processes should set one they all share.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stamp = LocalVersionStamp("app_log.subscriptions")
+        self._loaded_version = None
+        self._by_action: dict[str | None, list[tuple[int, Subscription]]] = {}
+
+    def invalidate(self):
+        self.stamp.invalidate()
+
+    def cache_clear(self):
+        """Forget the loaded index, e.g. between tests."""
+        with self._lock:
+            self._loaded_version = None
+
+    def _ensure_loaded(self) -> dict[str | None, list[tuple[int, Subscription]]]:
+        version = self.stamp.get()
+        if self._loaded_version == version:
+            return self._by_action
+        with self._lock:
+            if self._loaded_version != version:
+                by_action = {}
+                # Keep each subscription's position in the default ordering, to match in that order
+                for position, subscription in enumerate(Subscription.objects.select_related("owner")):
+                    by_action.setdefault(subscription.action, []).append((position, subscription))
+                self._by_action = by_action
+                self._loaded_version = version
+        return self._by_action
+
+    def match(self, entry) -> list[Subscription]:
+        """The subscriptions matching `entry`, see `app_log.logger.get_subscriptions_for_entry`."""
+        by_action = self._ensure_loaded()
+        candidates = by_action.get(entry.action, [])
+        if entry.action is not None:
+            candidates = sorted(candidates + by_action.get(None, []), key=lambda candidate: candidate[0])
+
+        message = entry.message.lower() if entry.message else None
+        return [
+            subscription
+            for _, subscription in candidates
+            if (subscription.timestamp_start is None or subscription.timestamp_start < entry.timestamp)
+            and (subscription.timestamp_end is None or subscription.timestamp_end > entry.timestamp)
+            and (subscription.actor_name is None or subscription.actor_name == entry.actor_name)
+            and (
+                subscription.content_type_id is None or subscription.content_type_id == entry.content_type_id
+            )
+            and (
+                not subscription.message_keywords
+                or (message is not None and subscription.message_keywords.lower() in message)
+            )
+        ]
+
+
+subscription_index = SubscriptionIndex()
+
+
+def invalidate_subscription_index(sender, **kwargs):
+    subscription_index.invalidate()
@@ -0,0 +1,149 @@
+import atexit
+import logging
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from app_log.facets import log_facets
+from app_log.models import AppLogEntry
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_FLUSH_INTERVAL = 5
+
+
+class LogWriter:
+    """
+    Writes log entries to the database in batches, off the request path.
+
+    `add()` buffers an entry and returns straight away.  A background thread writes the buffered entries
+    with one bulk insert, then notifies the subscriptions they match, every `APP_LOG_FLUSH_INTERVAL`
+    seconds, as soon as `APP_LOG_BATCH_SIZE` entries are waiting, and when a request finishes.  Entries
+    still buffered when the process exits are written by `close()`, which runs at exit.  A process killed
+    without running its exit handlers, e.g. by SIGKILL or the OOM killer, loses what's buffered: up to
+    `APP_LOG_FLUSH_INTERVAL` seconds of entries.
+
+    The background thread writes on a database connection of its own, so `add()` only buffers an entry
+    once the caller's transaction commits: an entry logged in a transaction that's rolled back is never
+    written, and one that refers to rows written in the transaction is written after they are.
+
+    Entries added with `immediate=True`, e.g. audit records of logins, are written (and their
+    subscriptions notified) as they are added, in the caller's transaction, as is every entry with
+    `APP_LOG_FLUSH_INTERVAL = 0`, e.g. for tests.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: list[AppLogEntry] = []
+        self._wake = threading.Event()
+        self._closing = False
+        self._thread = None
+
+    @property
+    def batch_size(self) -> int:
+        return getattr(settings, "APP_LOG_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+
+    @property
+    def flush_interval(self) -> float:
+        return getattr(settings, "APP_LOG_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL)
+
+    def add(self, entry: AppLogEntry, immediate: bool = False):
+        if immediate or not self.flush_interval:
+            entry.save()
+            log_facets.record([entry])
+            _notify(entry)
+            return
+        transaction.on_commit(partial(self._buffer, entry))
+
+    def _buffer(self, entry: AppLogEntry):
+        with self._lock:
+            if self._closing:
+                pending = None
+            else:
+                self._pending.append(entry)
+                pending = len(self._pending)
+                self._start()
+        if pending is None:
+            # Logged while shutting down, after the last flush
+            self._write([entry])
+        elif pending >= self.batch_size:
+            self._wake.set()
+
+    def wake(self):
+        """Have the background thread write the buffered entries now."""
+        if self._pending:
+            self._wake.set()
+
+    def flush(self):
+        """Write the buffered entries in this thread."""
+        with self._lock:
+            entries, self._pending = self._pending, []
+        if entries:
+            self._write(entries)
+
+    def close(self):
+        """Stop the background thread and write any entries still buffered."""
+        with self._lock:
+            self._closing = True
+            thread = self._thread
+        if thread is not None:
+            self._wake.set()
+            thread.join()
+        self.flush()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="app-log-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        while not self._closing:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._closing:
+                # `close()` writes what's left
+                break
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logging.exception("Error writing app_log entries")
+            finally:
+                close_old_connections()
+
+    def _write(self, entries: list[AppLogEntry]):
+        try:
+            AppLogEntry.objects.bulk_create(entries)
+        except Exception:
+            # Save the entries one at a time, so one bad entry doesn't lose the rest of the batch
+            saved = []
+            for entry in entries:
+                try:
+                    entry.save()
+                    saved.append(entry)
+                except Exception:
+                    logging.exception("Error creating app_log entry")
+            entries = saved
+
+        log_facets.record(entries)
+        for entry in entries:
+            try:
+                _notify(entry)
+            except Exception:
+                logging.exception("Error notifying subscriptions of app_log entry")
+
+
+def _notify(entry: AppLogEntry):
+    # Imported here, as app_log.logger imports this module
+    from app_log.logger import notify_of_log_entry
+
+    notify_of_log_entry(entry)
+
+
+log_writer = LogWriter()
+
+
+def flush_after_request(sender, **kwargs):
+    log_writer.wake()
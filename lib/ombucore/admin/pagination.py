@@ -0,0 +1,122 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class CursorPage:
+    def __init__(self, object_list, has_previous, has_next, previous_cursor, next_cursor):
+        self.object_list = object_list
+        self._has_previous = has_previous
+        self._has_next = has_next
+        self.previous_cursor = previous_cursor
+        self.next_cursor = next_cursor
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class CursorPaginator:
+    """
+    Pages through a queryset by seeking from the sort key of the row at the edge of the last page seen,
+    instead of counting every row and OFFSET scanning up to the page.  The cost of a page doesn't grow
+    with how far into the list it is, but pages have no numbers and there is no total count: a page links
+    to the previous and next pages with opaque cursors.
+
+    The queryset's ordering (or the model's default ordering) is made total by adding the primary key.
+    The ordering fields must be concrete, non-null fields on the model, so an index over them serves each
+    page with one range scan.
+    """
+
+    def __init__(self, object_list, per_page):
+        model = object_list.model
+        pk_name = model._meta.pk.name
+        ordering = [
+            field.replace("pk", pk_name) if field.removeprefix("-") == "pk" else field
+            for field in object_list.query.order_by or model._meta.ordering
+        ]
+        if not any(field.removeprefix("-") == pk_name for field in ordering):
+            descending = bool(ordering) and ordering[0].startswith("-")
+            ordering.append(f"-{pk_name}" if descending else pk_name)
+        self.object_list = object_list.order_by(*ordering)
+        self.per_page = per_page
+        self.ordering = ordering
+        self._fields = [model._meta.get_field(field.removeprefix("-")) for field in ordering]
+
+    def page(self, cursor: str | None) -> CursorPage:
+        direction, key = self._decode(cursor)
+        if key is None:
+            rows = list(self.object_list[: self.per_page + 1])
+            has_previous, has_next = False, len(rows) > self.per_page
+            rows = rows[: self.per_page]
+        elif direction == "n":
+            rows = list(self.object_list.filter(self._beyond(key, self.ordering))[: self.per_page + 1])
+            has_previous, has_next = True, len(rows) > self.per_page
+            rows = rows[: self.per_page]
+        else:
+            reversed_ordering = [self._reverse(field) for field in self.ordering]
+            rows = list(
+                self.object_list.order_by(*reversed_ordering).filter(self._beyond(key, reversed_ordering))[
+                    : self.per_page + 1
+                ]
+            )
+            has_previous, has_next = len(rows) > self.per_page, True
+            rows = rows[: self.per_page][::-1]
+
+        return CursorPage(
+            rows,
+            has_previous=has_previous,
+            has_next=has_next,
+            previous_cursor=self._encode("p", rows[0]) if has_previous and rows else None,
+            next_cursor=self._encode("n", rows[-1]) if has_next and rows else None,
+        )
+
+    def _beyond(self, key: list, ordering: list[str]) -> Q:
+        """
+        Rows after `key` in `ordering`: after it on some field and equal on every field before that.  The
+        first field's bound is repeated on its own so the database can use it as an index range.
+        """
+        condition = Q()
+        equal_so_far = Q()
+        for field, value in zip(ordering, key):
+            name = field.removeprefix("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            condition |= equal_so_far & Q(**{f"{name}__{lookup}": value})
+            equal_so_far &= Q(**{name: value})
+        first = ordering[0]
+        bound = Q(**{f"{first.removeprefix('-')}__{'lte' if first.startswith('-') else 'gte'}": key[0]})
+        return bound & condition
+
+    @staticmethod
+    def _reverse(field: str) -> str:
+        return field.removeprefix("-") if field.startswith("-") else f"-{field}"
+
+    def _encode(self, direction: str, obj) -> str:
+        # `value_to_string` keeps the full precision, e.g. a timestamp's microseconds
+        key = [field.value_to_string(obj) for field in self._fields]
+        return direction + base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+    def _decode(self, cursor: str | None) -> tuple[str | None, list | None]:
+        """The direction and key of `cursor`, or (None, None) for the first page, e.g. when it's invalid."""
+        if not cursor or cursor[0] not in "np":
+            return None, None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor[1:].encode()))
+            if len(values) != len(self._fields):
+                return None, None
+            return cursor[0], [field.to_python(value) for field, value in zip(self._fields, values)]
+        except (ValueError, TypeError, ValidationError):
+            return None, None
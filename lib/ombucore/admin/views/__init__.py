@@ -6,7 +6,7 @@ from ombucore.admin.views.base import FormView
 from ombucore.admin.views.base import NestedReorderView
 from ombucore.admin.views.base import PreviewView
 from ombucore.admin.views.base import ReorderView
-from ombucore.admin.views.mixins import ChangelistSelectViewMixin
+from ombucore.admin.views.mixins import ChangelistSelectViewMixin, CursorPaginationMixin
 from ombucore.admin.views.mixins import FilterMixin, ModelFormMixin, PanelUIMixin
 
 __all__ = [
@@ -14,6 +14,7 @@ __all__ = [
     "ChangelistSelectViewMixin",
     "ChangelistView",
     "ChangeView",
+    "CursorPaginationMixin",
     "DeleteView",
     "FilterMixin",
     "FormView",
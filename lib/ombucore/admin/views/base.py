@@ -33,6 +33,7 @@ class ChangelistView(FilterMixin, PanelUIMixin, filters_views.FilterView):
     template_name = "filter-list/filter-list.html"
     form_template_name = "filter-list/_form.html"
     list_template_name = "filter-list/_table.html"
+    pagination_template_name = "_pagination.html"
     paginate_by = 20
     title = None
     supertitle = "Manage"
@@ -6,6 +6,7 @@ from django.views.generic.edit import BaseUpdateView
 from django_filters import views as filters_views
 
 from ombucore.admin.actionlink import ActionLink
+from ombucore.admin.pagination import CursorPaginator
 from ombucore.admin.sites import site
 
 
@@ -74,13 +75,28 @@ class FilterMixin(filters_views.FilterMixin):
 
     def get_filterset_kwargs(self, filterset_class):
         kwargs = super().get_filterset_kwargs(filterset_class)
-        if kwargs["data"] is not None and "page" in kwargs["data"]:
+        if kwargs["data"] is not None and ("page" in kwargs["data"] or "cursor" in kwargs["data"]):
             data = kwargs["data"].copy()
-            del data["page"]
+            data.pop("page", None)
+            data.pop("cursor", None)
             kwargs["data"] = data
         return kwargs
 
 
+class CursorPaginationMixin:
+    """
+    Paginates a ChangelistView with a CursorPaginator, for long lists where counting the rows and
+    OFFSET scanning to a page gets slow.  Pages link to each other with `?cursor=` and show no total.
+    """
+
+    pagination_template_name = "_cursor-pagination.html"
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(queryset, page_size)
+        page = paginator.page(self.request.GET.get("cursor"))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
 class MultipleSubmitButtonsMixin:
     """
     A mixin that lets the form submit with multiple buttons. If a button has
@@ -1,4 +1,5 @@
 from django import forms
+from django.contrib.contenttypes.models import ContentType
 
 from app_log.models import AppLogEntry
 from app_log.notifiers import get_notifier_choices
@@ -25,13 +26,14 @@ class SubscriptionForm(ModelFormBase):
     )
     content_type = forms.ModelChoiceField(
         label="Object",
-        queryset=AppLogEntry.get_content_type_choices_queryset(),
+        queryset=ContentType.objects.none(),
         required=False,
     )
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        self.fields["content_type"].queryset = AppLogEntry.get_content_type_choices_queryset()
         self.fields["actor_name"].widget.choices = [(None, "(Any)")] + AppLogEntry.get_actor_choices()
         self.fields["action"].widget.choices = [(None, "(Any)")] + AppLogEntry.get_action_choices()
         self.fields["content_type"].widget.choices = [(None, "(Any)")] + AppLogEntry.get_action_choices()
@@ -14,7 +14,7 @@ from ombucore.admin.actionlink import ActionLink
 from ombucore.admin.buttons import CancelButton, SubmitButton
 from ombucore.admin.filterset import FilterSet
 from ombucore.admin.modeladmin.base import ModelAdmin
-from ombucore.admin.views import AddView, ChangeView, ChangelistView
+from ombucore.admin.views import AddView, ChangeView, ChangelistView, CursorPaginationMixin
 from ombucore.admin.widgets import FlatpickrDateTimeWidget
 from ombucore.app_log_admin.forms import SubscriptionForm
 
@@ -25,22 +25,24 @@ class AppLogEntryFilterSet(FilterSet):
     def keyword_search(self, queryset, name, value):
         return queryset.filter(Q(message__icontains=value) | Q(actor_name__icontains=value))
 
-    actor_name = django_filters.AllValuesFilter(
+    actor_name = django_filters.ChoiceFilter(
         label="Actor",
         field_name="actor_name",
         lookup_expr="exact",
+        choices=AppLogEntry.get_actor_choices,
         widget=forms.Select,
     )
-    action = django_filters.AllValuesFilter(
+    action = django_filters.ChoiceFilter(
         label="Action",
         field_name="action",
         lookup_expr="exact",
+        choices=AppLogEntry.get_action_choices,
         widget=forms.Select,
     )
     content_type = django_filters.ModelChoiceFilter(
         label="Object",
         field_name="content_type",
-        queryset=AppLogEntry.get_content_type_choices_queryset(),
+        queryset=lambda request: AppLogEntry.get_content_type_choices_queryset(),
         widget=forms.Select,
     )
     timestamp_start = django_filters.DateTimeFilter(
@@ -83,7 +85,7 @@ class AppLogEntryFilterSet(FilterSet):
         ]
 
 
-class AppLogEntryChangelistView(ChangelistView):
+class AppLogEntryChangelistView(CursorPaginationMixin, ChangelistView):
     paginate_by = 80
 
     def get_panel_action_links(self):
@@ -127,6 +129,7 @@ class AppLogEntryChangelistView(ChangelistView):
         picks it up.
         """
         query = self.request.GET.dict()
+        query.pop("cursor", None)
         if "search" in query:
             query["message_keywords"] = query["search"]
             del query["search"]
@@ -193,7 +196,7 @@ class SubscriptionFilterSet(FilterSet):
     content_type = django_filters.ModelChoiceFilter(
         label="Object",
         field_name="content_type",
-        queryset=AppLogEntry.get_content_type_choices_queryset(),
+        queryset=lambda request: AppLogEntry.get_content_type_choices_queryset(),
         widget=forms.Select,
     )
     action = django_filters.ChoiceFilter(
@@ -243,6 +243,11 @@ class AdminCentralView(LoginRequiredMixin, AdminCentralBaseView):
                                 "url": reverse("send-notification-subscriptions"),
                                 "perm": "app_log.change_subscription",
                             },
+                            {
+                                "title": _("Restore archived entries"),
+                                "url": reverse("restore-app-log-archive"),
+                                "perm": "app_log.add_applogentry",
+                            },
                         ],
                     },
                     {
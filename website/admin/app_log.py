@@ -1,9 +1,11 @@
 from django.contrib.auth import get_user_model
+from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.core.management import call_command
-from django.forms import Form
+from django.forms import ChoiceField, Form
 from django.urls import reverse
 from django.utils.html import format_html
 
+from app_log.archive import log_archive
 from app_log.models import AppLogEntry, Subscription
 from ombucore.admin.sites import site
 from ombucore.admin.views import FormView
@@ -106,3 +108,29 @@ class SendPendingNotificationsView(FormView):
         response = super().form_valid(form)
         call_command("app_log__send_emails")
         return response
+
+
+class RestoreAppLogArchiveForm(Form):
+    month = ChoiceField(
+        help_text="The month's entries are shown in the log again until the archive command next runs.",
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["month"].choices = [
+            (f"{year:04}-{month:02}", f"{year:04}-{month:02}")
+            for year, month in reversed(log_archive.archives())
+        ]
+
+
+class RestoreAppLogArchiveView(PermissionRequiredMixin, FormView):
+    supertitle = "Application Log"
+    title = "Restore archived entries"
+    form_class = RestoreAppLogArchiveForm
+    permission_required = "app_log.add_applogentry"
+
+    def form_valid(self, form):
+        year, month = map(int, form.cleaned_data["month"].split("-"))
+        restored = log_archive.restore(year, month)
+        self.success_message = f"Restored {restored} entries from {form.cleaned_data['month']}."
+        return super().form_valid(form)
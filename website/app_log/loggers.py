@@ -356,12 +356,12 @@ def log_asset_tag_deleted(asset_tag, user=None):
 
 
 def log_user_made_active(active_user, user=None):
-    log(user, "Made active", active_user, f"{active_user} was marked as active.")
+    log(user, "Made active", active_user, f"{active_user} was marked as active.", immediate=True)
 
 
 def log_user_made_inactive(active_user, user=None):
-    log(user, "Made active", active_user, f"{active_user} was marked as inactive.")
+    log(user, "Made active", active_user, f"{active_user} was marked as inactive.", immediate=True)
 
 
 def log_user_password_reset(user):
-    log(user, "Password reset", user, f"Password reset for user {user}.")
+    log(user, "Password reset", user, f"Password reset for user {user}.", immediate=True)
@@ -16,13 +16,13 @@ def get_username(user):
 @receiver(user_logged_in)
 def user_logged_in_callback(sender, **kwargs):
     user = kwargs.get("user")
-    log("System", "Logged In", user, f"{get_username(user)} logged in.")
+    log("System", "Logged In", user, f"{get_username(user)} logged in.", immediate=True)
 
 
 @receiver(user_logged_out)
 def user_logged_out_callback(sender, **kwargs):
     user = kwargs.get("user")
-    log("System", "Logged Out", user, f"{get_username(user)} logged out.")
+    log("System", "Logged Out", user, f"{get_username(user)} logged out.", immediate=True)
 
 
 @receiver(user_login_failed)
@@ -30,4 +30,4 @@ def user_login_failed_callback(sender, **kwargs):
     sanitized_credentials = kwargs.get("credentials")
     credentials_string = str(sanitized_credentials)
     User = get_user_model()
-    log("System", "Login Failed", User, f"Login failed for {credentials_string}.")
+    log("System", "Login Failed", User, f"Login failed for {credentials_string}.", immediate=True)
@@ -2,5 +2,6 @@ from . import _debug_cursor
 from ._betterdb import bulk_delete, delete, scalar, select_all
 from .bulk_insert import BulkInserter, bulk_insert, manual_sequence_lock
 from .bulk_update_dicts import bulk_update_dicts
+from .bulk_upsert import bulk_upsert, bulk_upsert_dicts
 from .repr_mixin import ReprMixin
 from .transactions import Rollback, is_in_transaction, transaction
@@ -86,8 +86,11 @@ def build_upsert_sql(
     if keys_to_set:
         update_cols = format_identifiers(cursor, keys_to_set)
         excluded_cols = format_identifiers(cursor, keys_to_set, qualifier="EXCLUDED")
+        # Postgres only accepts the parenthesized column list form for more than one column
+        if len(keys_to_set) > 1:
+            update_cols, excluded_cols = f"({update_cols})", f"({excluded_cols})"
         # Security Note (07/16/2025) [B608]: No portion of the raw SQL string is user-provided
-        q += f"DO UPDATE SET ({update_cols}) = ({excluded_cols})"  # nosec: B608
+        q += f"DO UPDATE SET {update_cols} = {excluded_cols}"  # nosec: B608
     else:
         q += "DO NOTHING"
     q = q.strip().replace("\n", " ")
@@ -5,6 +5,7 @@ from itertools import islice
 from typing import Any, ContextManager
 
 import psycopg
+from django.db.transaction import atomic
 from psycopg.adapt import Dumper
 from psycopg.sql import Composable, Composed, Identifier, SQL
 
@@ -37,6 +38,8 @@ class Connection:
 
 
 class DjangoConnection(Connection):
+    alias: str
+
     class features:
         empty_fetchmany_value: Any
 
@@ -50,8 +53,11 @@ TServerSideCursorProvider = DjangoConnection
 def new_server_side_cursor(
     con: TServerSideCursorProvider,
 ) -> ContextManager[tuple[Cursor, Any]]:
-    # Creating named cursors from psycopg Connection objects is not implemented
-    with con.chunked_cursor() as cursor:
+    # Creating named cursors from psycopg Connection objects is not implemented.
+    # Outside a transaction Django declares the cursor WITH HOLD, which keeps it (and its result set) open
+    # on the server until it's closed, even once the connection has gone back to the pool.  In a
+    # transaction it's declared WITHOUT HOLD, so it ends with the transaction at the latest.
+    with atomic(using=con.alias), con.chunked_cursor() as cursor:
         yield cursor, con.features.empty_fetchmany_value
 
 
@@ -1,3 +1,4 @@
+import threading
 from contextlib import ContextDecorator
 
 import django.db.transaction
@@ -9,23 +10,36 @@ def is_in_transaction(connection=None):
 
 
 class transaction(ContextDecorator):
-    _xact = None
+    """
+    An atomic block on the `using` database, which joins the transaction already open on it (unless
+    `savepoint` is set) rather than nesting a savepoint.
 
-    def __init__(self, reraise_rollback=True, on_rollback=None, savepoint=False):
+    Each block is entered and exited on the same thread's connection, which stays checked out of the pool
+    until the outermost block exits, so a decorated function may be called from several threads at once.
+    """
+
+    def __init__(self, reraise_rollback=True, on_rollback=None, savepoint=False, using=None):
         self.reraise_rollback = reraise_rollback
         self.on_rollback = on_rollback
         self.savepoint = savepoint
+        self.using = using
+        self._local = threading.local()
         super().__init__()
 
     def __enter__(self):
-        if is_in_transaction() and not self.savepoint:
+        # A stack, as a decorated function may call itself
+        stack = self._local.__dict__.setdefault("xacts", [])
+        if is_in_transaction(django.db.transaction.get_connection(self.using)) and not self.savepoint:
+            stack.append(None)
             return
-        self._xact = django.db.transaction.atomic()
-        self._xact.__enter__()
+        xact = django.db.transaction.atomic(using=self.using)
+        stack.append(xact)
+        xact.__enter__()
 
     def __exit__(self, *ex):
-        if self._xact:
-            self._xact.__exit__(*ex)
+        xact = self._local.xacts.pop()
+        if xact:
+            xact.__exit__(*ex)
         if ex and ex[0] == Rollback:
             if self.on_rollback:
                 self.on_rollback()
@@ -1,18 +1,22 @@
 from django.conf import settings
+from django.utils.functional import SimpleLazyObject
 
 from website.currency import currency_code, currency_name, currency_symbol
-from website.models import AccountCodeDescription, Settings
+from website.models import Settings
+from website.models.account_code_description import account_code_index
 
 
 def account_code_descriptions(request):
     return {
-        "account_code_descriptions": AccountCodeDescription.as_map(),
+        # Loaded when a template first reads it, as only a few pages do
+        "account_code_descriptions": SimpleLazyObject(account_code_index.as_map),
     }
 
 
 def dioptra_settings(request):
     return {
-        "dioptra_settings": Settings.objects.first(),
+        # Queried when a template first reads it, as only a few pages do
+        "dioptra_settings": SimpleLazyObject(Settings.objects.first),
         "currency_config": {
             "symbol": currency_symbol(),
             "code": currency_code(),
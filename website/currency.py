@@ -1,6 +1,21 @@
 from __future__ import annotations
 
-from babel.numbers import get_currency_name, get_currency_symbol
+import decimal
+from functools import lru_cache
+
+from babel import Locale
+from babel.numbers import (
+    format_currency as babel_format_currency,
+    get_currency_name,
+    get_currency_precision,
+    get_currency_symbol,
+    get_decimal_quantum,
+    get_decimal_symbol,
+    get_group_symbol,
+    get_infinity_symbol,
+    parse_pattern,
+    UnknownCurrencyFormatError,
+)
 from django.conf import settings
 
 from website.models import Analysis
@@ -47,3 +62,178 @@ def get_currency_locale(currency_code: str = "en_US") -> str:
     """
 
     return "en_US"
+
+
+class CompiledCurrencyFormat:
+    """
+    A Babel currency format with the locale, pattern, symbol and precision lookups done once.
+
+    Calling it renders a number exactly like `babel.numbers.format_currency` with the same arguments.
+    Patterns the fast path doesn't cover (scientific, significant digits, currency names, quoted
+    text, no decimal quantization) are handed to Babel as is.
+    """
+
+    def __init__(
+        self,
+        currency: str,
+        locale: str,
+        format: str | None = None,
+        currency_digits: bool = True,
+        format_type: str = "standard",
+        decimal_quantization: bool = True,
+        group_separator: bool = True,
+    ):
+        self.currency = currency
+        self.locale = Locale.parse(locale)
+        self.format = format
+        self.currency_digits = currency_digits
+        self.format_type = format_type
+        self.decimal_quantization = decimal_quantization
+        self.group_separator = group_separator
+
+        if format_type == "name":
+            self.pattern = None
+            self.is_compiled = False
+            return
+        if format:
+            self.pattern = parse_pattern(format)
+        else:
+            try:
+                self.pattern = self.locale.currency_formats[format_type]
+            except KeyError:
+                raise UnknownCurrencyFormatError(
+                    f"{format_type!r} is not a known currency format type"
+                ) from None
+
+        pattern = self.pattern
+        affixes = "".join(pattern.prefix + pattern.suffix)
+        self.is_compiled = (
+            decimal_quantization
+            and not pattern.exp_prec
+            and "@" not in pattern.pattern
+            and pattern.number_pattern != ""
+            and "¤¤¤" not in affixes
+            and "'" not in affixes
+        )
+        if not self.is_compiled:
+            return
+
+        if currency and currency_digits:
+            self._frac_prec = (get_currency_precision(currency),) * 2
+        else:
+            self._frac_prec = pattern.frac_prec
+        self._quantum = get_decimal_quantum(self._frac_prec[1])
+        self._group_symbol = get_group_symbol(self.locale)
+        self._decimal_symbol = get_decimal_symbol(self.locale)
+        self._infinity_symbol = get_infinity_symbol(self.locale)
+        self._affixes = [
+            (self._substitute_currency(pattern.prefix[i]), self._substitute_currency(pattern.suffix[i]))
+            for i in (0, 1)
+        ]
+
+    def _substitute_currency(self, affix: str) -> str:
+        if "¤" not in affix or self.currency is None:
+            return affix
+        affix = affix.replace("¤¤", self.currency.upper())
+        return affix.replace("¤", get_currency_symbol(self.currency, self.locale))
+
+    def __call__(self, number) -> str:
+        if not self.is_compiled:
+            return babel_format_currency(
+                number,
+                self.currency,
+                format=self.format,
+                locale=self.locale,
+                currency_digits=self.currency_digits,
+                format_type=self.format_type,
+                decimal_quantization=self.decimal_quantization,
+                group_separator=self.group_separator,
+            )
+
+        # The same steps as babel.numbers.NumberPattern.apply for a plain number pattern
+        value = number if isinstance(number, decimal.Decimal) else decimal.Decimal(str(number))
+        if self.pattern.scale:
+            value = value.scaleb(self.pattern.scale)
+        is_negative = int(value.is_signed())
+        value = abs(value).normalize()
+
+        if value.is_infinite():
+            rendered = self._infinity_symbol
+        else:
+            integer_part, _, fraction_part = f"{value.quantize(self._quantum):f}".partition(".")
+            if self.group_separator:
+                integer_part = self._format_int(integer_part)
+            rendered = integer_part + self._format_frac(fraction_part or "0")
+
+        prefix, suffix = self._affixes[is_negative]
+        return prefix + rendered + suffix
+
+    def _format_int(self, value: str) -> str:
+        min_digits = self.pattern.int_prec[0]
+        if len(value) < min_digits:
+            value = "0" * (min_digits - len(value)) + value
+        group_size = self.pattern.grouping[0]
+        grouped = ""
+        while len(value) > group_size:
+            grouped = self._group_symbol + value[-group_size:] + grouped
+            value = value[:-group_size]
+            group_size = self.pattern.grouping[1]
+        return value + grouped
+
+    def _format_frac(self, value: str) -> str:
+        min_digits, max_digits = self._frac_prec
+        if len(value) < min_digits:
+            value += "0" * (min_digits - len(value))
+        if max_digits == 0 or (min_digits == 0 and int(value) == 0):
+            return ""
+        while len(value) > min_digits and value[-1] == "0":
+            value = value[:-1]
+        return self._decimal_symbol + value
+
+
+@lru_cache(maxsize=256)
+def currency_formatter(
+    currency: str,
+    locale: str | None = None,
+    format: str | None = None,
+    currency_digits: bool = True,
+    format_type: str = "standard",
+    decimal_quantization: bool = True,
+    group_separator: bool = True,
+) -> CompiledCurrencyFormat:
+    return CompiledCurrencyFormat(
+        currency,
+        locale or get_currency_locale(currency),
+        format=format,
+        currency_digits=currency_digits,
+        format_type=format_type,
+        decimal_quantization=decimal_quantization,
+        group_separator=group_separator,
+    )
+
+
+def format_currency(
+    number,
+    currency: str,
+    format: str | None = None,
+    locale: str | None = None,
+    currency_digits: bool = True,
+    format_type: str = "standard",
+    decimal_quantization: bool = True,
+    group_separator: bool = True,
+) -> str:
+    """
+    Drop-in replacement for `babel.numbers.format_currency` for the rendering hot paths.
+
+    The compiled format is cached per currency, locale and format options, so repeat calls skip
+    Babel's locale and pattern lookups.  Without a locale, `get_currency_locale` is used.
+    """
+    return currency_formatter(
+        currency,
+        locale,
+        format=format,
+        currency_digits=currency_digits,
+        format_type=format_type,
+        decimal_quantization=decimal_quantization,
+        group_separator=group_separator,
+    )(number)
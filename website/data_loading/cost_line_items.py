@@ -75,39 +75,41 @@ def load_cost_line_items_from_file(
 
     imported_count = 0
     errors = []
-    for row_num, row_data in enumerate(data):
-        cost_line_data, row_errors = _parse_cost_line_item_upload_row_to_dict(row_num, row_data)
-        if len(row_errors):
-            errors += row_errors
-        else:
-            cost_line_data.update(
-                {
-                    "analysis": analysis,
-                    "country_code": country_code,
-                }
-            )
+    # Rows are saved one at a time
+    with analysis.changes_marked_once():
+        for row_num, row_data in enumerate(data):
+            cost_line_data, row_errors = _parse_cost_line_item_upload_row_to_dict(row_num, row_data)
+            if len(row_errors):
+                errors += row_errors
+            else:
+                cost_line_data.update(
+                    {
+                        "analysis": analysis,
+                        "country_code": country_code,
+                    }
+                )
 
-            if cost_line_data.get("total_cost") != 0:
-                cost_line_item = CostLineItem(**cost_line_data)
-                try:
-                    cost_line_item.full_clean()
-                    cost_line_item.save()
-                    imported_count += 1
-                except ValidationError as e:
-                    if hasattr(e, "message_dict"):
-                        for field_name, messages in e.message_dict.items():
-                            for message in messages:
-                                errors.append(
-                                    ERROR_MESSAGES["invalid_model_field"](
-                                        row=row_num,
-                                        column=_human_field_name(field_name),
-                                        error_message=message,
+                if cost_line_data.get("total_cost") != 0:
+                    cost_line_item = CostLineItem(**cost_line_data)
+                    try:
+                        cost_line_item.full_clean()
+                        cost_line_item.save()
+                        imported_count += 1
+                    except ValidationError as e:
+                        if hasattr(e, "message_dict"):
+                            for field_name, messages in e.message_dict.items():
+                                for message in messages:
+                                    errors.append(
+                                        ERROR_MESSAGES["invalid_model_field"](
+                                            row=row_num,
+                                            column=_human_field_name(field_name),
+                                            error_message=message,
+                                        )
                                     )
-                                )
-                    else:
+                        else:
+                            errors.append(ERROR_MESSAGES["invalid_row_generic"](row=row_num))
+                    except Exception:
                         errors.append(ERROR_MESSAGES["invalid_row_generic"](row=row_num))
-                except Exception:
-                    errors.append(ERROR_MESSAGES["invalid_row_generic"](row=row_num))
 
     if len(errors):
         # Clean up if there were any errors.
@@ -9,6 +9,7 @@ from .types import LoadExcelSheetResult
 from .utils import cast_and_handle_numeric_strings, cast_boolean_type
 from .validation.error_messages import ERROR_MESSAGES
 from ..models import AccountCodeDescription, Category, CostType, CostTypeCategoryMapping
+from ..models.account_code_description import account_code_index
 
 logger = logging.getLogger(__name__)
 
@@ -268,5 +269,7 @@ class CostTypeCategoryMappingImporter(Importer):
                     "sensitive_data",
                 ],
             )
+            # bulk_create/bulk_update don't send post_save, so the index has to be told directly.
+            account_code_index.invalidate()
 
         return True, self.result()
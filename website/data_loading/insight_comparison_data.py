@@ -16,6 +16,7 @@ from ..models import (
     InsightComparisonData,
     Intervention,
 )
+from ..models.insight_comparison_series import insight_comparison_series
 
 logger = logging.getLogger(__name__)
 
@@ -309,6 +310,7 @@ class InsightComparisonDataImporter(Importer):
 
             InsightComparisonData.objects.all().delete()
             InsightComparisonData.objects.bulk_create(to_create)
+            transaction.on_commit(insight_comparison_series.rebuild)
 
         result: LoadExcelSheetResult = {
             "errors": self.errors,
@@ -1,6 +1,3 @@
-from django.urls import resolve
-
-
 class EmailTwoFactorMiddleware:
     """
     Reset the login flow if another page is loaded halfway through the login.
@@ -8,18 +5,19 @@ class EmailTwoFactorMiddleware:
     entered their two-factor credentials.) This makes sure a user does not stay
     half logged in by mistake.
 
+    This runs once the URL has been resolved for the view, so it checks the
+    request's existing `resolver_match` rather than resolving the path again.
     """
 
     def __init__(self, get_response=None):
         self.get_response = get_response
 
     def __call__(self, request):
-        self.process_request(request)
         return self.get_response(request)
 
-    def process_request(self, request):
-        match = resolve(request.path)
-        if not match.url_name or not match.url_name.startswith("two-factor-authenticate"):
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        url_name = request.resolver_match.url_name
+        if not url_name or not url_name.startswith("two-factor-authenticate"):
             try:
                 del request.session["email_2fa_user_id"]
             except KeyError:
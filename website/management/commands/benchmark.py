@@ -1,10 +1,29 @@
+import copy
 import datetime
+import statistics
 import sys
+import threading
 import time
+from collections import defaultdict
+from decimal import Decimal
 
+from babel.numbers import format_currency as babel_format_currency
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.base import BaseHandler
 from django.core.management.base import BaseCommand, CommandError
-from django.db import connection, transaction
+from django.core.paginator import Paginator
+from django.db import close_old_connections, connection, connections, reset_queries, transaction
+from django.db.models import Q
+from django.template import engines
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from django.utils.module_loading import import_string
 
+from app_log.facets import log_facets
+from app_log.models import AppLogEntry
+from ombucore.admin.pagination import CursorPaginator
+from website.currency import format_currency, get_currency_locale
 from website.data_loading.transactions import load_transactions
 from website.models import (
     Analysis,
@@ -25,7 +44,10 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument(
             "routine",
-            help="Name of the benchmark function to run (choices: import, clone)",
+            help=(
+                "Name of the benchmark function to run "
+                "(choices: import, clone, currency, app_log, requests, connections)"
+            ),
         )
         parser.add_argument(
             "--debug-sql",
@@ -117,6 +139,209 @@ class Command(BaseCommand):
         sw.click("clone_analysis")
         print(f"Cloned into analysis {new_analysis.id}")
 
+    def benchmark_currency(self, analysis, debug_sql=False, rounds=200):
+        """Compare Babel's format_currency with the compiled formats used by the Insights pages."""
+        currency = analysis.currency_code or settings.ISO_CURRENCY_CODE
+        locale = get_currency_locale(currency)
+        values = [
+            cost
+            for output_costs in (analysis.output_costs or {}).values()
+            for costs in output_costs.values()
+            for cost in costs.values()
+            if isinstance(cost, (int, float, Decimal))
+        ] or [Decimal(i * 7919) / 100 - 5000 for i in range(500)]
+        print(f"Formatting {len(values)} {currency} values {rounds} times")
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            expected = [babel_format_currency(value, currency, locale=locale) for value in values]
+        babel_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            formatted = [format_currency(value, currency, locale=locale) for value in values]
+        compiled_seconds = time.perf_counter() - start
+
+        if formatted != expected:
+            raise CommandError("Compiled currency formats do not match Babel")
+        print(f"babel:\t {babel_seconds:0.2f}s")
+        print(f"compiled:\t {compiled_seconds:0.2f}s\t {babel_seconds / compiled_seconds:0.1f}x faster")
+
+    def benchmark_app_log(self, analysis, debug_sql=False, entries=5_000_000):
+        """Browse a synthetic application log: deep pages, filter choices and keyword search."""
+        print(f"Inserting {entries} synthetic log entries")
+        sw = Stopwatch(debug_sql)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO app_log_applogentry (timestamp, actor_name, action, message)
+                SELECT
+                    now() - i * interval '1 second',
+                    'user' || i %% 200,
+                    (ARRAY['Logged In', 'Logged Out', 'Created', 'Deleted', 'Properties updated'])[1 + i %% 5],
+                    'Entry ' || i || ' about analysis ' || i %% 5000 || '.'
+                FROM generate_series(1, %s) AS i
+                """,
+                [entries],
+            )
+            cursor.execute("ANALYZE app_log_applogentry")
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = 'app_log_applogentry'")
+            print("Indexes:", ", ".join(sorted(row[0] for row in cursor.fetchall())))
+        sw.click("insert")
+
+        queryset = AppLogEntry.objects.all()
+        page_number = 1000
+        page = Paginator(queryset, 80).page(page_number)
+        list(page.object_list)
+        sw.click(f"count_and_offset_page_{page_number}")
+
+        paginator = CursorPaginator(queryset, 80)
+        previous_row = queryset.order_by("-timestamp", "-id")[(page_number - 1) * 80 - 1]
+        cursor = paginator._encode("n", previous_row)
+        sw.click("find_cursor")
+        assert [entry.pk for entry in paginator.page(cursor)] == [entry.pk for entry in page.object_list]
+        sw.click(f"cursor_page_{page_number}")
+
+        for field in ["actor_name", "action", "content_type"]:
+            list(queryset.order_by(field).values_list(field, flat=True).distinct())
+        sw.click("distinct_filter_choices")
+        log_facets.invalidate()
+        log_facets.get()
+        sw.click("load_cached_filter_choices")
+        log_facets.get()
+        sw.click("cached_filter_choices")
+
+        list(
+            queryset.filter(
+                Q(message__icontains="analysis 4242.") | Q(actor_name__icontains="analysis 4242.")
+            )[:80]
+        )
+        sw.click("keyword_search")
+
+    def benchmark_requests(self, analysis, debug_sql=False, rounds=50):
+        """
+        Time each middleware, the view, and each context processor over requests for a few pages, as an
+        admin user.  A middleware's time excludes the middleware and view it wraps; `process_view()` hooks
+        run as part of the view.  A context processor's "use" is reading every value it returns, as a
+        template would.
+        """
+        user = get_user_model().objects.create(email="benchmark@example.com", role="ADMIN")
+        client = Client()
+        client.force_login(user)
+        factory = RequestFactory()
+        factory.cookies = client.cookies
+        paths = [reverse("dashboard"), reverse("help-menu"), reverse("analysis", kwargs={"pk": analysis.pk})]
+        print(f"Requesting {', '.join(paths)} {rounds} times each")
+
+        timings = defaultdict(lambda: [0.0, 0])
+        inner = []
+
+        def timed(name, call):
+            def timed_call(request):
+                inner.append([0.0, 0])
+                start, start_queries = time.perf_counter(), len(connection.queries_log)
+                try:
+                    return call(request)
+                finally:
+                    elapsed = time.perf_counter() - start
+                    queries = len(connection.queries_log) - start_queries
+                    inner_elapsed, inner_queries = inner.pop()
+                    timings[name][0] += elapsed - inner_elapsed
+                    timings[name][1] += queries - inner_queries
+                    if inner:
+                        inner[-1][0] += elapsed
+                        inner[-1][1] += queries
+
+            return timed_call
+
+        # The chain `BaseHandler.load_middleware()` builds, with each layer timed
+        handler = BaseHandler()
+        handler.load_middleware()
+        get_response = timed("view", handler._get_response)
+        for middleware_path in reversed(settings.MIDDLEWARE):
+            get_response = timed(middleware_path, import_string(middleware_path)(get_response))
+
+        context_processors = engines["django"].engine.template_context_processors
+        connection.force_debug_cursor = True
+        try:
+            for _ in range(rounds):
+                for path in paths:
+                    reset_queries()
+                    request = factory.get(path)
+                    response = get_response(request)
+                    assert response.status_code < 400, f"{path}: {response.status_code}"
+                    for processor in context_processors:
+                        name = f"{processor.__module__}.{processor.__name__}"
+                        start, start_queries = time.perf_counter(), len(connection.queries_log)
+                        context = processor(request)
+                        timings[name][0] += time.perf_counter() - start
+                        timings[name][1] += len(connection.queries_log) - start_queries
+                        start, start_queries = time.perf_counter(), len(connection.queries_log)
+                        for value in context.values():
+                            bool(value)
+                        timings[f"{name} (use)"][0] += time.perf_counter() - start
+                        timings[f"{name} (use)"][1] += len(connection.queries_log) - start_queries
+        finally:
+            connection.force_debug_cursor = False
+
+        requests = rounds * len(paths)
+        for name, (seconds, queries) in timings.items():
+            print(f"{name}:\t {seconds / requests * 1000:0.3f}ms\t queries: {queries / requests:0.2f}")
+
+    def benchmark_connections(self, analysis, debug_sql=False, rounds=200):
+        """
+        Compare request latency when connecting for every request, keeping a connection per thread
+        (`CONN_MAX_AGE`) and taking connections from a pool.  The requests run in their own thread, outside
+        the benchmark's transaction, and release their connection when they finish, as in production.
+        """
+        path = reverse("account_login")
+        configured_pool = settings.DATABASES["default"].get("OPTIONS", {}).get("pool")
+        configurations = [
+            ("connect per request", {"CONN_MAX_AGE": 0}),
+            ("persistent connection", {"CONN_MAX_AGE": 60}),
+            ("pooled", {"CONN_MAX_AGE": 0, "pool": configured_pool or True}),
+        ]
+        print(f"Requesting {path} {rounds} times with each configuration")
+        results = {}
+
+        def run():
+            default = connections["default"]
+            for name, configuration in configurations:
+                settings_dict = copy.deepcopy(default.settings_dict)
+                settings_dict["CONN_MAX_AGE"] = configuration["CONN_MAX_AGE"]
+                settings_dict["OPTIONS"].pop("pool", None)
+                if "pool" in configuration:
+                    settings_dict["OPTIONS"]["pool"] = configuration["pool"]
+                connections["default"] = type(default)(settings_dict, "default")
+                client = Client()
+                # The first request opens the pool
+                client.get(path)
+                close_old_connections()
+                timings = []
+                for _ in range(rounds):
+                    start = time.perf_counter()
+                    response = client.get(path)
+                    # The test client doesn't release connections when a request finishes, as the handler does
+                    close_old_connections()
+                    timings.append(time.perf_counter() - start)
+                    assert response.status_code == 200, f"{path}: {response.status_code}"
+                connections["default"].close()
+                if not configured_pool and "pool" in configuration:
+                    connections["default"].close_pool()
+                results[name] = timings
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+
+        for name, timings in results.items():
+            timings.sort()
+            print(
+                f"{name}:\t mean: {statistics.mean(timings) * 1000:0.2f}ms"
+                f"\t median: {timings[len(timings) // 2] * 1000:0.2f}ms"
+                f"\t p95: {timings[int(len(timings) * 0.95)] * 1000:0.2f}ms"
+            )
+
     def create_analysis(self):
         intervention_group, created = InterventionGroup.objects.get_or_create(name="Test Intervention Group")
         intervention, created = Intervention.objects.get_or_create(
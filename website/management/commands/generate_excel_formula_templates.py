@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from website.models import output_metric_formulas
+from website.models.output_metric import OUTPUT_METRICS, _compile_excel_formula_template
+
+HEADER = '''"""
+The Excel formula template of each output metric's `calculate`, see `_compile_excel_formula_template`.
+
+Generated by `manage.py generate_excel_formula_templates` from the metrics' source, so that the templates
+don't depend on the source being deployed.  Don't edit by hand.
+"""
+
+'''
+
+
+def render_excel_formula_templates() -> str:
+    lines = []
+    for metric in sorted(OUTPUT_METRICS, key=lambda metric: metric.id):
+        template = _compile_excel_formula_template(type(metric).calculate)
+        if template is None:
+            raise CommandError(f"The calculate method of {metric.id} can't be converted to an Excel formula")
+        entry = f"    {json.dumps(metric.id)}: {json.dumps(template)},"
+        if len(entry) > 110:
+            # As black wraps it
+            entry = f"    {json.dumps(metric.id)}: (\n        {json.dumps(template)}\n    ),"
+        lines.append(entry)
+    return HEADER + "EXCEL_FORMULA_TEMPLATES = {\n" + "\n".join(lines) + "\n}\n"
+
+
+class Command(BaseCommand):
+    help = "Write each output metric's Excel formula template to website/models/output_metric_formulas.py"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Exit with an error if the templates are out of date, without writing them",
+        )
+
+    def handle(self, *args, **options):
+        path = Path(output_metric_formulas.__file__)
+        content = render_excel_formula_templates()
+        if path.read_text() == content:
+            self.stdout.write("The Excel formula templates are up to date.")
+            return
+        if options["check"]:
+            raise CommandError(
+                "The Excel formula templates are out of date, run `manage.py generate_excel_formula_templates`"
+            )
+        path.write_text(content)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from website.models import Analysis
+from website.models.query_utils import reset_prefetch_misses, top_prefetch_misses
+
+ENDPOINTS_TO_CHECK = [
+    "",
+    "add-other-costs",
+    "allocate",
+    "categorize",
+    "define",
+    "insights",
+    "load-data",
+]
+
+
+class Command(BaseCommand):
+    help = "Loads the analysis pages and lists the call sites with the most missing prefetches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--username",
+            type=str,
+            required=True,
+            help="Username/email of the user to authenticate with",
+        )
+        parser.add_argument(
+            "--analysis",
+            type=int,
+            action="append",
+            help="ID of an analysis to load. May be repeated. Defaults to every analysis.",
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=20,
+            help="Number of call sites to list",
+        )
+
+    @override_settings(ALLOWED_HOSTS=["testserver"], DEBUG=False, REQUIRE_PREFETCH_STRICT=False)
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(email=options["username"])
+        except User.DoesNotExist:
+            raise CommandError(f'User with username "{options["username"]}" does not exist.')
+
+        client = Client()
+        client.force_login(user)
+
+        analysis_ids = options["analysis"] or Analysis.objects.order_by("id").values_list("id", flat=True)
+
+        reset_prefetch_misses()
+        page_count = 0
+        for analysis_id in analysis_ids:
+            for endpoint in ENDPOINTS_TO_CHECK:
+                client.get(f"/analysis/{analysis_id}/{endpoint}", follow=True)
+                page_count += 1
+
+        misses = top_prefetch_misses(options["top"])
+        self.stdout.write(f"Loaded {page_count} pages.")
+        if not misses:
+            self.stdout.write(self.style.SUCCESS("No missing prefetches recorded."))
+            return
+
+        self.stdout.write("| Misses | Prefetch | Function | Location |")
+        self.stdout.write("| ------ | -------- | -------- | -------- |")
+        for site, n in misses:
+            self.stdout.write(f"| {n:>6} | {site.name} | {site.function} | {site.filename}:{site.lineno} |")
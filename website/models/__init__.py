@@ -6,6 +6,7 @@ from .analysis import (
     AnalysisCostTypeCategoryGrantIntervention,
     AnalysisType,
 )
+from .cache_version import CacheVersion
 from .category import Category
 from .cost_efficiency_strategy import CostEfficiencyStrategy
 from .cost_line_item import (
@@ -1,8 +1,13 @@
 from __future__ import annotations
 
+import threading
+from collections.abc import Iterable
+
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from website.utils.model_cache import VersionStamp
+
 
 class AccountCodeDescription(models.Model):
     app_log_entry_link_name = "ombucore.admin:website_accountcodedescription_change"
@@ -30,3 +35,64 @@ class AccountCodeDescription(models.Model):
     @classmethod
     def as_map(cls) -> dict[str, AccountCodeDescription]:
         return {acd.account_code: acd for acd in AccountCodeDescription.objects.all()}
+
+
+class AccountCodeIndex:
+    """
+    Process-level, versioned in-memory index of `AccountCodeDescription` rows.
+
+    The table is small and rarely edited, but it is consulted on nearly every page
+    (context processor) and once per rendered group of cost line items (sensitivity filter).
+    Readers get the last loaded snapshot, until `invalidate()` (in any worker) sets a new
+    version stamp and the next reader reloads it.  The returned map is shared between
+    requests and must not be mutated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp = VersionStamp("account-code-index")
+        self._loaded_version = None
+        self._by_code: dict[str, AccountCodeDescription] = {}
+        self._sensitive_codes: frozenset[str] = frozenset()
+
+    @property
+    def version(self) -> int:
+        return self._stamp.get()
+
+    def invalidate(self):
+        self._stamp.invalidate()
+
+    def cache_clear(self):
+        """Forget the loaded index, e.g. between tests."""
+        with self._lock:
+            self._loaded_version = None
+
+    def _ensure_loaded(self):
+        version = self._stamp.get()
+        if self._loaded_version == version:
+            return
+        with self._lock:
+            if self._loaded_version == version:
+                return
+            by_code = AccountCodeDescription.as_map()
+            self._by_code = by_code
+            self._sensitive_codes = frozenset(code for code, acd in by_code.items() if acd.sensitive_data)
+            self._loaded_version = version
+
+    def as_map(self) -> dict[str, AccountCodeDescription]:
+        self._ensure_loaded()
+        return self._by_code
+
+    def is_sensitive(self, account_code: str) -> bool:
+        self._ensure_loaded()
+        return account_code in self._sensitive_codes
+
+    def any_sensitive(self, account_codes: Iterable[str]) -> bool:
+        self._ensure_loaded()
+        sensitive_codes = self._sensitive_codes
+        if not sensitive_codes:
+            return False
+        return any(code in sensitive_codes for code in account_codes)
+
+
+account_code_index = AccountCodeIndex()
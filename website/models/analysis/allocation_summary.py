@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import dataclasses
+from decimal import Decimal
+from typing import TYPE_CHECKING
+
+from django.db import connection
+from django.utils.functional import cached_property
+
+if TYPE_CHECKING:
+    from website.models import Analysis, AnalysisCostTypeCategoryGrant
+
+
+@dataclasses.dataclass(frozen=True)
+class GrantAllocationSummary:
+    """Allocation totals of the cost line items of one cost type, category and grant."""
+
+    # Total cost of each item, counted once per intervention it has an allocation (including 0%) for
+    assigned_items_total: Decimal = Decimal(0)
+    # Total cost of each item weighted by the sum of its allocations
+    assigned_items_cost: Decimal = Decimal(0)
+    # Total cost of the items whose allocations are missing or add up to 0%
+    unallocated_items_total: Decimal = Decimal(0)
+
+    def __add__(self, other: GrantAllocationSummary) -> GrantAllocationSummary:
+        return GrantAllocationSummary(
+            *(getattr(self, f.name) + getattr(other, f.name) for f in dataclasses.fields(self))
+        )
+
+    @property
+    def all_errors(self) -> bool:
+        return self.assigned_items_total == 0
+
+
+class AllocationSummary:
+    """
+    Allocation totals for every cost type, category and grant of an Analysis, computed by one
+    grouped query the first time they are needed.
+
+    Get one through `Analysis.allocation_summary`, which keeps it for the rest of the request
+    alongside `Analysis.snapshot`.
+    """
+
+    EMPTY = GrantAllocationSummary()
+
+    def __init__(self, analysis: Analysis):
+        self.analysis = analysis
+
+    @cached_property
+    def _by_cost_type_category_grant(self) -> dict[tuple[int, int, str], GrantAllocationSummary]:
+        # Allocations are summed per cost line item first, so items without any are still counted
+        # as unallocated, and then grouped the same way as AnalysisCostTypeCategoryGrant.
+        q = """
+        WITH items AS (
+            SELECT
+                config.cost_type_id,
+                config.category_id,
+                cli.grant_code,
+                cli.total_cost,
+                COUNT(allocation.allocation) AS assigned_count,
+                COALESCE(SUM(allocation.allocation), 0) AS allocation_sum
+            FROM website_costlineitem cli
+            JOIN website_costlineitemconfig config ON config.cost_line_item_id = cli.id
+            LEFT JOIN website_costlineiteminterventionallocation allocation ON allocation.cli_config_id = config.id
+            WHERE cli.analysis_id = %s
+            GROUP BY cli.id, config.id
+        )
+        SELECT
+            cost_type_id,
+            category_id,
+            grant_code,
+            SUM(total_cost * assigned_count),
+            SUM(total_cost * allocation_sum) / 100,
+            SUM(CASE WHEN allocation_sum = 0 THEN total_cost ELSE 0 END)
+        FROM items
+        GROUP BY cost_type_id, category_id, grant_code
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(q, [self.analysis.id])
+            return {
+                (cost_type_id, category_id, grant_code): GrantAllocationSummary(*totals)
+                for cost_type_id, category_id, grant_code, *totals in cursor.fetchall()
+            }
+
+    def get(self, cost_type_id: int, category_id: int, grant: str) -> GrantAllocationSummary:
+        return self._by_cost_type_category_grant.get((cost_type_id, category_id, grant), self.EMPTY)
+
+    def for_cost_type_category_grant(
+        self, cost_type_category_grant: AnalysisCostTypeCategoryGrant
+    ) -> GrantAllocationSummary:
+        cost_type_category = cost_type_category_grant.cost_type_category
+        return self.get(
+            cost_type_category.cost_type_id, cost_type_category.category_id, cost_type_category_grant.grant
+        )
+
+    def total_for(self, cost_type_category_grants) -> GrantAllocationSummary:
+        """The combined totals of several cost type category grants, e.g. every category of an Allocate step."""
+        return sum(
+            (self.for_cost_type_category_grant(each) for each in cost_type_category_grants),
+            self.EMPTY,
+        )
@@ -1,12 +1,17 @@
+import contextlib
+import hashlib
+import json
 import logging
+import threading
 import warnings
+from datetime import datetime
 from decimal import Decimal
 
 from ckeditor.fields import RichTextField
 from django.conf import settings
 from django.db import connection, models
 from django.db.models import F, JSONField, Q, Sum, Value
-from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from ombucore.admin.fields import ForeignKey
@@ -29,10 +34,15 @@ from .analysis_cost_type_category_grant import AnalysisCostTypeCategoryGrant
 from .analysis_cost_type_category_grant_intervention import (
     AnalysisCostTypeCategoryGrantIntervention,
 )
+from .allocation_summary import AllocationSummary
+from .analysis_snapshot import AnalysisSnapshot
 from .analysis_type import AnalysisType
 
 logger = logging.getLogger(__name__)
 
+# Whether `Analysis.mark_changed` is deferred, see `Analysis.changes_marked_once`
+_marking = threading.local()
+
 
 class Analysis(models.Model):
     CURRENCY_CHOICES = (
@@ -172,6 +182,94 @@ class Analysis(models.Model):
     def cost_line_items(self):
         return self.unfiltered_cost_line_items
 
+    @property
+    def snapshot(self) -> AnalysisSnapshot:
+        """
+        The cost graph of this analysis.  See `AnalysisSnapshot`.
+
+        Kept on the instance when it was loaded with `AnalysisSnapshot.PREFETCH`, otherwise read
+        fresh on every access.
+        """
+        if not AnalysisSnapshot.is_prefetched(self):
+            return AnalysisSnapshot.from_db(self)
+        snapshot = self.__dict__.get("_snapshot")
+        if snapshot is None or not snapshot.is_built_from(self):
+            snapshot = self._snapshot = AnalysisSnapshot.from_prefetched(self)
+        return snapshot
+
+    @property
+    def allocation_summary(self) -> AllocationSummary:
+        """
+        Allocation totals per cost type, category and grant.  See `AllocationSummary`.
+
+        Kept for as long as the snapshot is, otherwise recomputed on every access.
+        """
+        if not AnalysisSnapshot.is_prefetched(self):
+            return AllocationSummary(self)
+        if "_allocation_summary" not in self.__dict__:
+            self._allocation_summary = AllocationSummary(self)
+        return self._allocation_summary
+
+    def refresh_snapshot(self) -> None:
+        """Reload the prefetches the snapshot is built from, after writing to them in this request."""
+        self.__dict__.pop("_snapshot", None)
+        self.__dict__.pop("_allocation_summary", None)
+        if not AnalysisSnapshot.is_prefetched(self):
+            return
+        for lookup in AnalysisSnapshot.PREFETCH:
+            self._prefetched_objects_cache.pop(lookup.split("__")[0], None)
+        self._snapshot = AnalysisSnapshot.from_prefetched(self)
+
+    @property
+    def data_version(self) -> str:
+        """
+        Identifies the state of this analysis' results, for keying caches of data derived from them.
+
+        Every step saves the analysis when it invalidates or recalculates the output costs, which bumps `updated`.
+        Writes to its cost line items, their configs and allocations (see `AnalysisData`), its intervention
+        instances and their interventions call `mark_changed`.
+        """
+        output_costs_digest = hashlib.md5(
+            json.dumps(self.output_costs, sort_keys=True, default=str).encode(),
+            usedforsecurity=False,
+        ).hexdigest()
+        return f"{self.pk}:{self.updated.timestamp()}:{output_costs_digest}"
+
+    @classmethod
+    def mark_changed(cls, **filters) -> datetime | None:
+        """
+        Bump `updated`, and so `data_version`, of the analyses matching `filters`, returning the new value.
+        For writes to an analysis' data that don't save the analysis itself, e.g. to its cost line items or
+        allocations.
+
+        Analyses already loaded keep their old `updated`; use `touch()` for one in hand.  Inside
+        `changes_marked_once()` this does nothing, and returns None.
+        """
+        if getattr(_marking, "deferred", False):
+            return None
+        updated = timezone.now()
+        cls.objects.filter(**filters).update(updated=updated)
+        return updated
+
+    def touch(self) -> None:
+        """`mark_changed` this analysis, here and in the database."""
+        self.updated = timezone.now()
+        type(self).objects.filter(pk=self.pk).update(updated=self.updated)
+
+    @contextlib.contextmanager
+    def changes_marked_once(self):
+        """
+        Mark this analysis changed once, on leaving the block, rather than for every row written in it, e.g.
+        for a loop saving its cost line items one at a time.  Writes in the block to other analyses' data
+        aren't marked.
+        """
+        _marking.deferred = True
+        try:
+            yield
+        finally:
+            _marking.deferred = False
+        self.touch()
+
     def query_grants(self) -> list[str]:
         """
         The list of grants used to query transactions.
@@ -657,7 +755,7 @@ class Analysis(models.Model):
         return created_ids
 
     def ensure_cost_type_category_grant_objects(self) -> list[int]:
-        grants_list = self.grants_list()
+        grants_list = self.snapshot.grants_list()
         cost_type_categories = list(self.cost_type_categories.prefetch_related("cost_type").all())
 
         # If we have no cost_type categories, we have no grants to create.
@@ -767,7 +865,7 @@ class Analysis(models.Model):
         )
 
     def special_country_allocation_complete(self, grant_code=None):
-        items = self.special_country_cost_line_items
+        items = self.snapshot.special_country_cost_line_items
 
         # narrow to just the provided grant_code
         if grant_code is not None:
@@ -836,6 +934,31 @@ class Analysis(models.Model):
                 Q(config__subcomponent_analysis_allocations_skipped=True) & Q(config__cost_type=cost_type)
             ).all()
 
+    def _get_allocated_cost_totals(self, cost_line_items) -> dict[int, float]:
+        """
+        The Sum of the Total * Allocations of `cost_line_items` for every Intervention Instance in this
+        Analysis, grouped by Intervention Instance in one query.  Instances without allocations get 0.
+        """
+        allocated_cost_totals = dict(
+            CostLineItemInterventionAllocation.objects.filter(
+                cli_config__cost_line_item__in=cost_line_items,
+                intervention_instance__analysis=self,
+            )
+            .values("intervention_instance_id")
+            .annotate(
+                allocated_cost_total=Sum(
+                    F("cli_config__cost_line_item__total_cost") * (F("allocation") / Value(100))
+                )
+            )
+            .values_list("intervention_instance_id", "allocated_cost_total")
+            .order_by()
+        )
+        # Map float to all of these to simplify code downstream (they were previously Decimal)
+        return {
+            intervention_instance_id: float(allocated_cost_totals.get(intervention_instance_id) or 0)
+            for intervention_instance_id in self.interventioninstance_set.values_list("id", flat=True)
+        }
+
     def get_cost_output_sums_all(self) -> dict[int, float]:
         """
         Get the Sum of the Total * Allocations for the Cost Line Items by their Intervention Allocation in this Analysis
@@ -848,43 +971,11 @@ class Analysis(models.Model):
           ...
         }
         """
-        relevant_configs: set[int] = set(self.cost_line_items.values_list("config__id", flat=True))
-        allocation_sums_by_intervention = {}
-        for each_intervention_instance in self.interventioninstance_set.all():
-            allocations_sums = dict(
-                CostLineItemInterventionAllocation.objects.filter(
-                    cli_config__id__in=relevant_configs,
-                    intervention_instance=each_intervention_instance,
-                )
-                .values("cli_config__id")
-                .annotate(
-                    allocation_sum=Coalesce(
-                        Sum("allocation") / Value(100),
-                        Decimal(0),
-                    )
-                )
-                .values_list("cli_config__id", "allocation_sum")
+        return self._get_allocated_cost_totals(
+            self.cost_line_items.exclude(config__analysis_cost_type=AnalysisCostType.CLIENT_TIME).exclude(
+                config__analysis_cost_type=AnalysisCostType.IN_KIND
             )
-            allocation_sums_by_intervention[each_intervention_instance] = allocations_sums
-
-        cost_output_sum_all = {}
-        for (
-            each_intervention_instance,
-            allocations_sums,
-        ) in allocation_sums_by_intervention.items():
-            cost_output_sum_all[each_intervention_instance.id] = 0
-            for each_cli in (
-                self.cost_line_items.all()
-                .exclude(config__analysis_cost_type=AnalysisCostType.CLIENT_TIME)
-                .exclude(config__analysis_cost_type=AnalysisCostType.IN_KIND)
-            ):
-                cost_output_sum_all[
-                    each_intervention_instance.id
-                ] += each_cli.total_cost * allocations_sums.get(each_cli.config.id, 0)
-
-        # Map float to all of these to simplify code downstream (they were previously Decimal)
-        cost_output_sum_all = {k: float(v) for k, v in cost_output_sum_all.items()}
-        return cost_output_sum_all
+        )
 
     def get_cost_output_sum_direct_only(self) -> dict[int, float]:
         """
@@ -899,44 +990,11 @@ class Analysis(models.Model):
           ...
         }
         """
-        relevant_configs: set[int] = set(
-            self.cost_line_items.filter(
-                config__cost_type__type=ProgramCost.id,
-            ).values_list("config__id", flat=True)
+        return self._get_allocated_cost_totals(
+            self.cost_line_items.filter(config__cost_type__type=ProgramCost.id)
+            .exclude(config__analysis_cost_type=AnalysisCostType.CLIENT_TIME)
+            .exclude(config__analysis_cost_type=AnalysisCostType.IN_KIND)
         )
-        allocation_sums_by_intervention = {}
-        for each_intervention_instance in self.interventioninstance_set.all():
-            allocations_sums = dict(
-                CostLineItemInterventionAllocation.objects.filter(
-                    cli_config__id__in=relevant_configs,
-                    cli_config__cost_type__type=ProgramCost.id,
-                    intervention_instance=each_intervention_instance,
-                )
-                .values("cli_config__id")
-                .annotate(allocation_sum=Sum("allocation") / Value(100))
-                .values_list("cli_config__id", "allocation_sum")
-            )
-            allocation_sums_by_intervention[each_intervention_instance] = allocations_sums
-
-        cost_output_sums_direct_only = {}
-        for (
-            each_intervention_instance,
-            allocations_sums,
-        ) in allocation_sums_by_intervention.items():
-            cost_output_sums_direct_only[each_intervention_instance.id] = 0
-
-            for each_cli in (
-                self.cost_line_items.all()
-                .exclude(config__analysis_cost_type=AnalysisCostType.CLIENT_TIME)
-                .exclude(config__analysis_cost_type=AnalysisCostType.IN_KIND)
-            ):
-                cost_output_sums_direct_only[
-                    each_intervention_instance.id
-                ] += each_cli.total_cost * allocations_sums.get(each_cli.config.id, 0)
-
-        # Map float to all of these to simplify code downstream (they were previously Decimal)
-        cost_output_sums_direct_only = {k: float(v) for k, v in cost_output_sums_direct_only.items()}
-        return cost_output_sums_direct_only
 
     def get_cost_total_client_time(self) -> dict[int, float]:
         """
@@ -954,41 +1012,7 @@ class Analysis(models.Model):
 
         if not self.client_time:
             return {}
-
-        relevant_configs: set[int] = set(
-            self.client_time_cost_line_items.values_list(
-                "config__id",
-                flat=True,
-            )
-        )
-
-        allocation_sums_by_intervention = {}
-        for each_intervention_instance in self.interventioninstance_set.all():
-            allocations_sums = dict(
-                CostLineItemInterventionAllocation.objects.filter(
-                    cli_config__id__in=relevant_configs,
-                    intervention_instance=each_intervention_instance,
-                )
-                .values("cli_config__id")
-                .annotate(allocation_sum=Sum("allocation") / Value(100))
-                .values_list("cli_config__id", "allocation_sum")
-            )
-            allocation_sums_by_intervention[each_intervention_instance] = allocations_sums
-        cost_output_sums_client_time = {}
-        for (
-            each_intervention_instance,
-            allocations_sums,
-        ) in allocation_sums_by_intervention.items():
-            cost_output_sums_client_time[each_intervention_instance.id] = 0
-
-            for each_cli in self.client_time_cost_line_items:
-                cost_output_sums_client_time[
-                    each_intervention_instance.id
-                ] += each_cli.total_cost * allocations_sums.get(each_cli.config.id, 0)
-        # Map float to all of these to simplify code downstream (they were previously Decimal)
-        cost_output_sums_client_time = {k: float(v) for k, v in cost_output_sums_client_time.items()}
-
-        return cost_output_sums_client_time
+        return self._get_allocated_cost_totals(self.client_time_cost_line_items)
 
     def get_cost_total_client_hours(self) -> float:
         if not self.client_time:
@@ -1016,40 +1040,7 @@ class Analysis(models.Model):
 
         if not self.in_kind_contributions:
             return {}
-        relevant_configs: set[int] = set(
-            self.in_kind_contributions_cost_line_items.values_list(
-                "config__id",
-                flat=True,
-            )
-        )
-        allocation_sums_by_intervention = {}
-
-        for each_intervention_instance in self.interventioninstance_set.all():
-            allocations_sums = dict(
-                CostLineItemInterventionAllocation.objects.filter(
-                    cli_config__id__in=relevant_configs,
-                    intervention_instance=each_intervention_instance,
-                )
-                .values("cli_config__id")
-                .annotate(allocation_sum=Sum("allocation") / Value(100))
-                .values_list("cli_config__id", "allocation_sum")
-            )
-            allocation_sums_by_intervention[each_intervention_instance] = allocations_sums
-
-        cost_output_sums_in_kind = {}
-        for (
-            each_intervention_instance,
-            allocations_sums,
-        ) in allocation_sums_by_intervention.items():
-            cost_output_sums_in_kind[each_intervention_instance.id] = 0
-
-            for each_cli in self.in_kind_contributions_cost_line_items:
-                cost_output_sums_in_kind[
-                    each_intervention_instance.id
-                ] += each_cli.total_cost * allocations_sums.get(each_cli.config.id, 0)
-        # Map float to all of these to simplify code downstream (they were previously Decimal)
-        cost_output_sums_in_kind = {k: float(v) for k, v in cost_output_sums_in_kind.items()}
-        return cost_output_sums_in_kind
+        return self._get_allocated_cost_totals(self.in_kind_contributions_cost_line_items)
 
     def calculate_output_costs(self) -> None:
         cost_output_sums_all = self.get_cost_output_sums_all()
@@ -1063,18 +1054,14 @@ class Analysis(models.Model):
             params = each_intervention_instance.parameters.copy()
             for output_metric in each_intervention_instance.intervention.output_metric_objects():
                 try:
-                    params["cost_output_sum"] = cost_output_sums_all[each_intervention_instance.id]
-
-                    output_cost_all = output_metric.calculate(**params)
-
-                    params["cost_output_sum"] = cost_output_sums_direct_only[each_intervention_instance.id]
-
-                    output_cost_direct_only = output_metric.calculate(**params)
-
-                    params.update(
-                        {"cost_output_sum": cost_output_sums_in_kind.get(each_intervention_instance.id, 0)}
+                    cost_output_sums = [
+                        cost_output_sums_all[each_intervention_instance.id],
+                        cost_output_sums_direct_only[each_intervention_instance.id],
+                        cost_output_sums_in_kind.get(each_intervention_instance.id, 0),
+                    ]
+                    output_cost_all, output_cost_direct_only, output_cost_in_kind = (
+                        output_metric.calculate_bulk(cost_output_sums, **params)
                     )
-                    output_cost_in_kind = output_metric.calculate(**params)
 
                     self.output_costs[str(each_intervention_instance.id)][output_metric.id] = {
                         "all": float(round(output_cost_all, 2)),
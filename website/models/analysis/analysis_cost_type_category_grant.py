@@ -1,11 +1,7 @@
-from decimal import Decimal
-
 from django.db import models
 from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 
-from website.models.query_utils import require_prefetch
-
 
 class AnalysisCostTypeCategoryGrant(models.Model):
     cost_type_category = models.ForeignKey(
@@ -48,18 +44,13 @@ class AnalysisCostTypeCategoryGrant(models.Model):
         )
 
     def allocation_complete(self) -> bool:
-        analysis = self.cost_type_category.analysis
-        for cli in require_prefetch(analysis, "unfiltered_cost_line_items"):
-            if (
-                cli.config.cost_type_id == self.cost_type_category.cost_type_id
-                and cli.config.category_id == self.cost_type_category.category_id
-                and cli.grant_code == self.grant
-            ):
-                allocations = require_prefetch(cli.config, "allocations")
-                if not allocations:
-                    return False
-                if any(a.allocation is None for a in allocations):
-                    return False
+        snapshot = self.cost_type_category.analysis.snapshot
+        for cli in snapshot.cost_line_items_for_cost_type_category_grant(self):
+            allocations = snapshot.allocations_for(cli).values()
+            if not allocations:
+                return False
+            if any(a.allocation is None for a in allocations):
+                return False
 
         # if we never found a bad one, allocation is complete
         return True
@@ -83,35 +74,25 @@ class AnalysisCostTypeCategoryGrant(models.Model):
             == 0
         )
 
+    def allocation_summary(self):
+        return self.cost_type_category.analysis.allocation_summary.for_cost_type_category_grant(self)
+
     def assigned_items_total(self):
         """Sum of items that have allocations assigned."""
-        total = 0
-        for item in self.get_cost_line_items():
-            for each_allocation in item.config.allocations.all():
-                if each_allocation.allocation or each_allocation.allocation == 0:
-                    total += item.total_cost
-        return round(total, 4)
+        return round(self.allocation_summary().assigned_items_total, 4)
 
     def assigned_items_cost(self):
         """Sum of items that have allocations assigned, multiplied by the allocation."""
-        cost = 0
-        for item in self.get_cost_line_items():
-            for each_allocation in item.config.allocations.all():
-                if each_allocation.allocation is not None:
-                    allocation_percent = each_allocation.allocation / Decimal(100)
-                    cost += item.total_cost * allocation_percent
-        return round(cost, 4)
+        return round(self.allocation_summary().assigned_items_cost, 4)
 
     def suggested_allocation(self):
-        if self.assigned_items_total() != 0:
-            allocation = self.assigned_items_cost() / self.assigned_items_total()
+        summary = self.allocation_summary()
+        if summary.assigned_items_total != 0:
+            allocation = round(summary.assigned_items_cost, 4) / round(summary.assigned_items_total, 4)
             return f"{allocation:.2%}"
 
     def all_errors(self):
-        if self.assigned_items_total() == 0:
-            return True
-        else:
-            return False
+        return self.allocation_summary().all_errors
 
     _show_allocation_calculator = False
 
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import TYPE_CHECKING
+
+from django.db.models import prefetch_related_objects
+from django.utils.functional import cached_property
+
+if TYPE_CHECKING:
+    from website.models import (
+        Analysis,
+        AnalysisCostTypeCategory,
+        AnalysisCostTypeCategoryGrant,
+        CostLineItem,
+        CostLineItemInterventionAllocation,
+        InterventionInstance,
+    )
+
+
+class AnalysisSnapshot:
+    """
+    Request-scoped, read-only view of an Analysis' cost graph.
+
+    The cost type categories, intervention instances and every cost line item (with its config
+    and allocations) are loaded once and then sliced in memory by the workflow steps, views and
+    model helpers.
+
+    Get one through `Analysis.snapshot`.  When the analysis was loaded with `PREFETCH` (as
+    `AnalysisObjectMixin.get_object` does) the snapshot is built from those prefetches and kept
+    on the instance, so call `Analysis.refresh_snapshot()` after writing to any of these
+    relations in the same request.  Otherwise every access reads fresh rows, and only the ones it
+    needs: each relation is queried when first used, and slices of the cost line items are
+    filtered in the database, just like the un-prefetched querysets it replaces.
+    """
+
+    PREFETCH = (
+        "cost_type_categories",
+        "interventioninstance_set",
+        "interventioninstance_set__intervention",
+        "unfiltered_cost_line_items",
+        "unfiltered_cost_line_items__config",
+        "unfiltered_cost_line_items__config__allocations",
+    )
+
+    def __init__(
+        self,
+        analysis: Analysis,
+        cost_type_categories: list[AnalysisCostTypeCategory] | None = None,
+        intervention_instances: list[InterventionInstance] | None = None,
+        cost_line_items: list[CostLineItem] | None = None,
+    ):
+        """Relations that aren't given are read from the database when first used."""
+        self.analysis = analysis
+        if cost_type_categories is not None:
+            self.cost_type_categories = cost_type_categories
+        if intervention_instances is not None:
+            self.intervention_instances = intervention_instances
+        if cost_line_items is not None:
+            self.cost_line_items = cost_line_items
+        self._sources = self._prefetched_sources(analysis) or ()
+        self._allocations_by_cli = {}
+
+    @classmethod
+    def _prefetched_sources(cls, analysis: Analysis) -> tuple | None:
+        prefetched = getattr(analysis, "_prefetched_objects_cache", {})
+        try:
+            return tuple(prefetched[lookup] for lookup in cls.PREFETCH if "__" not in lookup)
+        except KeyError:
+            return None
+
+    @classmethod
+    def is_prefetched(cls, analysis: Analysis) -> bool:
+        return cls._prefetched_sources(analysis) is not None
+
+    def is_built_from(self, analysis: Analysis) -> bool:
+        """Whether this snapshot still reflects the prefetches currently on `analysis`."""
+        sources = self._prefetched_sources(analysis)
+        return (
+            bool(sources)
+            and len(sources) == len(self._sources)
+            and all(a is b for a, b in zip(sources, self._sources))
+        )
+
+    @classmethod
+    def from_prefetched(cls, analysis: Analysis) -> AnalysisSnapshot:
+        # Already-fetched levels are skipped, so this only fills in whatever deeper lookups are missing.
+        prefetch_related_objects([analysis], *cls.PREFETCH)
+        cache = analysis._prefetched_objects_cache
+        return cls(
+            analysis,
+            list(cache["cost_type_categories"]),
+            list(cache["interventioninstance_set"]),
+            list(cache["unfiltered_cost_line_items"]),
+        )
+
+    @classmethod
+    def from_db(cls, analysis: Analysis) -> AnalysisSnapshot:
+        return cls(analysis)
+
+    @cached_property
+    def cost_type_categories(self) -> list[AnalysisCostTypeCategory]:
+        return list(self.analysis.cost_type_categories.all())
+
+    @cached_property
+    def intervention_instances(self) -> list[InterventionInstance]:
+        return list(self.analysis.interventioninstance_set.select_related("intervention"))
+
+    @cached_property
+    def cost_line_items(self) -> list[CostLineItem]:
+        return list(self._cost_line_items_query())
+
+    def _cost_line_items_query(self):
+        return self.analysis.unfiltered_cost_line_items.select_related("config").prefetch_related(
+            "config__allocations"
+        )
+
+    def _filters_cost_line_items(self) -> bool:
+        """Whether slices of the cost line items are read from the database rather than from memory."""
+        return "cost_line_items" not in self.__dict__
+
+    @cached_property
+    def _cost_line_items_by_id(self) -> dict[int, CostLineItem]:
+        return {cli.id: cli for cli in self.cost_line_items}
+
+    @cached_property
+    def _cost_line_items_by_cost_type_grant(self) -> dict[tuple[int, str], list[CostLineItem]]:
+        index = defaultdict(list)
+        for cli in self.cost_line_items:
+            config = getattr(cli, "config", None)
+            if config is not None:
+                index[config.cost_type_id, cli.grant_code].append(cli)
+        return index
+
+    def cost_line_item(self, cost_line_item_id: int) -> CostLineItem | None:
+        if self._filters_cost_line_items():
+            return self._cost_line_items_query().filter(pk=cost_line_item_id).first()
+        return self._cost_line_items_by_id.get(cost_line_item_id)
+
+    def cost_line_items_for_grant(self, grant: str) -> list[CostLineItem]:
+        if self._filters_cost_line_items():
+            return list(self._cost_line_items_query().filter(grant_code=grant))
+        return [cli for cli in self.cost_line_items if cli.grant_code == grant]
+
+    def cost_line_items_for_cost_type(
+        self, cost_type_id: int, grant: str | None = None
+    ) -> list[CostLineItem]:
+        if self._filters_cost_line_items():
+            query = self._cost_line_items_query().filter(config__cost_type_id=cost_type_id)
+            if grant is not None:
+                query = query.filter(grant_code=grant)
+            return list(query)
+        if grant is not None:
+            return self._cost_line_items_by_cost_type_grant.get((cost_type_id, grant), [])
+        return [
+            cli
+            for (each_cost_type_id, _), clis in self._cost_line_items_by_cost_type_grant.items()
+            if each_cost_type_id == cost_type_id
+            for cli in clis
+        ]
+
+    def cost_line_items_for_category(
+        self,
+        cost_type_id: int,
+        category_id: int,
+        grant: str,
+    ) -> list[CostLineItem]:
+        if self._filters_cost_line_items():
+            return list(
+                self._cost_line_items_query().filter(
+                    config__cost_type_id=cost_type_id, config__category_id=category_id, grant_code=grant
+                )
+            )
+        return [
+            cli
+            for cli in self.cost_line_items_for_cost_type(cost_type_id, grant)
+            if cli.config.category_id == category_id
+        ]
+
+    def cost_line_items_for_cost_type_category_grant(
+        self, cost_type_category_grant: AnalysisCostTypeCategoryGrant
+    ) -> list[CostLineItem]:
+        """The in-memory equivalent of `AnalysisCostTypeCategoryGrant.get_cost_line_items()`, unordered."""
+        cost_type_category = cost_type_category_grant.cost_type_category
+        return self.cost_line_items_for_category(
+            cost_type_category.cost_type_id,
+            cost_type_category.category_id,
+            cost_type_category_grant.grant,
+        )
+
+    def allocations_for(self, cost_line_item: CostLineItem) -> dict[int, CostLineItemInterventionAllocation]:
+        """The allocations of a cost line item, keyed by intervention instance id."""
+        allocations = self._allocations_by_cli.get(cost_line_item.id)
+        if allocations is None:
+            config = getattr(cost_line_item, "config", None)
+            allocations = {a.intervention_instance_id: a for a in config.allocations.all()} if config else {}
+            self._allocations_by_cli[cost_line_item.id] = allocations
+        return allocations
+
+    @property
+    def special_country_cost_line_items(self) -> list[CostLineItem]:
+        if self._filters_cost_line_items():
+            return list(self._cost_line_items_query().filter(is_special_lump_sum=True))
+        return [cli for cli in self.cost_line_items if cli.is_special_lump_sum]
+
+    def grants_list(self) -> list[str]:
+        if self._filters_cost_line_items():
+            grant_codes = self.analysis.unfiltered_cost_line_items.values_list("grant_code", flat=True)
+            return sorted({code for code in grant_codes.distinct() if code})
+        return sorted({cli.grant_code for cli in self.cost_line_items if cli.grant_code})
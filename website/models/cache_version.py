@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class CacheVersion(models.Model):
+    """
+    The version stamp of each cache built from the database, see `website.utils.model_cache`.
+
+    Stamps are written in the same transaction as the change that invalidates the cache, so every worker
+    sees the new stamp exactly when it sees the new data.  A stamp is the time it was set, in nanoseconds,
+    and is never reused, so a rolled back stamp can't be mistaken for a later one.
+    """
+
+    name = models.CharField(max_length=255, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.version})"
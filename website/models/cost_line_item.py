@@ -10,13 +10,72 @@ from django.db.models import Value
 from django.db.models.functions import Coalesce, Length, NullIf, StrIndex, Substr
 from django.utils.translation import gettext_lazy as _
 
+from website import betterdb
 from website.models.intervention_instance import InterventionInstance
 from website.models.field_types import SubcomponentAnalysisValuesType
 from website.models.fields import TypedJsonField
 from website.models.query_utils import require_prefetch
 
 
-class CostLineItemQuerySet(models.QuerySet):
+def _mark_analyses_changed(**filters):
+    # Imported here, as the analysis module imports this one
+    from website.models.analysis import Analysis
+
+    return Analysis.mark_changed(**filters)
+
+
+class AnalysisDataQuerySet(models.QuerySet):
+    """
+    A queryset of an analysis' data.  Updates (and so `bulk_update()`), deletes and bulk creates through it
+    mark the analyses they touch changed (see `Analysis.mark_changed`) with one query, as saving or deleting
+    an instance does.  `ANALYSIS_FIELD` on the model is the path to its analysis, e.g. "analysis".
+
+    Writes through `betterdb` bypass this, so call `Analysis.touch()` after them.
+    """
+
+    def mark_analyses_changed(self):
+        return _mark_analyses_changed(pk__in=self.values(self.model.ANALYSIS_FIELD))
+
+    def update(self, **kwargs):
+        self.mark_analyses_changed()
+        return super().update(**kwargs)
+
+    update.alters_data = True
+
+    def delete(self):
+        self.mark_analyses_changed()
+        return super().delete()
+
+    delete.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            self.model.objects.filter(pk__in=[obj.pk for obj in objs]).mark_analyses_changed()
+        return objs
+
+
+class AnalysisData(models.Model):
+    """
+    A model of an analysis' data, whose writes mark the analysis changed: saves through the `post_save`
+    receiver in `website.signals`, and deletes here and in `AnalysisDataQuerySet`.  A `post_delete` receiver
+    would turn off Django's fast deletes, fetching every row of a bulk delete to send it the signal.
+    Cascades from deleting the analysis itself don't mark anything.
+    """
+
+    ANALYSIS_FIELD: str
+
+    objects = models.Manager.from_queryset(AnalysisDataQuerySet)()
+
+    class Meta:
+        abstract = True
+
+    def delete(self, *args, **kwargs):
+        type(self).objects.filter(pk=self.pk).mark_analyses_changed()
+        return super().delete(*args, **kwargs)
+
+
+class CostLineItemQuerySet(AnalysisDataQuerySet):
     def cost_type_category_items(self):
         """
         Returns a queryset excluding non-categorized Line Items
@@ -67,7 +126,9 @@ class CostLineItemQuerySet(models.QuerySet):
 CostLineItemManager = models.Manager.from_queryset(CostLineItemQuerySet)
 
 
-class CostLineItem(models.Model):
+class CostLineItem(AnalysisData):
+    ANALYSIS_FIELD = "analysis"
+
     objects = CostLineItemManager()
 
     analysis = models.ForeignKey(
@@ -312,7 +373,8 @@ class AnalysisCostType(IntEnum):
         return pretty_map[analysis_cost_type]
 
 
-class CostLineItemConfig(models.Model):
+class CostLineItemConfig(AnalysisData):
+    ANALYSIS_FIELD = "cost_line_item__analysis"
     ANALYSIS_COST_TYPE_CHOICES = [(t.value, t.name) for t in AnalysisCostType]
 
     cost_line_item = models.OneToOneField(
@@ -382,7 +444,9 @@ class CostLineItemConfig(models.Model):
         return self.get_sole_allocator().display_name()
 
 
-class CostLineItemInterventionAllocation(models.Model):
+class CostLineItemInterventionAllocation(AnalysisData):
+    ANALYSIS_FIELD = "intervention_instance__analysis"
+
     cli_config = models.ForeignKey(
         "website.CostLineItemConfig",
         on_delete=models.CASCADE,
@@ -413,6 +477,48 @@ class CostLineItemInterventionAllocation(models.Model):
     def __str__(self):
         return f"{self.cli_config.cost_line_item} - {self.intervention_instance.label}: {self.allocation}"
 
+    @classmethod
+    def bulk_set_allocations(cls, analysis, allocations: dict[int, dict[int, Decimal | None]]) -> None:
+        """
+        Save a grid of allocations with a single upsert.
+
+        `allocations` maps cost line item ids to `{intervention_instance_id: allocation}`, as posted by the
+        Allocate steps.  Cells naming a cost line item or intervention instance outside `analysis` are ignored.
+        """
+        config_ids = dict(
+            CostLineItemConfig.objects.filter(
+                cost_line_item__analysis=analysis,
+                cost_line_item_id__in=allocations.keys(),
+            ).values_list("cost_line_item_id", "id")
+        )
+        intervention_instance_ids = set(analysis.interventioninstance_set.values_list("id", flat=True))
+        rows = [
+            {
+                "cli_config_id": config_ids[cost_line_item_id],
+                "intervention_instance_id": intervention_instance_id,
+                "allocation": allocation,
+            }
+            for cost_line_item_id, intervention_allocations in allocations.items()
+            if cost_line_item_id in config_ids
+            for intervention_instance_id, allocation in intervention_allocations.items()
+            if intervention_instance_id in intervention_instance_ids
+        ]
+        betterdb.bulk_upsert_dicts(
+            cls,
+            rows,
+            constraint="unique_cli_config_intervention",
+            update=["allocation"],
+        )
+        analysis.touch()
+
+    @classmethod
+    def bulk_clear_allocations(cls, analysis, cost_line_item_ids) -> None:
+        """Delete every allocation of the given cost line items of `analysis`."""
+        cls.objects.filter(
+            cli_config__cost_line_item__analysis=analysis,
+            cli_config__cost_line_item_id__in=cost_line_item_ids,
+        ).delete()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -32,6 +32,8 @@ def check_zero_args(arg_names):
             # If none of the specified arguments are zero, call the function
             return func(*args, **kwargs)
 
+        # So `OutputMetric.calculate_bulk` can apply the same check
+        wrapper.zero_arg_names = arg_names
         return wrapper
 
     return decorator
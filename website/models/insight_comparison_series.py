@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable
+
+from django.conf import settings
+from django.core.cache import cache
+
+from website.currency import format_currency, get_currency_locale
+from website.models import InsightComparisonData, Intervention
+from website.models.output_metric import OutputMetric
+from website.utils.model_cache import VersionStamp
+
+
+def chart_sort_key(point: dict) -> tuple:
+    """Comparison charts are sorted by the larger of a point's two costs, then by its grants."""
+    return (
+        max(float(point["raw_output_cost_all"] or 0), float(point["raw_output_cost_direct_only"] or 0)),
+        point["grants"],
+    )
+
+
+class InsightComparisonSeries:
+    """
+    Store of precomputed efficiency comparison chart series, one per intervention and output metric.
+
+    A series holds every `InsightComparisonData` point of the intervention, already formatted and sorted
+    with `chart_sort_key`, so the Insights pages only read it and splice in the current analysis' own
+    point.  Series live in the shared cache under a version stamp: the comparison data importer
+    rebuilds all of them, and editing a data point (or a country) sets a new stamp so stale series are
+    never read again.
+    """
+
+    def __init__(self):
+        self._stamp = VersionStamp("insight-comparison-series")
+
+    def invalidate(self):
+        self._stamp.invalidate()
+
+    def _key(self, version: int, intervention_id: int, output_metric_id: str) -> str:
+        return f"insight-comparison-series:{version}:{intervention_id}:{output_metric_id}"
+
+    def get(self, intervention_id: int, output_metric: OutputMetric) -> list[dict]:
+        return self.get_many([(intervention_id, output_metric)])[intervention_id, output_metric.id]
+
+    def get_many(self, pairs: Iterable[tuple[int, OutputMetric]]) -> dict[tuple[int, str], list[dict]]:
+        """The series of several (intervention id, output metric) pairs, building any missing ones in one query."""
+        version = self._stamp.get()
+        pairs_by_key = {
+            self._key(version, intervention_id, om.id): (intervention_id, om) for intervention_id, om in pairs
+        }
+        found = cache.get_many(pairs_by_key)
+        series = {
+            (intervention_id, om.id): found[key]
+            for key, (intervention_id, om) in pairs_by_key.items()
+            if key in found
+        }
+        missing = [pair for key, pair in pairs_by_key.items() if key not in found]
+        if missing:
+            series.update(self._build_and_store(version, missing))
+        return series
+
+    def rebuild(self):
+        """Build and store the series of every intervention with comparison data, e.g. after an import."""
+        self._stamp.invalidate()
+        interventions = Intervention.objects.filter(
+            id__in=InsightComparisonData.objects.values("intervention_id")
+        )
+        self._build_and_store(
+            self._stamp.get(),
+            [
+                (intervention.id, output_metric)
+                for intervention in interventions
+                for output_metric in intervention.output_metric_objects()
+            ],
+        )
+
+    def _build_and_store(
+        self, version: int, pairs: list[tuple[int, OutputMetric]]
+    ) -> dict[tuple[int, str], list[dict]]:
+        points_by_intervention = defaultdict(list)
+        for comparison_data_point in (
+            InsightComparisonData.objects.filter(
+                intervention_id__in={intervention_id for intervention_id, _ in pairs}
+            )
+            .select_related("country")
+            .order_by("id")
+        ):
+            points_by_intervention[comparison_data_point.intervention_id].append(comparison_data_point)
+
+        series = {
+            (intervention_id, output_metric.id): self._build_series(
+                output_metric, points_by_intervention[intervention_id]
+            )
+            for intervention_id, output_metric in pairs
+        }
+        cache.set_many(
+            {
+                self._key(version, intervention_id, output_metric_id): each
+                for (intervention_id, output_metric_id), each in series.items()
+            },
+            settings.INSIGHTS_CACHE_TIMEOUT,
+        )
+        return series
+
+    def _build_series(
+        self, output_metric: OutputMetric, comparison_data_points: list[InsightComparisonData]
+    ) -> list[dict]:
+        series = []
+        for comparison_data_point in comparison_data_points:
+            output_costs = comparison_data_point.output_costs.get(output_metric.id, {})
+            series.append(
+                {
+                    "label": make_insights_chart_label(comparison_data_point.country.name),
+                    "grants": ", ".join(comparison_data_point.grants_list()),
+                    "description": f"{output_metric.output_unit}: "
+                    f"{self._format_total_output(output_metric, comparison_data_point.parameters)}",
+                    "tooltip": comparison_data_point.name,
+                    "raw_output_cost_all": output_costs.get("all"),
+                    "raw_output_cost_direct_only": output_costs.get("direct_only"),
+                }
+            )
+        series.sort(key=chart_sort_key)
+        return series
+
+    @staticmethod
+    def _format_total_output(output_metric: OutputMetric, parameters: dict) -> str:
+        # We are by design using the default settings.ISO_CURRENCY_CODE to match the formatting on the
+        # _efficiency-comparison.html template, which used format_currency without a currency override
+        try:
+            total_output = output_metric.total_output(**parameters)
+            if output_metric.output_as_currency:
+                return format_currency(
+                    total_output,
+                    settings.ISO_CURRENCY_CODE,
+                    locale=get_currency_locale(settings.ISO_CURRENCY_CODE),
+                )
+            return f"{total_output:,.2f}"
+        except (ValueError, TypeError):
+            # This is likely an InsightComparisonData that is missing parameters
+            return "N/A"
+
+
+def make_insights_chart_label(string):
+    if len(string) > 25:
+        break_index = _insights_chart_label_find_break(string)
+        if break_index is not None:
+            return [
+                string[:break_index],
+                string[break_index:],
+            ]
+    return string
+
+
+def _insights_chart_label_find_break(string, start_index=0):
+    index_of_space = string.find(" ", start_index)
+    if index_of_space < 0:
+        return None
+    if index_of_space > 20:
+        return index_of_space
+    return _insights_chart_label_find_break(string, index_of_space + 1)
+
+
+insight_comparison_series = InsightComparisonSeries()
@@ -1,28 +1,170 @@
-import re
-from inspect import getsourcelines
+import ast
+import inspect
+import logging
+import operator
+import textwrap
+from collections.abc import Sequence
+from itertools import repeat
 
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
 from website.forms.fields import PositiveFixedDecimalField
 from website.models.decorators import check_zero_args
-
-
-def _get_source_ignoring_decorators(func, **kwargs):
-    # Get the source lines and starting line number
-    source_lines, starting_line_no = getsourcelines(func)
-
-    # Initialize an index to find the start of the function definition
-    index = 0
-
-    # Skip over decorator lines
-    for i, line in enumerate(source_lines):
-        if line.strip().startswith("def "):
-            index = i
-            break
-
-    # Return the source lines starting from the function definition
-    return source_lines[index:], starting_line_no + index
+from website.models.output_metric_formulas import EXCEL_FORMULA_TEMPLATES
+
+logger = logging.getLogger(__name__)
+
+
+_EXCEL_FORMULA_NODES = (
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.UAdd,
+    ast.USub,
+    ast.Load,
+)
+
+
+def _parse_calculate(calculate) -> tuple[str, ast.FunctionDef, ast.expr] | None:
+    """
+    Parse an OutputMetric's `calculate` method, returning its source, its definition and the expression it
+    returns.
+
+    Only expressions of arithmetic (+, -, *, /) on the method's arguments and numbers are returned, otherwise
+    this returns None.  None is also returned when the source isn't available, e.g. when only bytecode is
+    deployed.
+    """
+    try:
+        source = textwrap.dedent(inspect.getsource(inspect.unwrap(calculate)))
+    except (OSError, TypeError):
+        logger.warning("The source of %s isn't available to parse", calculate.__qualname__)
+        return None
+
+    function = ast.parse(source).body[0]
+    expression = next((node.value for node in function.body if isinstance(node, ast.Return)), None)
+    if expression is None:
+        return None
+
+    arguments = {arg.arg for arg in function.args.args[1:] + function.args.kwonlyargs}
+    if not _is_arithmetic(expression, arguments):
+        return None
+    return source, function, expression
+
+
+def _compile_excel_formula_template(calculate) -> str | None:
+    """
+    Translate the expression an OutputMetric's `calculate` method returns into an Excel formula template,
+    with a `{argument}` placeholder for each of its arguments, e.g.
+    "{cost_output_sum} / ({number_of_teachers} * {number_of_days_of_training})".
+
+    The template keeps the expression's own parentheses and spacing, joined onto one line.  Returns None
+    for anything `_parse_calculate` can't parse.
+    """
+    parsed = _parse_calculate(calculate)
+    if parsed is None:
+        return None
+    source, _function, expression = parsed
+
+    names = [node for node in ast.walk(expression) if isinstance(node, ast.Name)]
+    lines = source.splitlines()
+    # Replace the names last to first, so the positions of those before them stay put
+    for node in sorted(names, key=lambda node: (node.lineno, node.col_offset), reverse=True):
+        line = lines[node.lineno - 1]
+        lines[node.lineno - 1] = line[: node.col_offset] + f"{{{node.id}}}" + line[node.end_col_offset :]
+        if node.lineno == expression.end_lineno:
+            expression.end_col_offset += len(node.id) + 2 - (node.end_col_offset - node.col_offset)
+
+    expression_lines = lines[expression.lineno - 1 : expression.end_lineno]
+    expression_lines[-1] = expression_lines[-1][: expression.end_col_offset]
+    expression_lines[0] = expression_lines[0][expression.col_offset :]
+    return "".join(line.strip() for line in expression_lines)
+
+
+def _get_calculate_arguments(calculate) -> tuple[str, ...]:
+    """The named arguments of an OutputMetric's `calculate` method, in order, e.g. ("cost_output_sum", ...)"""
+    signature = inspect.signature(inspect.unwrap(calculate))
+    return tuple(
+        name
+        for name, parameter in list(signature.parameters.items())[1:]
+        if parameter.kind in (parameter.POSITIONAL_OR_KEYWORD, parameter.KEYWORD_ONLY)
+    )
+
+
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+def _is_arithmetic(expression: ast.expr, arguments) -> bool:
+    """Whether `expression` is only arithmetic (+, -, *, /) on `arguments` and numbers."""
+    for node in ast.walk(expression):
+        if isinstance(node, ast.Name):
+            if node.id not in arguments:
+                return False
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+                return False
+        elif not isinstance(node, _EXCEL_FORMULA_NODES):
+            return False
+    return True
+
+
+def _row_function(node: ast.expr, positions: dict[str, int]):
+    """A function of a row of arguments evaluating `node`, a validated arithmetic expression."""
+    if isinstance(node, ast.Name):
+        return operator.itemgetter(positions[node.id])
+    if isinstance(node, ast.Constant):
+        value = node.value
+        return lambda row: value
+    if isinstance(node, ast.UnaryOp):
+        unary, operand = _OPERATORS[type(node.op)], _row_function(node.operand, positions)
+        return lambda row: unary(operand(row))
+    binary = _OPERATORS[type(node.op)]
+    left, right = _row_function(node.left, positions), _row_function(node.right, positions)
+    return lambda row: binary(left(row), right(row))
+
+
+def _compile_bulk_calculate(template: str, arguments: tuple[str, ...], zero_arguments: tuple[str, ...]):
+    """
+    Compile an Excel formula `template` of `arguments` into a function evaluating it over columns of those
+    arguments, returning a list of the results.  Rows where any of `zero_arguments` is 0 give 0 (see
+    `check_zero_args`), and rows with an arithmetic error (e.g. division by zero) give None.
+
+    Returns None unless the template is arithmetic on `arguments` and numbers.
+    """
+    try:
+        expression = ast.parse(template.format_map({name: name for name in arguments}), mode="eval").body
+    except (KeyError, ValueError, SyntaxError):
+        return None
+    if not _is_arithmetic(expression, arguments):
+        return None
+
+    positions = {name: i for i, name in enumerate(arguments)}
+    evaluate = _row_function(expression, positions)
+    zero_positions = [positions[name] for name in zero_arguments]
+
+    def calculate_bulk(*columns):
+        results = []
+        for row in zip(*columns):
+            if any(row[i] == 0 for i in zero_positions):
+                results.append(0)
+                continue
+            try:
+                results.append(evaluate(row))
+            except ArithmeticError:
+                results.append(None)
+        return results
+
+    return calculate_bulk
 
 
 class OutputMetric:
@@ -32,6 +174,35 @@ class OutputMetric:
     metric_name: str | None = None
     metric_equation: str | None = None
     parameters: dict[str, PositiveFixedDecimalField] = {}
+    # `calculate` as an Excel formula template, see `_compile_excel_formula_template`.  Taken from
+    # `EXCEL_FORMULA_TEMPLATES`, which works without the source, or compiled when a subclass isn't there.
+    excel_formula_template: str | None = None
+    # `calculate` over columns of arguments, see `calculate_bulk`.  None when `excel_formula_template` isn't
+    # arithmetic on `calculate`'s arguments, and `calculate` is called for each row instead.
+    _calculate_bulk = None
+    _calculate_arguments: tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._calculate_arguments = _get_calculate_arguments(cls.calculate)
+        zero_arguments = getattr(cls.calculate, "zero_arg_names", ())
+        cls.excel_formula_template = EXCEL_FORMULA_TEMPLATES.get(cls.__name__)
+        cls._calculate_bulk = None
+        if cls.excel_formula_template is not None:
+            cls._calculate_bulk = _compile_bulk_calculate(
+                cls.excel_formula_template, cls._calculate_arguments, zero_arguments
+            )
+            if cls._calculate_bulk is None:
+                logger.warning("The Excel formula template of %s doesn't match its calculate", cls.__name__)
+                cls.excel_formula_template = None
+        if cls.excel_formula_template is None:
+            cls.excel_formula_template = _compile_excel_formula_template(cls.calculate)
+            if cls.excel_formula_template is not None:
+                cls._calculate_bulk = _compile_bulk_calculate(
+                    cls.excel_formula_template, cls._calculate_arguments, zero_arguments
+                )
+        if cls._calculate_bulk is not None:
+            cls._calculate_bulk = staticmethod(cls._calculate_bulk)
 
     @property
     def id(self) -> str:
@@ -46,6 +217,32 @@ class OutputMetric:
     def calculate(self, *args, **kwargs):
         pass
 
+    def calculate_bulk(self, cost_output_sum: Sequence, **parameters) -> list:
+        """
+        `calculate` for many rows at once, e.g.
+
+            metric.calculate_bulk(cost_output_sum=[1000, 2500], number_of_people=[10, 20])  # [100, 125]
+
+        Each parameter is a sequence with a value for each row of `cost_output_sum`, or a single value used
+        for every row.  Parameters the metric doesn't use are ignored, like `calculate`.  Returns the cost
+        per output of each row, or None for rows where the calculation fails, e.g. dividing by zero.
+        """
+        columns = []
+        for name in self._calculate_arguments:
+            value = cost_output_sum if name == "cost_output_sum" else parameters[name]
+            columns.append(value if isinstance(value, (list, tuple)) else repeat(value))
+
+        if self._calculate_bulk is not None:
+            return self._calculate_bulk(*columns)
+
+        results = []
+        for row in zip(*columns):
+            try:
+                results.append(self.calculate(**dict(zip(self._calculate_arguments, row))))
+            except ArithmeticError:
+                results.append(None)
+        return results
+
     def total_output(self, **kwargs):
         """
         Override this method for any OutputMetric with more than one parameter!
@@ -86,39 +283,13 @@ class OutputMetric:
         if any([param not in param_to_excel_map for param in cls.parameters]):
             return
 
-        # Run inspect method to convert function to a list of strings, one item for each line
-        calculate_equation = cls.calculate
-        equation_lines, _ = _get_source_ignoring_decorators(calculate_equation)
-
-        # Find the line where the return statement starts
-        # "return " is a reserved statement and should be a reliable locator
-        start_index = None
-        for i, eq_line in enumerate(equation_lines):
-            cleaned_eq_line = re.sub(r"\t\r\n", "", eq_line).strip()
-            if cleaned_eq_line.startswith("return "):
-                start_index = i
-                break
-        if start_index is None:
+        if cls.excel_formula_template is None:
             return
-
-        # Remove all new lines, tabs, etc.
-        cleaned_lines = [re.sub(r"\t\r\n", "", line).strip() for line in equation_lines[start_index:]]
-        equation_str = "".join(cleaned_lines)
-
-        # Get rid of the word "return" at the start of the string
-        equation_str = equation_str[6:].strip()
-
-        # Verify that the remaining equation_str only contains expected parameters
-        parameter_variables = list(param_to_excel_map.keys())
-        equation_variables = re.findall(r"\b\w+\b", equation_str)
-        invalid_variables = list(set(equation_variables).difference(parameter_variables))
-        if invalid_variables:
+        try:
+            equation_str = cls.excel_formula_template.format_map(param_to_excel_map)
+        except KeyError:
             return
 
-        # Substitute each parameter with its corresponding Excel value
-        for param, excel_value in param_to_excel_map.items():
-            equation_str = equation_str.replace(param, excel_value)
-
         # # Wrap in a check for division by zero:
         # This is the ideal version but only works on modern Excel
         # equation_str = f'IF(ERROR.TYPE({equation_str})=2, "Error: Division by zero", {equation_str})'
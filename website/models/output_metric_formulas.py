@@ -0,0 +1,46 @@
+"""
+The Excel formula template of each output metric's `calculate`, see `_compile_excel_formula_template`.
+
+Generated by `manage.py generate_excel_formula_templates` from the metrics' source, so that the templates
+don't depend on the source being deployed.  Don't edit by hand.
+"""
+
+EXCEL_FORMULA_TEMPLATES = {
+    "NumberOfCaregivers": "{cost_output_sum} / {number_of_caregivers}",
+    "NumberOfChildren": "{cost_output_sum} / {number_of_children}",
+    "NumberOfChildrenRecovered": "{cost_output_sum} / {number_of_children_recovered}",
+    "NumberOfChildrenTreated": "{cost_output_sum} / {number_of_children_treated}",
+    "NumberOfClients": "{cost_output_sum} / {number_of_clients}",
+    "NumberOfCommunities": "{cost_output_sum} / {number_of_communities}",
+    "NumberOfConsultations": "{cost_output_sum} / {number_of_consultations}",
+    "NumberOfCoupleYearsOfProtection": "{cost_output_sum} / {number_of_CYPs_provided}",
+    "NumberOfDaysOfTraining": "{cost_output_sum} / ({number_of_people} * {number_of_days_of_training})",
+    "NumberOfDoses": "{cost_output_sum} / {number_of_doses}",
+    "NumberOfGroups": "{cost_output_sum} / {number_of_groups}",
+    "NumberOfHectares": "{cost_output_sum} / {number_of_hectares}",
+    "NumberOfHouseholds": "{cost_output_sum} / {number_of_households}",
+    "NumberOfMeals": "{cost_output_sum} / {number_of_meals}",
+    "NumberOfOutputs": "{cost_output_sum} / {number_of_outputs}",
+    "NumberOfParticipants": "{cost_output_sum} / {number_of_participants}",
+    "NumberOfPeople": "{cost_output_sum} / {number_of_people}",
+    "NumberOfPersonYearsOfSanitationAccess": (
+        "{cost_output_sum} / ({number_of_people} * {number_of_years_a_latrine_can_last})"
+    ),
+    "NumberOfPersonYearsOfWaterAccess": (
+        "{cost_output_sum} / ({number_of_people} * {number_of_years_of_water_access})"
+    ),
+    "NumberOfTeacherDaysOfTraining": (
+        "{cost_output_sum} / ({number_of_teachers} * {number_of_days_of_training})"
+    ),
+    "NumberOfTeacherYearsOfSupport": (
+        "{cost_output_sum} / ({number_of_teachers} / {number_of_years_of_support})"
+    ),
+    "NumberOfWomen": "{cost_output_sum} / {number_of_women}",
+    "ValueOfBusinessGrantAmount": (
+        "({cost_output_sum} - {value_of_business_grant_amount}) / {value_of_business_grant_amount}"
+    ),
+    "ValueOfCashDistributed": (
+        "({cost_output_sum} - {value_of_cash_distributed}) / {value_of_cash_distributed}"
+    ),
+    "ValueOfItemsDistributed": "({cost_output_sum} - {value_items_distributed}) / {value_items_distributed}",
+}
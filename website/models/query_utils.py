@@ -1,27 +1,89 @@
-import inspect
 import logging
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import NamedTuple
 
 from django.conf import settings
 
+from website import stopwatch
+
 logger = logging.getLogger(__name__)
 
 
+class MissingPrefetch(Exception):
+    """Raised by `require_prefetch` on a cache miss when strict mode is on."""
+
+
+class PrefetchMissSite(NamedTuple):
+    filename: str
+    lineno: int
+    function: str
+    name: str
+
+    def __str__(self):
+        return f"`{self.name}` in {self.function} ({self.filename}:{self.lineno})"
+
+
+# Process-wide miss counts, keyed by call site.
+prefetch_misses: Counter[PrefetchMissSite] = Counter()
+
+_tl = threading.local()
+
+
+def is_strict() -> bool:
+    strict = getattr(_tl, "strict", None)
+    if strict is None:
+        return settings.REQUIRE_PREFETCH_STRICT
+    return strict
+
+
+@contextmanager
+def strict_prefetch(enabled: bool = True):
+    """Turn strict mode on (or off) inside the block, regardless of the setting."""
+    last = getattr(_tl, "strict", None)
+    _tl.strict = enabled
+    try:
+        yield
+    finally:
+        _tl.strict = last
+
+
+def top_prefetch_misses(n: int | None = None) -> list[tuple[PrefetchMissSite, int]]:
+    return prefetch_misses.most_common(n)
+
+
+def reset_prefetch_misses():
+    prefetch_misses.clear()
+
+
 def require_prefetch(obj, name: str):
     """
     Helper that ensures prefetches are being done for performance-critical parts of code.
-    Logs a warning if a prefetch is missing
+    Records the calling site of a missing prefetch (and raises in strict mode).
     """
 
     cache = getattr(obj, "_prefetched_objects_cache", None)
 
     if not cache or name not in cache:
-        caller_frame = inspect.stack()[1]
-        if settings.DEBUG:
-            logger.warning(
-                f"Missing prefetch for `{name}` on {obj.__class__.__name__}(pk={obj.pk}) called from `{caller_frame.function} in {caller_frame.filename}:{caller_frame.lineno}`. "
-                "Consider adding prefetch_related() to improve performance."
-            )
+        _record_miss(obj, name, sys._getframe(1))
         # Fall back to direct query
         return getattr(obj, name).all()
 
     return cache[name]
+
+
+def _record_miss(obj, name: str, frame):
+    code = frame.f_code
+    site = PrefetchMissSite(code.co_filename, frame.f_lineno, code.co_name, name)
+    prefetch_misses[site] += 1
+    stopwatch.current().record_prefetch_miss(site)
+
+    if is_strict():
+        raise MissingPrefetch(f"Missing prefetch for {site} on {obj.__class__.__name__}(pk={obj.pk})")
+    if settings.DEBUG and prefetch_misses[site] == 1:
+        logger.warning(
+            f"Missing prefetch for {site} on {obj.__class__.__name__}(pk={obj.pk}). "
+            "Consider adding prefetch_related() to improve performance."
+        )
@@ -1,7 +1,7 @@
-from functools import lru_cache
-
 from django.urls import reverse
 
+from website.utils.model_cache import model_cache
+
 from . import FieldLabelOverrides
 from .intervention import Intervention
 from .intervention_instance import InterventionInstance
@@ -23,7 +23,9 @@ def get_valid_intervention_parameter(an_intervention_instance: InterventionInsta
     return list(valid_parameters)
 
 
-def get_intervention_parameter_mapping() -> dict[int, list[str]]:
+@model_cache(Intervention)
+def get_intervention_parameter_mapping() -> dict[int, list[list[str]]]:
+    """The parameters of each intervention's output metrics, by intervention id and then metric."""
     mapping = {}
     for intervention in Intervention.objects.all():
         intervention_fields = []
@@ -85,9 +87,9 @@ def get_parameter_field_name(parameter_name) -> str:
     return f"parameter__{parameter_name}"
 
 
-@lru_cache(maxsize=1)
+@model_cache(FieldLabelOverrides)
 def _get_overrides() -> FieldLabelOverrides:
-    """Singleton lookup, cached until a save/delete clears it."""
+    """Singleton lookup, cached until a save/delete in any worker invalidates it."""
     return FieldLabelOverrides.get()
 
 
@@ -0,0 +1 @@
+from .renderer import PdfExportBusy, render_pdf
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import base64
+import fcntl
+import itertools
+import json
+import os
+import select
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+
+# Runs the browser with the kernel set to kill it when the web server process that started it dies, even by
+# SIGKILL (e.g. on gunicorn's worker timeout).  setpriv is part of util-linux, so on Linux only.
+DIE_WITH_PARENT = ["setpriv", "--pdeathsig", "KILL", "--"] if shutil.which("setpriv") else []
+# Gives the browser the ends of its DevTools pipe passed in its first two arguments as file descriptors 3
+# and 4, then runs it with the rest
+ATTACH_PIPE = [
+    sys.executable,
+    "-I",
+    "-c",
+    "import os, sys; fds = [int(fd) for fd in sys.argv[1:3]]; os.dup2(fds[0], 3); os.dup2(fds[1], 4); "
+    "[os.close(fd) for fd in fds]; os.execvp(sys.argv[3], sys.argv[3:])",
+]
+
+
+class DevToolsError(Exception):
+    """The browser could not be started or stopped answering over the DevTools protocol."""
+
+
+class DevToolsPipe:
+    """
+    The client end of Chrome's --remote-debugging-pipe: JSON messages, each followed by a NUL byte, written
+    to the browser's file descriptor 3 and read from its 4.  Unlike a debugging port, nothing else on the
+    host can connect to it.
+
+    `timeout` bounds each send or receive, like a socket's.
+    """
+
+    def __init__(self, write_fd: int, read_fd: int, timeout: float):
+        self.write_fd = write_fd
+        self.read_fd = read_fd
+        self.timeout = timeout
+        self._buffer = bytearray()
+        os.set_blocking(write_fd, False)
+        os.set_blocking(read_fd, False)
+
+    def settimeout(self, timeout: float):
+        self.timeout = timeout
+
+    def send(self, text: str):
+        data = memoryview(text.encode() + b"\0")
+        while data:
+            self._wait(self.write_fd, select.POLLOUT)
+            data = data[os.write(self.write_fd, data) :]
+
+    def recv(self) -> str:
+        scanned = 0
+        while (end := self._buffer.find(b"\0", scanned)) < 0:
+            scanned = len(self._buffer)
+            self._wait(self.read_fd, select.POLLIN)
+            chunk = os.read(self.read_fd, 1 << 16)
+            if not chunk:
+                raise DevToolsError("The browser closed its DevTools pipe")
+            self._buffer += chunk
+        message = self._buffer[:end].decode()
+        del self._buffer[: end + 1]
+        return message
+
+    def close(self):
+        for fd in (self.write_fd, self.read_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _wait(self, fd: int, event: int):
+        poll = select.poll()
+        poll.register(fd, event)
+        if not poll.poll(self.timeout * 1000):
+            raise TimeoutError("The browser did not answer over its DevTools pipe in time")
+
+
+class HeadlessBrowser:
+    """
+    A headless Chrome process kept running between renders and driven over its DevTools pipe.
+
+    Every render gets a fresh tab, which is closed afterwards, so renders don't share page state.
+
+    The browser runs in a process group of its own, which `close()` stops as a whole.  With setpriv it is
+    killed when the thread that started it exits, so also when its process dies, after which its helper
+    processes exit too.  gunicorn's sync workers start it from their one thread; a threaded development
+    server only keeps it for the request that started it.
+    """
+
+    STARTUP_TIMEOUT = 20
+    # How long to wait for a finished render's tab to close
+    CLOSE_TARGET_TIMEOUT = 5
+
+    def __init__(self, command: list[str], startup_timeout: float = STARTUP_TIMEOUT):
+        self.renders = 0
+        self._ids = itertools.count(1)
+        # Events received while waiting for a response, until `wait_for_event` looks for them
+        self._events = deque()
+        self._user_data_dir = tempfile.mkdtemp(prefix="pdf-export-")
+        commands_read, commands_write = os.pipe()
+        responses_read, responses_write = os.pipe()
+        self.connection = DevToolsPipe(commands_write, responses_read, timeout=startup_timeout)
+        # The browser's ends of the pipes are moved above 4 first, so that attaching one as descriptor 3 or
+        # 4 can't overwrite the other
+        browser_in = fcntl.fcntl(commands_read, fcntl.F_DUPFD_CLOEXEC, 5)
+        browser_out = fcntl.fcntl(responses_write, fcntl.F_DUPFD_CLOEXEC, 5)
+        for fd in (commands_read, responses_write):
+            os.close(fd)
+        try:
+            self.process = subprocess.Popen(
+                DIE_WITH_PARENT
+                + ATTACH_PIPE
+                + [str(browser_in), str(browser_out)]
+                + command
+                + [
+                    "--headless",
+                    "--remote-debugging-pipe",
+                    f"--user-data-dir={self._user_data_dir}",
+                    "--disable-gpu",
+                    "--run-all-compositor-stages-before-draw",
+                    "--force-device-scale-factor=1",
+                    "--no-sandbox",
+                    "--disable-dev-shm-usage",
+                    "--no-first-run",
+                    "about:blank",
+                ],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+                pass_fds=(browser_in, browser_out),
+            )
+        except OSError:
+            self.connection.close()
+            shutil.rmtree(self._user_data_dir, ignore_errors=True)
+            raise
+        finally:
+            os.close(browser_in)
+            os.close(browser_out)
+        try:
+            # A browser that fails to start closes the pipe, otherwise it answers
+            self.call("Browser.getVersion")
+        except (OSError, ValueError, DevToolsError) as e:
+            self.close()
+            raise DevToolsError(f"The browser did not start: {e!r}") from e
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def call(self, method: str, params: dict | None = None, session_id: str | None = None) -> dict:
+        message_id = next(self._ids)
+        message = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            message["sessionId"] = session_id
+        self.connection.send(json.dumps(message))
+        while True:
+            response = json.loads(self.connection.recv())
+            if "id" not in response:
+                self._events.append(response)
+            elif response["id"] == message_id:
+                if "error" in response:
+                    raise DevToolsError(f"{method} failed: {response['error']}")
+                return response.get("result", {})
+
+    def wait_for_event(self, method: str, session_id: str):
+        while True:
+            event = self._events.popleft() if self._events else json.loads(self.connection.recv())
+            if event.get("method") == method and event.get("sessionId") == session_id:
+                return event.get("params", {})
+
+    def print_to_pdf(self, html_path: str, timeout: float, virtual_time_budget: int = 10000) -> bytes:
+        """
+        Print a local HTML file, giving its scripts (e.g. the charts) `virtual_time_budget` milliseconds
+        of virtual time to settle first, like the command line --virtual-time-budget option.
+
+        After a failure the tab may be left open, and the browser should be closed.
+        """
+        self.connection.settimeout(timeout)
+        self._events.clear()
+        target_id = self.call("Target.createTarget", {"url": "about:blank"})["targetId"]
+        session_id = self.call("Target.attachToTarget", {"targetId": target_id, "flatten": True})["sessionId"]
+        self.call("Page.enable", session_id=session_id)
+        self.call("Page.navigate", {"url": Path(html_path).resolve().as_uri()}, session_id=session_id)
+        # Like --virtual-time-budget, start the budget once the navigation has started, so it isn't spent on
+        # the blank page
+        self.call(
+            "Emulation.setVirtualTimePolicy",
+            {"policy": "pauseIfNetworkFetchesPending", "budget": virtual_time_budget},
+            session_id=session_id,
+        )
+        self.wait_for_event("Emulation.virtualTimeBudgetExpired", session_id)
+        result = self.call(
+            "Page.printToPDF",
+            {"printBackground": True, "displayHeaderFooter": False, "preferCSSPageSize": True},
+            session_id=session_id,
+        )
+        pdf = base64.b64decode(result["data"])
+        self.renders += 1
+
+        # The PDF is ready, so a browser that doesn't close the tab promptly is only retired, not waited on
+        self.connection.settimeout(self.CLOSE_TARGET_TIMEOUT)
+        try:
+            self.call("Target.closeTarget", {"targetId": target_id})
+        except (OSError, ValueError, DevToolsError):
+            self.close()
+        return pdf
+
+    def close(self):
+        connection = getattr(self, "connection", None)
+        if connection is not None:
+            connection.close()
+        if self.process.poll() is None:
+            self._signal_group(signal.SIGTERM)
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._signal_group(signal.SIGKILL)
+                self.process.wait()
+        # Any helper processes the browser left behind
+        self._signal_group(signal.SIGKILL)
+        shutil.rmtree(self._user_data_dir, ignore_errors=True)
+
+    def _signal_group(self, sig: int):
+        try:
+            os.killpg(self.process.pid, sig)
+        except ProcessLookupError:
+            pass
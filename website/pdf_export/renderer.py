@@ -0,0 +1,240 @@
+import atexit
+import fcntl
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import structlog
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .devtools import DevToolsError, HeadlessBrowser
+
+logger = structlog.get_logger(__name__)
+
+
+class PdfExportBusy(Exception):
+    """Every render slot stayed taken for the whole queue timeout."""
+
+
+class HostSlots:
+    """
+    `limit` render slots shared by every process on the host, each an exclusive lock on a file in
+    `directory`, which is created readable by its owner only.  The kernel releases a slot when the process
+    holding it dies, however it dies.
+    """
+
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, directory: str, limit: int):
+        self.directory = directory
+        self.limit = limit
+
+    def acquire(self, timeout: float) -> int | None:
+        """Take a free slot, waiting up to `timeout` seconds.  Returns its file descriptor, or None."""
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        deadline = time.monotonic() + timeout
+        while True:
+            for i in range(self.limit):
+                fd = os.open(os.path.join(self.directory, f"slot-{i}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                else:
+                    return fd
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.POLL_INTERVAL)
+
+    def release(self, fd: int):
+        os.close(fd)
+
+
+class BrowserPool:
+    """
+    Up to `size` warm headless browsers, handed out to one render at a time.
+
+    `slot()` bounds how many renders run at once, whichever way they render: `size` in this process and,
+    with `host_slots`, `host_slots.limit` across the host.  The rest wait their turn for up to
+    `queue_timeout` seconds in all.  Browsers are started on demand, returned to the
+    pool after a successful render and replaced after `max_renders` renders, or as soon as one fails.
+    """
+
+    def __init__(
+        self,
+        command: list[str],
+        size: int,
+        queue_timeout: float,
+        max_renders: int = 100,
+        host_slots: HostSlots | None = None,
+    ):
+        self.command = command
+        self.size = size
+        self.queue_timeout = queue_timeout
+        self.max_renders = max_renders
+        self.host_slots = host_slots
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: list[HeadlessBrowser] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        """Wait for a free render slot, yielding how many seconds that took."""
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise PdfExportBusy()
+        try:
+            host_slot = None
+            if self.host_slots:
+                host_slot = self.host_slots.acquire(
+                    max(self.queue_timeout - (time.perf_counter() - start), 0)
+                )
+                if host_slot is None:
+                    raise PdfExportBusy()
+            try:
+                yield time.perf_counter() - start
+            finally:
+                if host_slot is not None:
+                    self.host_slots.release(host_slot)
+        finally:
+            self._slots.release()
+
+    def render(self, html_path: str, timeout: float) -> bytes:
+        """
+        Print `html_path` in a warm browser.  Raises DevToolsError if no browser could do it, including when
+        it timed out, so the caller can fall back to a one-off render.  `timeout` includes starting a browser
+        when none is idle.
+        """
+        deadline = time.monotonic() + timeout
+        browser = self._checkout(timeout)
+        try:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise DevToolsError("The browser took the whole render timeout to start")
+            pdf = browser.print_to_pdf(html_path, remaining)
+        except (OSError, ValueError, KeyError, DevToolsError) as e:
+            browser.close()
+            raise DevToolsError(f"Rendering in the warm browser failed: {e!r}") from e
+        self._checkin(browser)
+        return pdf
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for browser in idle:
+            browser.close()
+
+    def _checkout(self, startup_timeout: float) -> HeadlessBrowser:
+        with self._lock:
+            while self._idle:
+                browser = self._idle.pop()
+                if browser.is_alive():
+                    return browser
+                browser.close()
+        try:
+            return HeadlessBrowser(self.command, min(startup_timeout, HeadlessBrowser.STARTUP_TIMEOUT))
+        except OSError as e:
+            raise DevToolsError(f"Could not start the browser: {e!r}") from e
+
+    def _checkin(self, browser: HeadlessBrowser):
+        if browser.renders >= self.max_renders or not browser.is_alive():
+            browser.close()
+            return
+        with self._lock:
+            self._idle.append(browser)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> BrowserPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(
+                settings.PDF_EXPORT_COMMAND,
+                size=settings.PDF_EXPORT_POOL_SIZE,
+                queue_timeout=settings.PDF_EXPORT_QUEUE_TIMEOUT,
+                host_slots=(
+                    HostSlots(settings.PDF_EXPORT_LOCK_DIR, settings.PDF_EXPORT_HOST_LIMIT)
+                    if settings.PDF_EXPORT_HOST_LIMIT
+                    else None
+                ),
+            )
+            atexit.register(_pool.close)
+        return _pool
+
+
+@receiver(setting_changed)
+def _reset_pool(setting, **kwargs):
+    global _pool
+    if setting.startswith("PDF_EXPORT_"):
+        with _pool_lock:
+            if _pool is not None:
+                _pool.close()
+            _pool = None
+
+
+def render_pdf(html_path: str) -> bytes:
+    """
+    Render a local HTML file to PDF.
+
+    Renders through the warm browser pool, falling back to starting the browser just for this render
+    when the pool can't start or drive one.  Raises PdfExportBusy when no render slot frees up in time.
+
+    The render takes at most PDF_EXPORT_TIMEOUT seconds: the warm browser gets half of it, as a render that
+    hangs there should leave the fallback time to run.
+    """
+    timeout = settings.PDF_EXPORT_TIMEOUT
+    if not settings.PDF_EXPORT_POOL_SIZE:
+        return _render_with_subprocess(html_path, timeout)
+
+    pool = get_pool()
+    with pool.slot() as queued_seconds:
+        start = time.perf_counter()
+        try:
+            pdf = pool.render(html_path, timeout / 2)
+            renderer = "pool"
+        except DevToolsError as e:
+            logger.warning("PDF export falling back to a new browser process", error=str(e))
+            pdf = _render_with_subprocess(html_path, timeout - (time.perf_counter() - start))
+            renderer = "subprocess"
+        logger.info(
+            "PDF export rendered",
+            renderer=renderer,
+            queued_seconds=round(queued_seconds, 3),
+            render_seconds=round(time.perf_counter() - start, 3),
+            pdf_bytes=len(pdf),
+        )
+    return pdf
+
+
+def _render_with_subprocess(html_path: str, timeout: float) -> bytes:
+    fd, pdf_file = tempfile.mkstemp()
+    os.close(fd)
+    try:
+        subprocess.check_call(
+            settings.PDF_EXPORT_COMMAND
+            + [
+                "--headless",
+                f"--print-to-pdf={pdf_file}",
+                "--disable-gpu",
+                "--run-all-compositor-stages-before-draw",
+                "--virtual-time-budget=10000",
+                "--force-device-scale-factor=1",
+                "--no-sandbox",
+                "--disable-dev-shm-usage",
+                html_path,
+            ],
+            timeout=timeout,
+        )
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(pdf_file)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import rules
 from django.contrib.auth import get_user_model
+from django.db.models import Q, QuerySet
 
 from website.models import Analysis
 
@@ -22,7 +23,7 @@ def is_analysis_in_users_primary_countries(user: User, analysis: Analysis = None
     if user.is_anonymous:
         return False
     if analysis:
-        return analysis.country in user.primary_countries.all()
+        return analysis.country_id in user.permission_context.primary_country_ids
     return None
 
 
@@ -31,7 +32,7 @@ def is_analysis_in_users_secondary_countries(user: User, analysis: Analysis = No
     if user.is_anonymous:
         return False
     if analysis:
-        return analysis.country in user.secondary_countries.all()
+        return analysis.country_id in user.permission_context.secondary_country_ids
     return None
 
 
@@ -70,6 +71,36 @@ rules.add_perm(
 )
 rules.add_perm("website.delete_analysis", is_dioptra_admin | is_analysis_owner)
 
+# Whether each analysis permission above is granted in a user's primary and secondary countries
+ANALYSIS_PERMISSION_COUNTRIES = {
+    "website.change_analysis": (True, False),
+    "website.duplicate_analysis": (True, False),
+    "website.view_analysis": (True, True),
+    "website.delete_analysis": (False, False),
+}
+
+
+def filter_analyses_by_permission(user: User, perm: str, analyses: QuerySet | None = None) -> QuerySet:
+    """
+    The analyses in `analyses` (all of them by default) that `user` has `perm` on, by the same rules as
+    `user.has_perm(perm, analysis)`, filtered in the database rather than checking each one.
+    """
+    if analyses is None:
+        analyses = Analysis.objects.all()
+    if user.is_anonymous:
+        return analyses.none()
+    if is_dioptra_admin(user):
+        return analyses
+
+    in_primary_countries, in_secondary_countries = ANALYSIS_PERMISSION_COUNTRIES[perm]
+    context = user.permission_context
+    condition = Q(owner=user)
+    if in_primary_countries:
+        condition |= Q(country__in=context.primary_country_ids)
+    if in_secondary_countries:
+        condition |= Q(country__in=context.secondary_country_ids)
+    return analyses.filter(condition)
+
 
 class SiteRolePermissionBackend:
     """
@@ -185,6 +216,7 @@ class SiteRolePermissionBackend:
             "app_log.add_subscription",
             "app_log.change_subscription",
             "app_log.delete_subscription",
+            "app_log.add_applogentry",
             "app_log.change_applogentry",
         ],
     }
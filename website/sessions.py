@@ -8,6 +8,11 @@ class SessionIdleMiddleware:
     """
     Used automatically logout the user from Dioptra when they close the browser session,
     as well as after 1 hour of inactivity
+
+    The time of the last request is only saved to the session when it has moved on by at least
+    `SESSION_IDLE_GRANULARITY` seconds, so a burst of requests writes the session once rather than on every
+    request.  As the saved time can be up to that much behind the last request, users are logged out once
+    they've been idle for `SESSION_IDLE_TIMEOUT` seconds, and at most `SESSION_IDLE_GRANULARITY` seconds later.
     """
 
     def __init__(self, get_response):
@@ -15,18 +20,23 @@ class SessionIdleMiddleware:
 
     def __call__(self, request):
         if request.user.is_authenticated:
-            if "last_request" in request.session:
-                elapsed = time.time() - request.session["last_request"]
-                if elapsed > settings.SESSION_IDLE_TIMEOUT:
+            now = time.time()
+            last_request = request.session.get("last_request")
+            if last_request is not None:
+                elapsed = now - last_request
+                if elapsed > settings.SESSION_IDLE_TIMEOUT + settings.SESSION_IDLE_GRANULARITY:
                     del request.session["last_request"]
                     logout(request)
+                    last_request = None
 
             # Reset inactivity time counter
-            request.session["last_request"] = time.time()
+            if last_request is None or now - last_request >= settings.SESSION_IDLE_GRANULARITY:
+                request.session["last_request"] = now
 
             # This causes the session cookie to expire when the user's web browser is closed
             # https://docs.djangoproject.com/en/4.0/topics/http/sessions/#django.contrib.sessions.backends.base.SessionBase.set_expiry
-            request.session.set_expiry(0)
+            if not request.session.get_expire_at_browser_close():
+                request.session.set_expiry(0)
         else:
             if "last_request" in request.session:
                 del request.session["last_request"]
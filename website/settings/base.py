@@ -2,6 +2,7 @@ import copy
 import logging
 import os
 import sys
+import tempfile
 from decimal import Decimal
 
 from django.core.exceptions import ImproperlyConfigured
@@ -38,6 +39,31 @@ DATA_UPLOAD_MAX_NUMBER_FIELDS = None
 
 AWS_DEFAULT_REGION = os.getenv("AWS_DEFAULT_REGION", "us-west-2")
 
+# Each process keeps a psycopg pool of connections to each database, checked before being handed out, so
+# requests and commands don't pay for connecting.  Gunicorn workers handle one request at a time, so the
+# pools are small; they can be sized with e.g. DATABASE_POOL_MAX_SIZE and TRANSACTION_STORE_POOL_MAX_SIZE.
+# With DATABASE_POOL=false (e.g. behind PgBouncer), each thread keeps its own connection open for
+# DATABASE_CONN_MAX_AGE seconds instead.
+DATABASE_POOL = os.getenv("DATABASE_POOL", "true").lower() != "false"
+
+
+def database_connections(prefix: str, min_size: int, max_size: int) -> dict:
+    if not DATABASE_POOL:
+        return {"CONN_MAX_AGE": int(os.getenv("DATABASE_CONN_MAX_AGE", 60))}
+    return {
+        "OPTIONS": {
+            "pool": {
+                "min_size": int(os.getenv(f"{prefix}_POOL_MIN_SIZE", min_size)),
+                "max_size": int(os.getenv(f"{prefix}_POOL_MAX_SIZE", max_size)),
+                # Seconds to wait for a free connection before the request fails
+                "timeout": float(os.getenv(f"{prefix}_POOL_TIMEOUT", 10)),
+                # Seconds before an idle connection above `min_size` is closed
+                "max_idle": float(os.getenv(f"{prefix}_POOL_MAX_IDLE", 300)),
+            }
+        }
+    }
+
+
 # To configure databases, use environment variables,
 # or the settings files can configure individual pieces of the dict.
 # Something will always need to set the host and port.
@@ -49,6 +75,8 @@ DATABASES = {
         "PASSWORD": os.getenv("DATABASE_PASSWORD", None),
         "HOST": os.getenv("DATABASE_ENDPOINT", None),
         "PORT": os.getenv("DATABASE_PORT", None),
+        "CONN_HEALTH_CHECKS": True,
+        **database_connections("DATABASE", min_size=2, max_size=4),
     },
     "transaction_store": {
         "ENGINE": "django.db.backends.postgresql",
@@ -57,6 +85,8 @@ DATABASES = {
         "PASSWORD": os.getenv("TRANSACTION_STORE_PASSWORD"),
         "HOST": os.getenv("TRANSACTION_STORE_HOST"),
         "PORT": os.getenv("TRANSACTION_STORE_PORT"),
+        "CONN_HEALTH_CHECKS": True,
+        **database_connections("TRANSACTION_STORE", min_size=1, max_size=2),
     },
 }
 
@@ -400,6 +430,13 @@ CSRF_COOKIE_SAMESITE = "Strict"
 SESSION_COOKIE_SAMESITE = "Lax" if AUTH_PROVIDERS else "Strict"
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_IDLE_TIMEOUT = 3600  # In seconds
+# How far, in seconds, the time of a user's last request has to move on before it's saved to their session
+# again, so every request doesn't write the session.  Users are logged out up to this much after the timeout.
+SESSION_IDLE_GRANULARITY = int(os.getenv("SESSION_IDLE_GRANULARITY", 60))
+# Sessions are read from the database on every request.  "django.contrib.sessions.backends.cached_db" reads
+# them from the cache instead, but only use it once CACHES is a cache shared by every web server process:
+# with a per-process cache, a session logged out in one process stays valid in the others.
+SESSION_ENGINE = os.getenv("SESSION_ENGINE", "django.contrib.sessions.backends.db")
 
 ISO_CURRENCY_CODE = "USD"
 
@@ -411,7 +448,79 @@ STOPWATCH_LEVEL = int(os.getenv("STOPWATCH_LEVEL", 0))
 STOPWATCH_LOG_SQL = bool(os.getenv("STOPWATCH_LOG_SQL"))
 STOPWATCH_SLOW_SQL = float(os.getenv("STOPWATCH_LOG_SQL", "0.0"))
 
+# Raise instead of falling back to a query when `require_prefetch` misses.
+REQUIRE_PREFETCH_STRICT = bool(os.getenv("REQUIRE_PREFETCH_STRICT"))
+
+# How long the Insights page data of an analysis is cached, in seconds.  Entries are keyed by the
+# analysis' data version, so this only bounds how long stale entries linger.
+INSIGHTS_CACHE_TIMEOUT = 60 * 60 * 24
+
 PDF_EXPORT_COMMAND = ["/usr/bin/google-chrome-stable"]
+# Warm headless browsers kept per web server process for PDF export, which is also the number of exports
+# a process renders at once.  0 starts a new browser for every export, with no limit.
+#
+# Every process keeps its own browsers, idle ones included, and each takes a few hundred MB: a server runs
+# up to (web server processes) x PDF_EXPORT_POOL_SIZE of them, 6 with the 6 gunicorn workers in
+# docker/start-remote.sh.  The browsers die with the process that started them, e.g. when gunicorn kills
+# a worker on its timeout.
+PDF_EXPORT_POOL_SIZE = int(os.getenv("PDF_EXPORT_POOL_SIZE", 1))
+# How many exports run at once across all the web server processes on a server, through lock files in
+# PDF_EXPORT_LOCK_DIR, so that concurrent exports from every worker can't exhaust its memory.  0 for no
+# limit beyond each process' pool.  The directory is created private to the web server's user, and isn't
+# in the shared temporary directory, where another user could take the slots.
+PDF_EXPORT_HOST_LIMIT = int(os.getenv("PDF_EXPORT_HOST_LIMIT", 2))
+PDF_EXPORT_LOCK_DIR = os.getenv("PDF_EXPORT_LOCK_DIR", os.path.join(PROJECT_DIR, "pdf-export-slots"))
+# How long, in seconds, an export waits for a free render slot before giving up, and how long it may render,
+# warm browser and fallback together.  Exports render in the request, so the two add up to less than
+# gunicorn's --timeout in docker/start-remote.sh (90): a worker killed on its timeout can't answer the busy
+# page, and the user only sees a gateway error.
+PDF_EXPORT_QUEUE_TIMEOUT = int(os.getenv("PDF_EXPORT_QUEUE_TIMEOUT", 15))
+PDF_EXPORT_TIMEOUT = int(os.getenv("PDF_EXPORT_TIMEOUT", 60))
+
+# The cache has to be shared by every web server process, as cached values are invalidated (e.g. after an
+# admin edits the interventions in the menu) by writing to it.  The default file-based cache is shared by the
+# processes on one server; set CACHE_BACKEND and CACHE_LOCATION to share one across servers.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", os.path.join(tempfile.gettempdir(), "dioptra-cache")),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 10000))},
+    }
+}
+
+# Generated full cost model spreadsheets are kept here, per server, until the analysis changes or they are
+# evicted, least recently downloaded first, to keep the directory under SPREADSHEET_CACHE_MAX_SIZE bytes.
+SPREADSHEET_CACHE_DIR = os.getenv(
+    "SPREADSHEET_CACHE_DIR", os.path.join(tempfile.gettempdir(), "dioptra-spreadsheet-cache")
+)
+SPREADSHEET_CACHE_MAX_SIZE = int(os.getenv("SPREADSHEET_CACHE_MAX_SIZE", 500 * 1024 * 1024))
+
+APP_LOG = {
+    "notifiers": ["app_log.notifiers.SendEmailNotifier"],
+    # Subscriptions saved in one worker reach the others through the `CacheVersion` stamps
+    "version_stamp": "website.utils.model_cache.VersionStamp",
+}
+
+# App log entries are buffered and written in batches by a background thread: every APP_LOG_FLUSH_INTERVAL
+# seconds, after each request, or once APP_LOG_BATCH_SIZE entries are waiting.  An interval of 0 writes
+# each entry as it's logged.  A worker killed without running its exit handlers (SIGKILL, the OOM killer)
+# loses up to APP_LOG_FLUSH_INTERVAL seconds of entries; logins, logouts, failed logins and changes to
+# users' active status or passwords are written immediately.
+APP_LOG_FLUSH_INTERVAL = float(os.getenv("APP_LOG_FLUSH_INTERVAL", 5))
+APP_LOG_BATCH_SIZE = int(os.getenv("APP_LOG_BATCH_SIZE", 100))
+
+# `manage.py app_log__archive` moves app log entries older than APP_LOG_RETENTION_MONTHS whole months into a
+# gzipped file per month here, deleting them APP_LOG_ARCHIVE_BATCH_SIZE rows at a time.
+APP_LOG_ARCHIVE_DIR = os.getenv("APP_LOG_ARCHIVE_DIR", os.path.join(PROJECT_DIR, "app-log-archive"))
+APP_LOG_RETENTION_MONTHS = int(os.getenv("APP_LOG_RETENTION_MONTHS", 12))
+APP_LOG_ARCHIVE_BATCH_SIZE = int(os.getenv("APP_LOG_ARCHIVE_BATCH_SIZE", 5000))
+
+# `manage.py app_log__send_emails` sends subscription emails APP_LOG_EMAIL_BATCH_SIZE at a time over one
+# connection.  A failed email is retried after APP_LOG_EMAIL_RETRY_DELAY seconds, doubling each time, and
+# given up on after APP_LOG_EMAIL_MAX_ATTEMPTS tries.
+APP_LOG_EMAIL_BATCH_SIZE = int(os.getenv("APP_LOG_EMAIL_BATCH_SIZE", 100))
+APP_LOG_EMAIL_RETRY_DELAY = int(os.getenv("APP_LOG_EMAIL_RETRY_DELAY", 60))
+APP_LOG_EMAIL_MAX_ATTEMPTS = int(os.getenv("APP_LOG_EMAIL_MAX_ATTEMPTS", 5))
 
 DEFAULT_CATEGORY = os.getenv("DEFAULT_CATEGORY", "Materials & Activities")
 DEFAULT_COST_TYPE = os.getenv("DEFAULT_COST_TYPE", "Program Costs")
@@ -7,4 +7,18 @@ DATABASES["transaction_store"]["USER"] = "dioptra"
 DATABASES["transaction_store"]["PASSWORD"] = os.getenv("DATABASE_PASSWORD")
 DATABASES["transaction_store"]["PORT"] = "9005"
 
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+SPREADSHEET_CACHE_DIR = tempfile.mkdtemp(prefix="dioptra-test-spreadsheet-cache-")
+
+# Tests check for log entries (and the emails they trigger) straight after the action that logs them
+APP_LOG_FLUSH_INTERVAL = 0
+
+APP_LOG_ARCHIVE_DIR = tempfile.mkdtemp(prefix="dioptra-test-app-log-archive-")
+
+PDF_EXPORT_LOCK_DIR = tempfile.mkdtemp(prefix="dioptra-test-pdf-export-slots-")
+
 MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
+# Code that reads a relation through `require_prefetch` without prefetching it fails its tests
+REQUIRE_PREFETCH_STRICT = True
@@ -1,10 +1,62 @@
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from website.models import FieldLabelOverrides
-from website.models.utils import _get_overrides
+from website.models import (
+    AccountCodeDescription,
+    Analysis,
+    CostLineItem,
+    CostLineItemConfig,
+    CostLineItemInterventionAllocation,
+    Country,
+    InsightComparisonData,
+    Intervention,
+    InterventionGroup,
+    InterventionInstance,
+)
+from website.models.account_code_description import account_code_index
+from website.models.insight_comparison_series import insight_comparison_series
+from website.utils.fragment_cache import intervention_menu
 
 
-@receiver([post_save, post_delete], sender=FieldLabelOverrides)
-def _clear_cache(sender, **kwargs):
-    _get_overrides.cache_clear()
+@receiver([post_save, post_delete], sender=AccountCodeDescription)
+def _invalidate_account_code_index(sender, **kwargs):
+    account_code_index.invalidate()
+
+
+@receiver([post_save, post_delete], sender=InsightComparisonData)
+@receiver(post_save, sender=Country)
+def _invalidate_insight_comparison_series(sender, **kwargs):
+    insight_comparison_series.invalidate()
+
+
+@receiver([post_save, post_delete], sender=Intervention)
+@receiver([post_save, post_delete], sender=InterventionGroup)
+def _invalidate_intervention_menu(sender, **kwargs):
+    intervention_menu.invalidate()
+
+
+@receiver([post_save, post_delete], sender=InterventionInstance)
+def _mark_analysis_changed(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Analysis):
+        # The analysis itself is being deleted
+        return
+    Analysis.mark_changed(pk=instance.analysis_id)
+
+
+@receiver(post_save, sender=CostLineItem)
+@receiver(post_save, sender=CostLineItemConfig)
+@receiver(post_save, sender=CostLineItemInterventionAllocation)
+def _mark_analysis_data_changed(sender, instance, **kwargs):
+    # Deletes are marked by `AnalysisData`, see there
+    if sender is CostLineItem:
+        updated = Analysis.mark_changed(pk=instance.analysis_id)
+        if updated and CostLineItem.analysis.is_cached(instance):
+            instance.analysis.updated = updated
+    else:
+        sender.objects.filter(pk=instance.pk).mark_analyses_changed()
+
+
+@receiver(post_save, sender=Intervention)
+def _mark_intervention_analyses_changed(sender, instance, **kwargs):
+    # An intervention's name and output metrics are part of its analyses' results
+    Analysis.mark_changed(interventioninstance__intervention=instance.pk)
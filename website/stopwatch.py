@@ -16,7 +16,7 @@ However, generally you don't need to interact with a `Stopwatch` directly.
 import contextlib
 import threading
 import time
-from collections import deque
+from collections import Counter, deque
 from collections.abc import Callable
 from contextlib import ContextDecorator, contextmanager
 
@@ -45,6 +45,12 @@ class StopwatchLike:
     def click(self, event, **kwargs):
         pass
 
+    def record_prefetch_miss(self, site):
+        pass
+
+    def click_prefetch_misses(self):
+        pass
+
 
 def _log_time(**kwargs):
     _getlogger().bind(**kwargs).warning("stopwatch_click")
@@ -57,6 +63,7 @@ class Stopwatch(StopwatchLike):
         self.last_queries = len(connection.queries_log)
         self.record_time = record_time
         self.total_queries = 0
+        self.prefetch_misses = Counter()
 
     def click(self, event, **kwargs):
         now = time.perf_counter()
@@ -80,6 +87,19 @@ class Stopwatch(StopwatchLike):
             **kwargs,
         )
 
+    def record_prefetch_miss(self, site):
+        self.prefetch_misses[site] += 1
+
+    def click_prefetch_misses(self):
+        """Click once with the missing-prefetch counts gathered since activation, if there were any."""
+        if not self.prefetch_misses:
+            return
+        self.click(
+            "prefetch_misses",
+            prefetch_miss_count=sum(self.prefetch_misses.values()),
+            prefetch_misses={str(site): n for site, n in self.prefetch_misses.most_common()},
+        )
+
 
 class Noopwatch(StopwatchLike):
     def __init__(self, *args, **kwargs):
@@ -246,6 +266,7 @@ class RequestMiddleware:
 
         with trace(name=request.get_full_path()):
             response = self.get_response(request)
+            current().click_prefetch_misses()
 
         reset()
         return response
@@ -6,7 +6,8 @@ from django import template
 from django.db.models import Q
 
 from ombucore.admin.widgets import FlatpickrDateWidget
-from website.models import AccountCodeDescription, CostLineItem
+from website.models import CostLineItem
+from website.models.account_code_description import account_code_index
 from website.models.cost_line_item import CostLineItemInterventionAllocation
 
 register = template.Library()
@@ -19,10 +20,7 @@ def sum_cost_line_items(cost_line_items):
 
 @register.filter
 def contains_sensitive_data(cost_line_items):
-    return AccountCodeDescription.objects.filter(
-        account_code__in=(cost_line_item.account_code for cost_line_item in cost_line_items),
-        sensitive_data=True,
-    ).exists()
+    return account_code_index.any_sensitive(cost_line_item.account_code for cost_line_item in cost_line_items)
 
 
 @register.filter
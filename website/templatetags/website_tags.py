@@ -4,7 +4,6 @@ from functools import lru_cache
 
 import imagekit.templatetags.imagekit
 import structlog
-from babel.numbers import format_currency
 from django import template
 from django.conf import settings
 from django.template.loader import render_to_string
@@ -14,11 +13,13 @@ from django.utils.translation import gettext_lazy as _
 from website.currency import (
     currency_name as get_currency_name,
     currency_symbol as get_currency_symbol,
+    format_currency,
     get_currency_locale,
 )
 from website.models import CostLineItem, InterventionGroup, InterventionInstance
 from website.models.query_utils import require_prefetch
 from website.models.utils import load_field_label_override
+from website.utils.fragment_cache import FRAGMENT_CACHE_TIMEOUT, intervention_menu
 
 logger = structlog.get_logger(__name__)
 
@@ -60,6 +61,12 @@ def get_intervention_groups():
     return InterventionGroup.objects.prefetch_related("interventions").all()
 
 
+@register.simple_tag
+def intervention_menu_cache_key():
+    """The timeout and version stamp to cache the intervention menu with."""
+    return {"timeout": FRAGMENT_CACHE_TIMEOUT, "version": intervention_menu.get()}
+
+
 @register.filter
 def label_override(default_label, field_name):
     return _(load_field_label_override(field_name, default_label))
@@ -164,7 +171,7 @@ def get_allocation_by_intervention_instance_for_cost_line_item(
 ) -> str:
     allocation_item = None
     for each_allocation in require_prefetch(cli.config, "allocations"):
-        if each_allocation.intervention_instance == intervention_instance:
+        if each_allocation.intervention_instance_id == intervention_instance.id:
             allocation_item = each_allocation
             break
     if allocation_item and allocation_item.allocation:
@@ -12,6 +12,7 @@ from website.betterdb import (
 from website.betterdb.bulk_create_manytomany import bulk_create_manytomany
 from website.betterdb.bulk_update_dicts import build_update_sql
 from website.betterdb.bulk_upsert import build_upsert_sql
+from website.betterdb.sql import new_server_side_cursor
 from website.betterdb.transactions import Rollback, transaction
 from website.tests.betterdb.models import ExampleM2M, ExampleTree
 
@@ -62,13 +63,13 @@ class UpsertTests(TestCase):
             'INSERT INTO "tbl" ("x", "y") VALUES %s ON CONFLICT DO UPDATE SET ("x", "y") = (EXCLUDED."x", EXCLUDED."y")'
         )
         assert (self.build("tbl", [{"x": 1, "y": 2}, {"x": 3, "y": 4}], constraint="x", update=True)) == (
-            'INSERT INTO "tbl" ("x", "y") VALUES %s ON CONFLICT ("x") DO UPDATE SET ("y") = (EXCLUDED."y")'
+            'INSERT INTO "tbl" ("x", "y") VALUES %s ON CONFLICT ("x") DO UPDATE SET "y" = EXCLUDED."y"'
         )
         assert (self.build("tbl", [{"x": 1}, {"x": 3}], constraint="uniq", update=True)) == (
-            'INSERT INTO "tbl" ("x") VALUES %s ON CONFLICT ON CONSTRAINT "uniq" DO UPDATE SET ("x") = (EXCLUDED."x")'
+            'INSERT INTO "tbl" ("x") VALUES %s ON CONFLICT ON CONSTRAINT "uniq" DO UPDATE SET "x" = EXCLUDED."x"'
         )
         assert (self.build("tbl", [{"x": 1, "y": 2}, {"x": 3, "y": 4}], update=["x"])) == (
-            'INSERT INTO "tbl" ("x", "y") VALUES %s ON CONFLICT DO UPDATE SET ("x") = (EXCLUDED."x")'
+            'INSERT INTO "tbl" ("x", "y") VALUES %s ON CONFLICT DO UPDATE SET "x" = EXCLUDED."x"'
         )
 
     def test_errors_for_mismatched_keys(self):
@@ -217,3 +218,28 @@ class TestTransaction:
                     _ = 1 / 0
         assert ExampleTree.objects.all().count() == 1
         ExampleTree.objects.all().delete()
+
+    def test_reused_instance_joins_the_outer_transaction(self):
+        @transaction()
+        def create(name):
+            ExampleTree.objects.create(name=name)
+
+        create("x")
+        with pytest.raises(ZeroDivisionError):
+            with transaction():
+                create("y")
+                _ = 1 / 0
+        assert list(ExampleTree.objects.values_list("name", flat=True)) == ["x"]
+        ExampleTree.objects.all().delete()
+
+    def test_server_side_cursor_ends_with_its_transaction(self):
+        with new_server_side_cursor(connection) as (cursor, _):
+            cursor.execute("SELECT generate_series(1, 10)")
+            assert len(cursor.fetchmany(5)) == 5
+            with connection.cursor() as other:
+                other.execute("SELECT is_holdable FROM pg_cursors WHERE name != ''")
+                assert other.fetchall() == [(False,)]
+        assert not connection.in_atomic_block
+        with connection.cursor() as other:
+            other.execute("SELECT count(*) FROM pg_cursors")
+            assert other.fetchone() == (0,)
@@ -5,7 +5,9 @@ from decimal import Decimal
 import pytest
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 
+from app_log.subscriptions import subscription_index
 from website.workflows import AnalysisWorkflow
 from .factories import (
     AnalysisCostTypeCategoryFactory,
@@ -28,11 +30,23 @@ from ..models import (
     CostLineItem,
     Settings,
 )
+from ..models.account_code_description import account_code_index
 from ..models.cost_type import CostType
+from ..utils.model_cache import clear_model_caches
 
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def _reset_process_caches():
+    """Process-level caches outlive each test's rolled back transaction, so start every test clean."""
+    account_code_index.cache_clear()
+    subscription_index.cache_clear()
+    clear_model_caches()
+    cache.clear()
+    yield
+
+
 @pytest.fixture
 def defaults():
     Settings.objects.create()
@@ -1,8 +1,36 @@
-from unittest.mock import MagicMock
+import ast
+import operator
+import random
+from decimal import Decimal
+from unittest.mock import MagicMock, patch
 
+import pytest
+from django.core.management import call_command
 from django.test import TestCase
 
-from website.models.output_metric import OUTPUT_METRICS, OutputMetric
+from website.models.output_metric import OUTPUT_METRICS, OUTPUT_METRICS_BY_ID, OutputMetric
+
+_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+def _evaluate(node):
+    """Evaluate a parsed expression of arithmetic on numbers"""
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.BinOp):
+        return _OPERATORS[type(node.op)](_evaluate(node.left), _evaluate(node.right))
+    if isinstance(node, ast.UnaryOp):
+        return _OPERATORS[type(node.op)](_evaluate(node.operand))
+    raise ValueError(f"Not arithmetic: {ast.dump(node)}")
 
 
 class MockMetric(OutputMetric):
@@ -23,6 +51,11 @@ class MockMetric(OutputMetric):
         )
 
 
+class UnparseableMockMetric(MockMetric):
+    def calculate(self, cost_output_sum, number_of_people_served, **kwargs):
+        return max(cost_output_sum - number_of_people_served, 0) / number_of_people_served
+
+
 class MetricTestCase(TestCase):
     def setUp(self):
         super().setUp()
@@ -51,3 +84,84 @@ class MetricTestCase(TestCase):
         excel_formula = self.mock_metric.convert_calculate_to_excel_formula(param_to_excel_map)
         expected_formula = "IFERROR(SUM(A1, A2, A3) / ((B4 * B5) / B4), 0)"
         assert excel_formula == expected_formula
+
+    def test_excel_formulas_match_calculate(self):
+        rng = random.Random(0)
+        for metric in OUTPUT_METRICS + [self.mock_metric]:
+            for _ in range(5):
+                values = {"cost_output_sum": rng.uniform(1000, 100000)}
+                values.update({param: rng.uniform(1, 500) for param in metric.parameters})
+
+                excel_formula = metric.convert_calculate_to_excel_formula(
+                    {param: repr(value) for param, value in values.items()}
+                )
+                assert excel_formula.startswith("IFERROR(") and excel_formula.endswith(", 0)")
+                # Without the IFERROR wrapper, the formula is arithmetic Python evaluates the same way
+                excel_result = _evaluate(
+                    ast.parse(excel_formula[len("IFERROR(") : -len(", 0)")], mode="eval")
+                )
+                assert excel_result == pytest.approx(metric.calculate(**values)), metric.id
+
+    def test_excel_formula_templates_are_up_to_date(self):
+        call_command("generate_excel_formula_templates", "--check")
+
+    def test_excel_formula_templates_do_not_need_the_source(self):
+        with patch("website.models.output_metric.inspect.getsource", side_effect=OSError):
+
+            class NumberOfPeople(OutputMetric):
+                parameters = {"number_of_people": MagicMock(label="Number of people")}
+
+                def calculate(self, cost_output_sum, number_of_people, **kwargs):
+                    return cost_output_sum / number_of_people
+
+            class Unlisted(NumberOfPeople):
+                pass
+
+        assert NumberOfPeople.excel_formula_template == "{cost_output_sum} / {number_of_people}"
+        assert NumberOfPeople().calculate_bulk([10, 20], number_of_people=5) == [2, 4]
+        assert Unlisted.excel_formula_template is None
+
+    def test_excel_formula_templates_must_be_arithmetic_on_the_arguments(self):
+        templates = {"NumberOfPeople": "__import__('os').getcwd()"}
+        with patch.dict("website.models.output_metric.EXCEL_FORMULA_TEMPLATES", templates):
+
+            class NumberOfPeople(OutputMetric):
+                parameters = {"number_of_people": MagicMock(label="Number of people")}
+
+                def calculate(self, cost_output_sum, number_of_people, **kwargs):
+                    return cost_output_sum / number_of_people
+
+        # Compiled from the source instead
+        assert NumberOfPeople.excel_formula_template == "{cost_output_sum} / {number_of_people}"
+        assert NumberOfPeople().calculate_bulk([10, 20], number_of_people=5) == [2, 4]
+
+    def test_calculate_bulk_matches_calculate(self):
+        rng = random.Random(0)
+        metrics = list(OUTPUT_METRICS_BY_ID.values()) + [self.mock_metric, UnparseableMockMetric()]
+        assert UnparseableMockMetric._calculate_bulk is None
+        for metric in metrics:
+            # Include zeros, which some metrics check for and others divide by
+            choices = [Decimal(0), Decimal(rng.randint(1, 500)), Decimal(rng.randint(1000, 100000)) / 100]
+            rows = [
+                {
+                    "cost_output_sum": rng.choice(choices),
+                    **{param: rng.choice(choices) for param in metric.parameters},
+                }
+                for _ in range(50)
+            ]
+
+            expected = []
+            for row in rows:
+                try:
+                    expected.append(metric.calculate(**row))
+                except ArithmeticError:
+                    expected.append(None)
+            columns = {name: [row[name] for row in rows] for name in rows[0]}
+            assert metric.calculate_bulk(**columns) == expected, metric.id
+
+            # Parameters can be given once for every row, and ones the metric doesn't use are ignored
+            parameters = {param: Decimal(rng.randint(1, 500)) for param in metric.parameters}
+            costs = [Decimal(rng.randint(1000, 100000)) for _ in range(5)]
+            assert metric.calculate_bulk(costs, unused=Decimal(1), **parameters) == [
+                metric.calculate(cost_output_sum=cost, **parameters) for cost in costs
+            ], metric.id
@@ -0,0 +1,67 @@
+import pytest
+
+from website.models import AccountCodeDescription, CacheVersion
+from website.models.account_code_description import account_code_index
+from website.templatetags.analysis import contains_sensitive_data
+from website.tests.factories import AccountCodeDescriptionFactory, CostLineItemFactory
+from website.utils.model_cache import version_stamps
+
+
+@pytest.mark.django_db
+class TestAccountCodeIndex:
+    def test_lookups_do_not_query_once_loaded(self, django_assert_num_queries):
+        AccountCodeDescriptionFactory(account_code="100", sensitive_data=False)
+        AccountCodeDescriptionFactory(account_code="200", sensitive_data=True)
+
+        with django_assert_num_queries(2):
+            # The version stamps, then the index
+            account_code_index.as_map()
+        with django_assert_num_queries(0):
+            assert set(account_code_index.as_map()) == {"100", "200"}
+            assert account_code_index.is_sensitive("200")
+            assert not account_code_index.is_sensitive("100")
+            assert not account_code_index.is_sensitive("missing")
+
+    def test_edits_invalidate_the_index(self):
+        acd = AccountCodeDescriptionFactory(account_code="100", sensitive_data=False)
+        version = account_code_index.version
+        assert not account_code_index.is_sensitive("100")
+
+        acd.sensitive_data = True
+        acd.save()
+        assert account_code_index.version > version
+        assert account_code_index.is_sensitive("100")
+
+        acd.delete()
+        assert "100" not in account_code_index.as_map()
+
+    def test_edits_in_other_workers_invalidate_the_index(self):
+        AccountCodeDescriptionFactory(account_code="100", sensitive_data=False)
+        assert not account_code_index.is_sensitive("100")
+
+        # Another worker marks the code sensitive, which this one learns of at its next request
+        AccountCodeDescription.objects.filter(account_code="100").update(sensitive_data=True)
+        CacheVersion.objects.update_or_create(name="account-code-index", defaults={"version": 1})
+        assert not account_code_index.is_sensitive("100")
+        version_stamps.expire()
+        assert account_code_index.is_sensitive("100")
+
+    def test_bulk_writes_require_explicit_invalidation(self):
+        assert account_code_index.as_map() == {}
+        AccountCodeDescription.objects.bulk_create(
+            [AccountCodeDescription(account_code="300", sensitive_data=True)]
+        )
+        assert account_code_index.as_map() == {}
+
+        account_code_index.invalidate()
+        assert account_code_index.is_sensitive("300")
+
+    def test_contains_sensitive_data_filter(self, django_assert_num_queries):
+        AccountCodeDescriptionFactory(account_code="200", sensitive_data=True)
+        account_code_index.as_map()
+        plain = CostLineItemFactory.build(account_code="100")
+        sensitive = CostLineItemFactory.build(account_code="200")
+
+        with django_assert_num_queries(0):
+            assert not contains_sensitive_data([plain])
+            assert contains_sensitive_data([plain, sensitive])
@@ -178,7 +178,7 @@ class TestCostLineItemsFromTransactionsDB:
 
         assert analysis.cost_line_items.count() == 4
         assert analysis.cost_line_items.cost_type_category_items().count() == 3
-        assert len(analysis.special_country_cost_line_items) == 1
+        assert len(analysis.snapshot.special_country_cost_line_items) == 1
 
         for each_cost_line_item in analysis.cost_line_items.all():
             assert (
@@ -189,7 +189,7 @@ class TestCostLineItemsFromTransactionsDB:
             assert not standard_cost_line_item.is_special_lump_sum
             assert standard_cost_line_item.country_code == country.code
 
-        for special_cost_line_item in analysis.special_country_cost_line_items:
+        for special_cost_line_item in analysis.snapshot.special_country_cost_line_items:
             assert special_cost_line_item.is_special_lump_sum
             assert special_cost_line_item.country_code == special_country.code
 
@@ -232,13 +232,13 @@ class TestCostLineItemsFromTransactionsDB:
 
         assert analysis.cost_line_items.count() == 4
         assert analysis.cost_line_items.cost_type_category_items().count() == 3
-        assert len(analysis.special_country_cost_line_items) == 1
+        assert len(analysis.snapshot.special_country_cost_line_items) == 1
 
         for standard_cost_line_item in analysis.cost_line_items.cost_type_category_items():
             assert not standard_cost_line_item.is_special_lump_sum
             assert standard_cost_line_item.country_code == country.code
 
-        for special_cost_line_item in analysis.special_country_cost_line_items:
+        for special_cost_line_item in analysis.snapshot.special_country_cost_line_items:
             assert special_cost_line_item.is_special_lump_sum
             assert special_cost_line_item.country_code == special_country.code
 
@@ -519,7 +519,7 @@ class TestCostLineItemsFromTransactionsFile:
 
         assert analysis.cost_line_items.count() == 4
         assert analysis.cost_line_items.cost_type_category_items().count() == 3
-        assert len(analysis.special_country_cost_line_items) == 1
+        assert len(analysis.snapshot.special_country_cost_line_items) == 1
 
         for each_cost_line_item in analysis.cost_line_items.all():
             assert (
@@ -530,7 +530,7 @@ class TestCostLineItemsFromTransactionsFile:
             assert not standard_cost_line_item.is_special_lump_sum
             assert standard_cost_line_item.country_code == country.code
 
-        for special_cost_line_item in analysis.special_country_cost_line_items:
+        for special_cost_line_item in analysis.snapshot.special_country_cost_line_items:
             assert special_cost_line_item.is_special_lump_sum
             assert special_cost_line_item.country_code == special_country.code
 
@@ -590,12 +590,12 @@ class TestCostLineItemsFromTransactionsFile:
 
         assert analysis.cost_line_items.count() == 4
         assert analysis.cost_line_items.cost_type_category_items().count() == 3
-        assert len(analysis.special_country_cost_line_items) == 1
+        assert len(analysis.snapshot.special_country_cost_line_items) == 1
 
         for standard_cost_line_item in analysis.cost_line_items.cost_type_category_items():
             assert not standard_cost_line_item.is_special_lump_sum
             assert standard_cost_line_item.country_code == country.code
 
-        for special_cost_line_item in analysis.special_country_cost_line_items:
+        for special_cost_line_item in analysis.snapshot.special_country_cost_line_items:
             assert special_cost_line_item.is_special_lump_sum
             assert special_cost_line_item.country_code == special_country.code
@@ -1,5 +1,8 @@
 import datetime
 import io
+import socketserver
+import threading
+import time
 
 import pytest
 from django.apps import apps
@@ -7,13 +10,19 @@ from django.contrib.contenttypes.models import ContentType
 from django.core import mail
 from django.core.exceptions import ImproperlyConfigured
 from django.core.management import call_command
-from django.db import connection
+from django.db import connection, transaction
 from django.utils import timezone
 
-from app_log.logger import create_entry, get_subscriptions_for_entry, log
+from app_log.archive import log_archive
+from app_log.logger import build_entry, create_entry, get_subscriptions_for_entry, log
 from app_log.management.commands import app_log__send_emails
 from app_log.models import AppLogEntry, Email, Subscription
 from app_log.notifiers import Notifier, SendEmailNotifier
+from app_log.facets import log_facets
+from app_log.subscriptions import subscription_index
+from app_log.writer import LogWriter
+from website.models import CacheVersion
+from website.utils.model_cache import version_stamps
 from .models import ExampleObject1, ExampleObject2
 from ..factories import UserFactory
 
@@ -243,6 +252,188 @@ class TestGetSubscriptions:
         assert len(subscriptions) == 0
 
 
+@pytest.mark.django_db
+class TestSubscriptionIndex:
+    def test_matches_without_querying_until_subscriptions_change(self, django_assert_num_queries):
+        entry = AppLogEntry(actor_name="steve", action="Updated", message="Steve updated it")
+        subscription = Subscription.objects.create(notifier="placeholder", action="Updated")
+        Subscription.objects.create(notifier="placeholder", action="Deleted")
+
+        assert subscription_index.match(entry) == [subscription]
+        with django_assert_num_queries(0):
+            assert subscription_index.match(entry) == [subscription]
+
+        catch_all = Subscription.objects.create(notifier="placeholder", message_keywords="STEVE")
+        assert subscription_index.match(entry) == [catch_all, subscription]
+
+        subscription.delete()
+        assert subscription_index.match(entry) == [catch_all]
+
+    def test_edits_in_other_workers_invalidate_the_index(self):
+        entry = AppLogEntry(actor_name="steve", action="Updated", message="Steve updated it")
+        assert subscription_index.match(entry) == []
+
+        # Another worker adds a subscription, which this one learns of at its next request
+        [subscription] = Subscription.objects.bulk_create([Subscription(notifier="placeholder")])
+        CacheVersion.objects.update_or_create(name="app_log.subscriptions", defaults={"version": 1})
+        assert subscription_index.match(entry) == []
+        version_stamps.expire()
+        assert subscription_index.match(entry) == [subscription]
+
+
+@pytest.mark.django_db
+class TestLogFacets:
+    def test_choices_are_cached_and_kept_up_to_date(self, django_assert_num_queries):
+        user = UserFactory(name="steve")
+        log(user, "Updated", user, "Steve updated himself.")
+        assert AppLogEntry.get_action_choices() == [("Updated", "Updated")]
+
+        with django_assert_num_queries(0):
+            assert AppLogEntry.get_actor_choices() == [("steve", "steve")]
+        log("System", "Created", None, "Created something.")
+        with django_assert_num_queries(0):
+            assert AppLogEntry.get_action_choices() == [("Created", "Created"), ("Updated", "Updated")]
+            assert AppLogEntry.get_actor_choices() == [("steve", "steve"), ("System", "System")]
+            assert log_facets.get()["content_type_id"] == [ContentType.objects.get_for_model(user).pk]
+
+        AppLogEntry.objects.filter(action="Created").delete()
+        log_facets.invalidate()
+        assert AppLogEntry.get_action_choices() == [("Updated", "Updated")]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLogWriter:
+    def test_entries_are_written_in_one_batch(self, settings, django_assert_num_queries):
+        settings.APP_LOG_FLUSH_INTERVAL = 60
+        writer = LogWriter()
+        for i in range(10):
+            writer.add(build_entry("System", "Logged In", message=f"User {i} logged in."))
+        assert AppLogEntry.objects.count() == 0
+
+        # One insert (with its BEGIN and COMMIT), then the version stamps and the (empty) subscription index
+        with django_assert_num_queries(5):
+            writer.flush()
+        assert AppLogEntry.objects.count() == 10
+        writer.close()
+
+    def test_immediate_entries_are_written_as_they_are_added(self, settings):
+        settings.APP_LOG_FLUSH_INTERVAL = 60
+        writer = LogWriter()
+        writer.add(build_entry("System", "Updated", message="Buffered."))
+        writer.add(build_entry("System", "Logged In", message="steve logged in."), immediate=True)
+
+        assert list(AppLogEntry.objects.values_list("message", flat=True)) == ["steve logged in."]
+        writer.close()
+        assert AppLogEntry.objects.count() == 2
+
+    def test_entries_are_buffered_when_their_transaction_commits(self, settings):
+        settings.APP_LOG_FLUSH_INTERVAL = 60
+        writer = LogWriter()
+        with transaction.atomic():
+            user = UserFactory(name="steve")
+            writer.add(build_entry(user, "Created", message="steve signed up."))
+            # Not buffered until the transaction commits
+            writer.flush()
+        assert AppLogEntry.objects.count() == 0
+
+        writer.flush()
+        assert AppLogEntry.objects.get().actor_user == user
+        writer.close()
+
+    def test_entries_of_rolled_back_transactions_are_dropped(self, settings):
+        settings.APP_LOG_FLUSH_INTERVAL = 60
+        writer = LogWriter()
+        with pytest.raises(ValueError), transaction.atomic():
+            writer.add(build_entry("System", "Updated", message="Buffered."))
+            writer.add(build_entry("System", "Logged In", message="steve logged in."), immediate=True)
+            raise ValueError()
+
+        writer.close()
+        assert AppLogEntry.objects.count() == 0
+
+    def test_full_batches_are_written_in_the_background(self, settings):
+        settings.APP_LOG_FLUSH_INTERVAL = 60
+        settings.APP_LOG_BATCH_SIZE = 5
+        writer = LogWriter()
+        for i in range(5):
+            writer.add(build_entry("System", "Logged In", message=f"User {i} logged in."))
+
+        for _ in range(100):
+            if AppLogEntry.objects.count() == 5:
+                break
+            time.sleep(0.05)
+        assert AppLogEntry.objects.count() == 5
+        writer.close()
+
+    def test_no_entries_are_lost_on_shutdown(self, settings):
+        settings.APP_LOG_FLUSH_INTERVAL = 60
+        settings.APP_LOG_BATCH_SIZE = 100
+        user = UserFactory(name="steve")
+        Subscription.objects.create(
+            owner=user, notifier="app_log.notifiers.SendEmailNotifier", actor_name="steve"
+        )
+        writer = LogWriter()
+        for i in range(250):
+            writer.add(build_entry(user, "Updated", message=f"Update {i}."))
+
+        # What `atexit` runs
+        writer.close()
+        assert AppLogEntry.objects.count() == 250
+        assert Email.objects.count() == 250
+
+        # Anything logged after that is written straight away
+        writer.add(build_entry(user, "Logged Out"))
+        assert AppLogEntry.objects.count() == 251
+
+
+@pytest.mark.django_db
+class TestLogArchive:
+    def log_at(self, timestamp, count):
+        for i in range(count):
+            entry = build_entry("System", "Logged In", message=f"User {i} logged in.")
+            entry.timestamp = timestamp
+            entry.save()
+
+    def test_old_months_are_archived_and_can_be_restored(self, settings, tmp_path):
+        settings.APP_LOG_ARCHIVE_DIR = str(tmp_path)
+        settings.APP_LOG_ARCHIVE_BATCH_SIZE = 2
+        now = timezone.localtime()
+        two_years_ago = now.replace(year=now.year - 2, day=15, microsecond=123456)
+        self.log_at(two_years_ago, 3)
+        self.log_at(two_years_ago.replace(day=1, hour=0, minute=0, second=0, microsecond=0), 2)
+        self.log_at(now, 4)
+
+        call_command("app_log__archive", "--retention-months", "12", stdout=io.StringIO())
+        assert AppLogEntry.objects.count() == 4
+        month = (two_years_ago.year, two_years_ago.month)
+        assert log_archive.archives() == [month]
+        archived = list(log_archive.read(*month))
+        assert len(archived) == 5
+        assert archived[-1].timestamp == two_years_ago
+        assert archived[-1].message == "User 2 logged in."
+
+        assert log_archive.restore(*month) == 5
+        assert AppLogEntry.objects.count() == 9
+        assert AppLogEntry.objects.filter(timestamp=two_years_ago).count() == 3
+
+        # Archiving a restored month again writes each entry once
+        self.log_at(two_years_ago, 1)
+        call_command("app_log__archive", "--retention-months", "12", stdout=io.StringIO())
+        assert AppLogEntry.objects.count() == 4
+        assert len(list(log_archive.read(*month))) == 6
+
+    def test_dry_run_archives_nothing(self, settings, tmp_path):
+        settings.APP_LOG_ARCHIVE_DIR = str(tmp_path)
+        now = timezone.localtime()
+        self.log_at(now.replace(year=now.year - 1, day=1) - datetime.timedelta(days=40), 1)
+
+        out = io.StringIO()
+        call_command("app_log__archive", "--retention-months", "1", "--dry-run", stdout=out)
+        assert "Would archive" in out.getvalue()
+        assert AppLogEntry.objects.count() == 1
+        assert log_archive.archives() == []
+
+
 @pytest.mark.django_db
 @pytest.mark.usefixtures("reload_app_log_notifiers")
 class TestNotifier:
@@ -367,6 +558,131 @@ class TestSendEmailsManagementCommand:
         assert "No emails to send." in output
 
 
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """A local SMTP server that accepts mail for any address but `REJECTED`, counting connections."""
+
+    REJECTED = "rejected@dioptratool.org"
+    daemon_threads = True
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = []
+        super().__init__(("127.0.0.1", 0), SMTPStandInHandler)
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+
+class SMTPStandInHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply("220 localhost")
+        while line := self.rfile.readline().decode().strip():
+            command = line[:4].upper()
+            if command == "QUIT":
+                self.reply("221 Bye")
+                return
+            if command == "RCPT" and SMTPStandIn.REJECTED in line:
+                self.reply("550 No such user")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = b""
+                while not data.endswith(b"\r\n.\r\n"):
+                    data += self.rfile.readline()
+                self.server.messages.append(data)
+                self.reply("250 OK")
+            else:
+                self.reply("250 OK")
+
+
+@pytest.mark.django_db
+class TestSendEmailsInBatches:
+    @pytest.fixture
+    def smtp_server(self, settings):
+        with SMTPStandIn() as server:
+            settings.EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
+            settings.EMAIL_HOST, settings.EMAIL_PORT = server.server_address
+            settings.EMAIL_USE_TLS = False
+            yield server
+
+    def queue(self, count, to_address="test@dioptratool.org"):
+        for i in range(count):
+            Email.objects.create(
+                subject=f"Email {i}", to_address=to_address, body="Body", body_html="<p>Body</p>"
+            )
+
+    def test_one_connection_per_batch(self, settings, smtp_server):
+        settings.APP_LOG_EMAIL_BATCH_SIZE = 2
+        self.queue(5)
+
+        assert SendEmailNotifier().send_emails() == {"sent": 5, "not_sent": 0}
+        assert smtp_server.connections == 3
+        assert len(smtp_server.messages) == 5
+        assert Email.objects.count() == 0
+
+    def test_failed_emails_are_retried_later(self, settings, smtp_server):
+        settings.APP_LOG_EMAIL_RETRY_DELAY = 60
+        settings.APP_LOG_EMAIL_MAX_ATTEMPTS = 2
+        self.queue(2)
+        self.queue(1, to_address=SMTPStandIn.REJECTED)
+
+        assert SendEmailNotifier().send_emails() == {"sent": 2, "not_sent": 1}
+        failed = Email.objects.get()
+        assert failed.attempts == 1
+        assert failed.next_attempt_at > timezone.now() + datetime.timedelta(seconds=50)
+
+        # Not due yet
+        assert SendEmailNotifier().send_emails() == {"sent": 0, "not_sent": 0}
+
+        Email.objects.update(next_attempt_at=timezone.now())
+        assert SendEmailNotifier().send_emails() == {"sent": 0, "not_sent": 1}
+        failed.refresh_from_db()
+        assert failed.attempts == 2
+        assert failed.next_attempt_at > timezone.now() + datetime.timedelta(seconds=110)
+
+        # Given up on
+        Email.objects.update(next_attempt_at=timezone.now())
+        assert SendEmailNotifier().send_emails() == {"sent": 0, "not_sent": 0}
+        assert len(smtp_server.messages) == 2
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentSendEmails:
+    def test_emails_claimed_by_another_sender_are_skipped(self):
+        claimed = Email.objects.create(subject="Claimed", to_address="a@dioptratool.org", body="Body")
+        Email.objects.create(subject="Unclaimed", to_address="b@dioptratool.org", body="Body")
+        locked, release = threading.Event(), threading.Event()
+
+        def other_sender():
+            try:
+                with transaction.atomic():
+                    Email.objects.select_for_update().get(pk=claimed.pk)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=other_sender)
+        thread.start()
+        try:
+            assert locked.wait(10)
+            mail.outbox.clear()
+            assert SendEmailNotifier().send_emails() == {"sent": 1, "not_sent": 0}
+            assert [message.subject for message in mail.outbox] == ["Unclaimed"]
+        finally:
+            release.set()
+            thread.join()
+        assert list(Email.objects.values_list("subject", flat=True)) == ["Claimed"]
+
+
 class MockNotifier(Notifier):
     pass
 
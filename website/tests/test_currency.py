@@ -0,0 +1,61 @@
+from decimal import Decimal
+
+import pytest
+from babel.numbers import format_currency as babel_format_currency
+
+from website.currency import currency_formatter, format_currency
+
+VALUES = [
+    0,
+    1,
+    -1,
+    123,
+    0.005,
+    -0.005,
+    2.675,
+    1e-9,
+    10**15,
+    1234567.891,
+    Decimal("0.125"),
+    Decimal("-12.345"),
+    Decimal("1E+20"),
+    Decimal("NaN"),
+    float("inf"),
+    float("-inf"),
+]
+
+
+def _outcome(format_function, value, currency, locale, options):
+    # Babel raises for some values (e.g. NaN with currency names), so the exceptions must match too
+    try:
+        return format_function(value, currency, locale=locale, **options)
+    except Exception as e:
+        return type(e)
+
+
+@pytest.mark.parametrize("currency", ["USD", "EUR", "JPY", "BHD"])
+@pytest.mark.parametrize("locale", ["en_US", "fr_FR", "de_CH", "ar_EG", "hi_IN"])
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"format_type": "accounting"},
+        {"format": "#,##0.###¤"},
+        {"currency_digits": False},
+        {"group_separator": False},
+        {"decimal_quantization": False},
+        {"format_type": "name"},
+    ],
+)
+def test_matches_babel(currency, locale, options):
+    for value in VALUES:
+        assert _outcome(format_currency, value, currency, locale, options) == _outcome(
+            babel_format_currency, value, currency, locale, options
+        )
+
+
+def test_formats_are_compiled_once():
+    assert currency_formatter("USD", "en_US") is currency_formatter("USD", "en_US")
+    assert currency_formatter("USD", "en_US").is_compiled
+    assert not currency_formatter("USD", "en_US", format_type="name").is_compiled
+    assert format_currency(Decimal("-1234.5"), "USD") == "-$1,234.50"
@@ -0,0 +1,20 @@
+import pytest
+from django.urls import reverse
+
+
+@pytest.mark.django_db
+class TestEmailTwoFactorMiddleware:
+    def start_login(self, client, a_user):
+        session = client.session
+        session["email_2fa_user_id"] = str(a_user.pk)
+        session.save()
+
+    def test_half_finished_login_is_kept_on_the_two_factor_page(self, client, a_user):
+        self.start_login(client, a_user)
+        assert client.get(reverse("two-factor-authenticate")).status_code == 200
+        assert client.session["email_2fa_user_id"] == str(a_user.pk)
+
+    def test_half_finished_login_is_reset_by_loading_another_page(self, client, a_user):
+        self.start_login(client, a_user)
+        client.get(reverse("account_login"))
+        assert "email_2fa_user_id" not in client.session
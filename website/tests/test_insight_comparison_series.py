@@ -0,0 +1,111 @@
+from pathlib import Path
+
+import pytest
+
+from website.data_loading.insight_comparison_data import InsightComparisonDataImporter
+from website.models import Country, Intervention
+from website.models.insight_comparison_series import insight_comparison_series
+from website.tests.factories import (
+    CountryFactory,
+    InsightComparisonDataFactory,
+    InterventionFactory,
+)
+from website.views.analysis.steps.insights_context import InsightsContextBuilder
+
+test_data_dir = Path(__file__).resolve().parent / "test_data"
+
+
+@pytest.fixture
+def intervention():
+    return InterventionFactory(name="My Test Intervention", output_metrics=["ValueOfCashDistributed"])
+
+
+def _add_comparison_data(
+    intervention, name, all_cost, direct_only_cost, output_metric_id="ValueOfCashDistributed"
+):
+    country = Country.objects.filter(code="JO").first() or CountryFactory(name="Jordan", code="JO")
+    return InsightComparisonDataFactory(
+        name=name,
+        country=country,
+        grants="GRANT123",
+        intervention=intervention,
+        parameters={"value_of_cash_distributed": 123.45},
+        output_costs={output_metric_id: {"all": all_cost, "direct_only": direct_only_cost}},
+    )
+
+
+@pytest.mark.django_db
+class TestInsightComparisonSeries:
+    def test_series_is_built_once(self, intervention, django_assert_num_queries):
+        _add_comparison_data(intervention, "Expensive", 0.5, 0.4)
+        _add_comparison_data(intervention, "Cheap", 0.2, 0.1)
+        output_metric = intervention.output_metric_objects()[0]
+
+        with django_assert_num_queries(2):
+            # The version stamps, then the comparison data
+            series = insight_comparison_series.get(intervention.id, output_metric)
+        with django_assert_num_queries(0):
+            assert insight_comparison_series.get(intervention.id, output_metric) == series
+        assert [point["tooltip"] for point in series] == ["Cheap", "Expensive"]
+        assert series[0]["description"] == "Cash Distributed: €123.45"
+
+    def test_edits_invalidate_the_series(self, intervention):
+        comparison_data = _add_comparison_data(intervention, "Expensive", 0.5, 0.4)
+        _add_comparison_data(intervention, "Cheap", 0.2, 0.1)
+        output_metric = intervention.output_metric_objects()[0]
+        insight_comparison_series.get(intervention.id, output_metric)
+
+        comparison_data.output_costs = {"ValueOfCashDistributed": {"all": 0.1, "direct_only": 0.05}}
+        comparison_data.save()
+        series = insight_comparison_series.get(intervention.id, output_metric)
+        assert [point["tooltip"] for point in series] == ["Expensive", "Cheap"]
+
+        comparison_data.delete()
+        series = insight_comparison_series.get(intervention.id, output_metric)
+        assert [point["tooltip"] for point in series] == ["Cheap"]
+
+    def test_import_builds_the_series(
+        self, defaults, django_capture_on_commit_callbacks, django_assert_num_queries
+    ):
+        CountryFactory(code="AF")
+        intervention = InterventionFactory(
+            name="My Test Intervention", output_metrics=["NumberOfTeacherDaysOfTraining"]
+        )
+        with django_capture_on_commit_callbacks(execute=True):
+            with open(
+                test_data_dir
+                / "insight_comparison_data_import_files"
+                / "insight_comparison_data_import_valid.xlsx",
+                "rb",
+            ) as f:
+                success, result = InsightComparisonDataImporter().load_file(f)
+        assert success, result["errors"]
+
+        intervention = Intervention.objects.get(pk=intervention.pk)
+        with django_assert_num_queries(0):
+            series = insight_comparison_series.get(intervention.id, intervention.output_metric_objects()[0])
+        assert [point["tooltip"] for point in series] == ["Valid One to Test"]
+        assert series[0]["raw_output_cost_all"] == 30.0
+
+    def test_analysis_point_is_spliced_into_the_series(self, analysis_workflow_with_allocations):
+        analysis = analysis_workflow_with_allocations.analysis
+        intervention_instance = analysis.interventioninstance_set.first()
+        output_metric = intervention_instance.intervention.output_metric_objects()[0]
+        analysis.title = "My Analysis"
+        analysis.output_costs[str(intervention_instance.id)][output_metric.id].update(all=10, direct_only=5)
+        analysis.save()
+        _add_comparison_data(intervention_instance.intervention, "Above", 20, 0, output_metric.id)
+        _add_comparison_data(intervention_instance.intervention, "Below", 5, 0, output_metric.id)
+
+        context = InsightsContextBuilder(analysis).build()
+        metric = next(
+            metric
+            for metric in context["output_metrics_by_intervention"][intervention_instance.id]
+            if metric["output_metric"].id == output_metric.id
+        )
+        assert [point["tooltip"] for point in metric["insights_chart_data"]] == [
+            "Below",
+            "My Analysis",
+            "Above",
+        ]
+        assert [point["highlight"] for point in metric["insights_chart_data"]] == [False, True, False]
@@ -0,0 +1,71 @@
+import pytest
+
+from website.models import CacheVersion, FieldLabelOverrides, Intervention
+from website.models.utils import _get_overrides, get_intervention_parameter_mapping, load_field_label_override
+from website.tests.factories import InterventionFactory, InterventionGroupFactory
+from website.utils.model_cache import clear_model_caches, version_stamps
+
+MAPPING = "website.models.utils.get_intervention_parameter_mapping"
+
+
+@pytest.mark.django_db
+class TestModelCache:
+    def test_values_are_read_once_per_version(self, django_assert_num_queries):
+        intervention = InterventionFactory()
+        version_stamps.expire()
+
+        with django_assert_num_queries(2):
+            # The stamps, then the interventions
+            mapping = get_intervention_parameter_mapping()
+        assert intervention.pk in mapping
+        with django_assert_num_queries(0):
+            assert get_intervention_parameter_mapping() is mapping
+
+        # The next request reads the stamps again, but not the interventions
+        version_stamps.expire()
+        with django_assert_num_queries(1):
+            assert get_intervention_parameter_mapping() is mapping
+
+    def test_saves_invalidate_the_cache(self):
+        overrides = FieldLabelOverrides.get()
+        assert load_field_label_override("tr_date", "Date") == "Date"
+
+        overrides.tr_date = "Day"
+        overrides.tr_date_overridden = True
+        overrides.save()
+        assert load_field_label_override("tr_date", "Date") == "Day"
+
+    def test_stamps_set_by_other_workers_invalidate_the_cache(self):
+        first = InterventionFactory()
+        assert list(get_intervention_parameter_mapping()) == [first.pk]
+
+        # Another worker adds an intervention, which this one learns of from the stamps table
+        [second] = Intervention.objects.bulk_create(
+            [InterventionFactory.build(group=InterventionGroupFactory())]
+        )
+        CacheVersion.objects.update_or_create(name=MAPPING, defaults={"version": 1})
+        assert list(get_intervention_parameter_mapping()) == [first.pk]
+
+        version_stamps.expire()
+        assert sorted(get_intervention_parameter_mapping()) == sorted([first.pk, second.pk])
+
+    def test_workers_share_values_through_the_cache(self, django_assert_num_queries):
+        FieldLabelOverrides.get()
+        overrides = _get_overrides()
+
+        # A worker that hasn't computed the value yet takes it from the shared cache
+        clear_model_caches()
+        with django_assert_num_queries(1):
+            assert _get_overrides() == overrides
+
+    def test_bulk_writes_require_explicit_invalidation(self):
+        assert get_intervention_parameter_mapping() == {}
+        [intervention] = Intervention.objects.bulk_create(
+            [InterventionFactory.build(group=InterventionGroupFactory())]
+        )
+        assert get_intervention_parameter_mapping() == {}
+
+        version = version_stamps.get(MAPPING)
+        get_intervention_parameter_mapping.invalidate()
+        assert version_stamps.get(MAPPING) > version
+        assert list(get_intervention_parameter_mapping()) == [intervention.pk]
@@ -0,0 +1,113 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.db.models.signals import post_delete, pre_delete
+from django.test.utils import CaptureQueriesContext
+
+from website.models import Analysis, CostLineItem, CostLineItemConfig
+from website.models.cost_line_item import CostLineItemInterventionAllocation
+from website.tests.factories import (
+    AnalysisFactory,
+    CostLineItemConfigFactory,
+    CostLineItemFactory,
+    CostLineItemInterventionAllocationFactory,
+    InterventionFactory,
+)
+
+
+@pytest.fixture
+def analysis(defaults):
+    analysis = AnalysisFactory()
+    intervention_instance = analysis.add_intervention(InterventionFactory())
+    config = CostLineItemConfigFactory(cost_line_item=CostLineItemFactory(analysis=analysis))
+    CostLineItemInterventionAllocationFactory(
+        cli_config=config, intervention_instance=intervention_instance, allocation=50
+    )
+    return Analysis.objects.get(pk=analysis.pk)
+
+
+def _changes_version(analysis, write):
+    version = analysis.data_version
+    write()
+    return Analysis.objects.get(pk=analysis.pk).data_version != version
+
+
+@pytest.mark.django_db
+class TestDataVersion:
+    def test_saves_change_it(self, analysis):
+        cost_line_item = CostLineItem.objects.get(analysis=analysis)
+        config = cost_line_item.config
+        allocation = config.allocations.get()
+
+        cost_line_item.note = "Revised"
+        assert _changes_version(analysis, cost_line_item.save)
+        config.cost_type = None
+        assert _changes_version(analysis, config.save)
+        allocation.allocation = 25
+        assert _changes_version(analysis, allocation.save)
+        assert _changes_version(analysis, allocation.delete)
+
+    def test_queryset_writes_change_it(self, analysis):
+        configs = CostLineItemConfig.objects.filter(cost_line_item__analysis=analysis)
+        allocations = CostLineItemInterventionAllocation.objects.filter(
+            intervention_instance__analysis=analysis
+        )
+
+        assert _changes_version(analysis, lambda: configs.update(cost_type=None))
+        assert _changes_version(analysis, lambda: allocations.update(allocation=Decimal(10)))
+        allocation = allocations.get()
+        allocation.allocation = Decimal(20)
+        assert _changes_version(
+            analysis,
+            lambda: CostLineItemInterventionAllocation.objects.bulk_update([allocation], ["allocation"]),
+        )
+        assert _changes_version(analysis, allocations.delete)
+        assert _changes_version(
+            analysis,
+            lambda: CostLineItemInterventionAllocation.objects.bulk_create(
+                [
+                    CostLineItemInterventionAllocation(
+                        cli_config=configs.get(),
+                        intervention_instance=analysis.interventioninstance_set.get(),
+                        allocation=Decimal(30),
+                    )
+                ]
+            ),
+        )
+
+    def test_renaming_an_intervention_changes_it(self, analysis):
+        intervention = analysis.interventioninstance_set.get().intervention
+        intervention.name = "Renamed"
+        assert _changes_version(analysis, intervention.save)
+
+    def test_analyses_in_hand_follow_their_cost_line_items(self, analysis):
+        version = analysis.data_version
+        cost_line_item = CostLineItem.objects.get(analysis=analysis)
+        cost_line_item.analysis = analysis
+        cost_line_item.save()
+        assert analysis.data_version != version
+
+        version = analysis.data_version
+        analysis.touch()
+        assert analysis.data_version != version
+        assert Analysis.objects.get(pk=analysis.pk).data_version == analysis.data_version
+
+    def test_loops_can_mark_it_once(self, analysis):
+        CostLineItemFactory.create_batch(4, analysis=analysis)
+        version = analysis.data_version
+        with CaptureQueriesContext(connection) as ctx, analysis.changes_marked_once():
+            for cost_line_item in CostLineItem.objects.filter(analysis=analysis):
+                cost_line_item.note = "Revised"
+                cost_line_item.save()
+        assert len([q for q in ctx.captured_queries if 'UPDATE "website_analysis"' in q["sql"]]) == 1
+        assert analysis.data_version != version
+        assert Analysis.objects.get(pk=analysis.pk).data_version == analysis.data_version
+
+    def test_bulk_deletes_mark_it_once(self, analysis):
+        CostLineItemFactory.create_batch(4, analysis=analysis)
+        with CaptureQueriesContext(connection) as ctx:
+            CostLineItem.objects.filter(analysis=analysis).delete()
+        assert len([q for q in ctx.captured_queries if 'UPDATE "website_analysis"' in q["sql"]]) == 1
+        for model in (CostLineItem, CostLineItemConfig, CostLineItemInterventionAllocation):
+            assert not pre_delete.has_listeners(model) and not post_delete.has_listeners(model)
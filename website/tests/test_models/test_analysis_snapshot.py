@@ -0,0 +1,112 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from website.models import Analysis
+from website.models.analysis.analysis_snapshot import AnalysisSnapshot
+from website.tests.factories import (
+    CostLineItemConfigFactory,
+    CostLineItemFactory,
+    CostLineItemInterventionAllocationFactory,
+)
+
+
+def _allocate_url(analysis):
+    cost_type_category_grant = analysis.cost_type_category_grants.first()
+    return reverse(
+        "analysis-allocate-cost_type-grant",
+        kwargs={
+            "pk": analysis.pk,
+            "cost_type_pk": cost_type_category_grant.cost_type_category.cost_type.pk,
+            "grant": cost_type_category_grant.grant,
+        },
+    )
+
+
+def _allocation_queries(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200
+    return [q["sql"] for q in ctx.captured_queries if "costlineiteminterventionallocation" in q["sql"]]
+
+
+@pytest.mark.django_db
+class TestAnalysisSnapshot:
+    def test_prefetched_snapshot_is_reused_without_queries(
+        self, analysis_workflow_with_loaddata_complete, django_assert_num_queries
+    ):
+        analysis = Analysis.objects.prefetch_related(*AnalysisSnapshot.PREFETCH).get(
+            pk=analysis_workflow_with_loaddata_complete.analysis.pk
+        )
+        snapshot = analysis.snapshot
+        with django_assert_num_queries(0):
+            assert analysis.snapshot is snapshot
+            for cli in snapshot.cost_line_items:
+                snapshot.allocations_for(cli)
+            assert snapshot.grants_list() == analysis.grants_list()
+            assert len(snapshot.cost_line_items_for_grant("DF119")) == 2
+
+    def test_unprefetched_snapshot_reads_fresh_rows(self, analysis_workflow_with_loaddata_complete):
+        analysis = analysis_workflow_with_loaddata_complete.analysis
+        assert len(analysis.snapshot.cost_line_items) == 2
+        CostLineItemFactory(analysis=analysis, grant_code="DF119")
+        assert len(analysis.snapshot.cost_line_items) == 3
+
+    def test_unprefetched_snapshot_reads_only_what_it_needs(
+        self, analysis_workflow_with_loaddata_complete, django_assert_num_queries
+    ):
+        analysis = Analysis.objects.get(pk=analysis_workflow_with_loaddata_complete.analysis.pk)
+        config = analysis.cost_line_items.select_related("config").first().config
+        intervention_instance_count = analysis.interventioninstance_set.count()
+        CostLineItemFactory(analysis=analysis, grant_code="DF120")
+
+        with django_assert_num_queries(1):
+            assert len(analysis.snapshot.intervention_instances) == intervention_instance_count
+        # The matching cost line items with their configs, then their allocations
+        with django_assert_num_queries(2):
+            items = analysis.snapshot.cost_line_items_for_category(
+                config.cost_type_id, config.category_id, "DF119"
+            )
+        assert config.cost_line_item in items
+        assert all(cli.grant_code == "DF119" for cli in items)
+        with django_assert_num_queries(1):
+            assert analysis.snapshot.grants_list() == ["DF119", "DF120"]
+
+    def test_refresh_snapshot_reloads_prefetches(self, analysis_workflow_with_loaddata_complete):
+        analysis = Analysis.objects.prefetch_related(*AnalysisSnapshot.PREFETCH).get(
+            pk=analysis_workflow_with_loaddata_complete.analysis.pk
+        )
+        assert len(analysis.snapshot.cost_line_items) == 2
+        CostLineItemFactory(analysis=analysis, grant_code="DF119")
+        assert len(analysis.snapshot.cost_line_items) == 2
+
+        analysis.refresh_snapshot()
+        assert len(analysis.snapshot.cost_line_items) == 3
+
+    def test_allocate_page_loads_allocations_a_bounded_number_of_times(
+        self, analysis_workflow_with_allocations, client_with_admin
+    ):
+        analysis = analysis_workflow_with_allocations.analysis
+        url = _allocate_url(analysis)
+        baseline = _allocation_queries(client_with_admin, url)
+
+        config = analysis.cost_line_items.select_related("config").first().config
+        for _ in range(5):
+            new_config = CostLineItemConfigFactory(
+                cost_line_item__analysis=analysis,
+                cost_line_item__grant_code="DF119",
+                cost_type=config.cost_type,
+                category=config.category,
+            )
+            for intervention_instance in analysis.interventioninstance_set.all():
+                CostLineItemInterventionAllocationFactory(
+                    allocation=Decimal("0.1"),
+                    cli_config=new_config,
+                    intervention_instance=intervention_instance,
+                )
+
+        # Allocations are loaded in bulk, never per cost line item, category or intervention
+        assert len(_allocation_queries(client_with_admin, url)) == len(baseline)
@@ -0,0 +1,157 @@
+from decimal import Decimal
+
+import datetime
+
+import pytest
+from django.core.paginator import Paginator
+from django.db.models import F, Value
+from django.utils import timezone
+
+from app_log.models import AppLogEntry
+from ombucore.admin.pagination import CursorPaginator
+from website.models import AnalysisCostType, CostLineItem
+from website.tests.factories import (
+    CostLineItemConfigFactory,
+    CostLineItemInterventionAllocationFactory,
+)
+from website.utils.pagination import KeysetPaginator
+
+
+@pytest.fixture
+def cost_line_items(analysis_workflow_with_allocations):
+    analysis = analysis_workflow_with_allocations.analysis
+    intervention_instance = analysis.interventioninstance_set.first()
+    config = analysis.cost_line_items.select_related("config").first().config
+    # Ties on total cost, blank (NULL) allocations and a NULL analysis cost type in the mix, and descriptions
+    # whose natural sort differs from their plain text order
+    descriptions = [
+        "Item x",
+        "Item aaaaa",
+        "1.10 Item",
+        "1.2 Item",
+        "Item x",
+        "Item",
+        "1.2 Item",
+        "Item aaaaa",
+    ]
+    for i, (total_cost, allocation) in enumerate(
+        [(10, 50), (10, 50), (10, None), (20, 25), (20, None), (5, 100), (20, 25), (10, 0)]
+    ):
+        new_config = CostLineItemConfigFactory(
+            cost_line_item__analysis=analysis,
+            cost_line_item__grant_code="DF119",
+            cost_line_item__total_cost=Decimal(total_cost),
+            cost_line_item__budget_line_description=descriptions[i],
+            cost_type=config.cost_type,
+            category=config.category,
+            analysis_cost_type=AnalysisCostType.CLIENT_TIME if i % 2 else None,
+        )
+        CostLineItemInterventionAllocationFactory(
+            allocation=allocation,
+            cli_config=new_config,
+            intervention_instance=intervention_instance,
+        )
+    return CostLineItem.objects.filter(
+        analysis=analysis, config__allocations__intervention_instance=intervention_instance
+    ).annotate(allocated_cost=F("total_cost") * (F("config__allocations__allocation") / Value(100)))
+
+
+@pytest.mark.django_db
+class TestKeysetPaginator:
+    @pytest.mark.parametrize(
+        "ordering",
+        [
+            ["-allocated_cost", "id"],
+            ["allocated_cost", "id"],
+            ["total_cost", "id"],
+            ["-total_cost", "id"],
+            ["-allocated_cost", "config__analysis_cost_type", "budget_line_description", "id"],
+            ["config__analysis_cost_type", "budget_line_description", "-id"],
+            ["budget_line_description", "id"],
+        ],
+    )
+    @pytest.mark.parametrize("per_page", [1, 3])
+    def test_pages_match_offset_pagination(self, cost_line_items, ordering, per_page):
+        expected = Paginator(cost_line_items.order_by(*ordering), per_page)
+        paginator = KeysetPaginator(cost_line_items, per_page, ordering)
+
+        assert paginator.count == expected.count
+        assert paginator.num_pages == expected.num_pages
+        for number in expected.page_range:
+            assert [cli.id for cli in paginator.page(number)] == [cli.id for cli in expected.page(number)]
+
+    def test_counts_and_boundaries_are_cached(self, cost_line_items, django_assert_num_queries):
+        ordering = ["-allocated_cost", "id"]
+        KeysetPaginator(cost_line_items, 2, ordering, cache_key="test").count
+
+        count = cost_line_items.count()
+        paginator = KeysetPaginator(cost_line_items, 2, ordering, cache_key="test")
+        with django_assert_num_queries(1):
+            assert paginator.count == count
+            assert len(paginator.get_page(2)) == 2
+
+    def test_only_reads_the_first_row_of_each_page(self, cost_line_items, django_assert_num_queries):
+        count = cost_line_items.count()
+        paginator = KeysetPaginator(cost_line_items, 3, ["-allocated_cost", "id"])
+        with django_assert_num_queries(1) as queries:
+            assert paginator.count == count
+        assert "ROW_NUMBER()" in queries.captured_queries[0]["sql"]
+        assert len(paginator._index["page_keys"]) == paginator.num_pages
+
+    def test_empty(self, cost_line_items):
+        paginator = KeysetPaginator(cost_line_items.none(), 2, ["id"])
+        assert paginator.count == 0
+        assert list(paginator.get_page(1)) == []
+
+
+@pytest.fixture
+def log_entries():
+    now = timezone.now()
+    # Several entries share each timestamp
+    AppLogEntry.objects.bulk_create(
+        AppLogEntry(
+            timestamp=now - datetime.timedelta(microseconds=i // 3),
+            actor_name="steve",
+            action="Updated" if i % 2 else "Created",
+        )
+        for i in range(20)
+    )
+    return AppLogEntry.objects.all()
+
+
+@pytest.mark.django_db
+class TestCursorPaginator:
+    @pytest.mark.parametrize("ordering", [[], ["-timestamp"], ["timestamp"], ["action", "-timestamp"]])
+    @pytest.mark.parametrize("per_page", [1, 3, 20])
+    def test_pages_forward_and_back(self, log_entries, ordering, per_page):
+        queryset = log_entries.order_by(*ordering) if ordering else log_entries
+        paginator = CursorPaginator(queryset, per_page)
+        expected = [entry.pk for entry in queryset.order_by(*paginator.ordering)]
+        assert paginator.ordering[-1].removeprefix("-") == "id"
+
+        pages = [paginator.page(None)]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        assert [entry.pk for page in pages for entry in page] == expected
+        assert not pages[0].has_previous()
+        assert len(pages) == -(-len(expected) // per_page)
+
+        page = pages[-1]
+        back = [page]
+        while page.has_previous():
+            page = paginator.page(page.previous_cursor)
+            back.append(page)
+        assert [[entry.pk for entry in page] for page in reversed(back)] == [
+            [entry.pk for entry in page] for page in pages
+        ]
+
+    @pytest.mark.parametrize("cursor", ["", "nonsense", "n!!", "nWyJ4Il0=", "pWyJub3QgYSBkYXRlIiwgIngiXQ=="])
+    def test_invalid_cursors_give_the_first_page(self, log_entries, cursor):
+        paginator = CursorPaginator(log_entries, 5)
+        assert [entry.pk for entry in paginator.page(cursor)] == [entry.pk for entry in paginator.page(None)]
+
+    def test_one_query_per_page(self, log_entries, django_assert_num_queries):
+        paginator = CursorPaginator(log_entries, 5)
+        cursor = paginator.page(None).next_cursor
+        with django_assert_num_queries(1):
+            assert len(paginator.page(cursor)) == 5
@@ -0,0 +1,229 @@
+import base64
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+from website.pdf_export import PdfExportBusy, render_pdf
+from website.pdf_export.devtools import DevToolsPipe
+from website.pdf_export.renderer import BrowserPool, HostSlots
+
+# Stands in for the browser: the pool can't start it (it exits when asked for a DevTools pipe), and
+# the one-off command line render writes a "PDF" with the HTML in it.
+FAKE_BROWSER = f"""#!{sys.executable}
+import sys
+args = sys.argv[1:]
+if "--remote-debugging-pipe" in args:
+    sys.exit(1)
+pdf_file = next(arg for arg in args if arg.startswith("--print-to-pdf=")).split("=", 1)[1]
+with open(args[-1], "rb") as html, open(pdf_file, "wb") as pdf:
+    pdf.write(b"%PDF-" + html.read())
+"""
+
+# Like FAKE_BROWSER, but when asked for a DevTools pipe it relays it to FakeDevTools, until the pool closes
+# the pipe.
+FAKE_WARM_BROWSER = f"""#!{sys.executable}
+import os, socket, sys, threading
+args = sys.argv[1:]
+if "--remote-debugging-pipe" in args:
+    connection = socket.create_connection(("127.0.0.1", int(os.environ["FAKE_DEVTOOLS_PORT"])))
+
+    def forward_commands():
+        while chunk := os.read(3, 65536):
+            connection.sendall(chunk)
+        connection.shutdown(socket.SHUT_WR)
+
+    threading.Thread(target=forward_commands, daemon=True).start()
+    while chunk := connection.recv(65536):
+        os.write(4, chunk)
+    sys.exit(0)
+pdf_file = next(arg for arg in args if arg.startswith("--print-to-pdf=")).split("=", 1)[1]
+with open(args[-1], "rb") as html, open(pdf_file, "wb") as pdf:
+    pdf.write(b"%PDF-fallback")
+"""
+
+
+def _messages(connection: socket.socket):
+    """The NUL-terminated messages the client sends, until it closes the connection."""
+    buffer = b""
+    while chunk := connection.recv(65536):
+        buffer += chunk
+        *messages, buffer = buffer.split(b"\0")
+        for message in messages:
+            yield message.decode()
+
+
+def _send(connection: socket.socket, message: dict):
+    connection.sendall(json.dumps(message).encode() + b"\0")
+
+
+class FakeDevTools:
+    """
+    Answers the DevTools commands `HeadlessBrowser.print_to_pdf` sends, "printing" the page's HTML, on one
+    connection at a time, relayed by FAKE_WARM_BROWSER.  Like Chrome, it sends the page's events before (and
+    between) its responses.
+    """
+
+    def __init__(self, hang_on: str | None = None):
+        self.hang_on = hang_on
+        self.methods = []
+        self.connections = 0
+        self.server = socket.create_server(("127.0.0.1", 0))
+        self.port = self.server.getsockname()[1]
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def _serve(self):
+        while True:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            url = None
+            for message in _messages(connection):
+                message = json.loads(message)
+                method, params, session_id = message["method"], message["params"], message.get("sessionId")
+                self.methods.append(method)
+                if method == self.hang_on:
+                    continue
+                result = {}
+                if method == "Target.createTarget":
+                    result = {"targetId": "T1"}
+                elif method == "Target.attachToTarget":
+                    result = {"sessionId": "S1"}
+                elif method == "Page.navigate":
+                    url = params["url"]
+                    _send(connection, {"method": "Page.frameStartedLoading", "sessionId": "S1"})
+                elif method == "Emulation.setVirtualTimePolicy":
+                    # The budget runs out before the response arrives
+                    _send(connection, {"method": "Emulation.virtualTimeBudgetExpired", "sessionId": "S1"})
+                elif method == "Page.printToPDF":
+                    with open(url.removeprefix("file://"), "rb") as html:
+                        result = {"data": base64.b64encode(b"%PDF-" + html.read()).decode()}
+                response = {"id": message["id"], "result": result}
+                if session_id:
+                    response["sessionId"] = session_id
+                _send(connection, response)
+            connection.close()
+
+    def close(self):
+        self.server.close()
+
+
+@pytest.fixture
+def fake_browser(tmp_path, settings):
+    path = tmp_path / "browser"
+    path.write_text(FAKE_BROWSER)
+    path.chmod(0o755)
+    settings.PDF_EXPORT_COMMAND = [str(path)]
+    return path
+
+
+@pytest.fixture
+def fake_warm_browser(tmp_path, settings, monkeypatch):
+    devtools = FakeDevTools()
+    monkeypatch.setenv("FAKE_DEVTOOLS_PORT", str(devtools.port))
+    path = tmp_path / "warm-browser"
+    path.write_text(FAKE_WARM_BROWSER)
+    path.chmod(0o755)
+    settings.PDF_EXPORT_COMMAND = [str(path)]
+    yield devtools
+    devtools.close()
+
+
+@pytest.fixture
+def html_file(tmp_path):
+    path = tmp_path / "report.html"
+    path.write_text("<p>Report</p>")
+    return str(path)
+
+
+def test_pipe_round_trip():
+    # Echoes the commands back, so messages also arrive split across reads and several to a read
+    commands_read, commands_write = os.pipe()
+    responses_read, responses_write = os.pipe()
+
+    def echo():
+        while chunk := os.read(commands_read, 1000):
+            os.write(responses_write, chunk)
+        os.close(responses_write)
+
+    thread = threading.Thread(target=echo, daemon=True)
+    thread.start()
+    connection = DevToolsPipe(commands_write, responses_read, timeout=5)
+    try:
+        messages = ["short", "x" * 300, "é" * 40000]
+        for message in messages:
+            connection.send(message)
+        assert [connection.recv() for _ in messages] == messages
+    finally:
+        connection.close()
+        thread.join(5)
+        os.close(commands_read)
+
+
+def test_falls_back_to_a_new_browser_process(fake_browser, html_file, settings):
+    settings.PDF_EXPORT_POOL_SIZE = 1
+    assert render_pdf(html_file) == b"%PDF-<p>Report</p>"
+
+    settings.PDF_EXPORT_POOL_SIZE = 0
+    assert render_pdf(html_file) == b"%PDF-<p>Report</p>"
+
+
+def test_renders_beyond_the_pool_size_wait_their_turn(fake_browser):
+    pool = BrowserPool([str(fake_browser)], size=1, queue_timeout=0.01)
+    with pool.slot():
+        with pytest.raises(PdfExportBusy):
+            with pool.slot():
+                pass
+    with pool.slot() as queued_seconds:
+        assert queued_seconds < 1
+
+
+def test_renders_beyond_the_host_limit_wait_their_turn(fake_browser, tmp_path):
+    # One pool per web server process, sharing the host's slots
+    pools = [
+        BrowserPool(
+            [str(fake_browser)], size=1, queue_timeout=0.01, host_slots=HostSlots(str(tmp_path / "slots"), 1)
+        )
+        for _ in range(2)
+    ]
+    with pools[0].slot():
+        assert (tmp_path / "slots").stat().st_mode & 0o777 == 0o700
+        with pytest.raises(PdfExportBusy):
+            with pools[1].slot():
+                pass
+    with pools[1].slot():
+        pass
+
+
+def test_renders_in_a_warm_browser(fake_warm_browser, html_file, settings):
+    pool = BrowserPool(settings.PDF_EXPORT_COMMAND, size=1, queue_timeout=1)
+    try:
+        for _ in range(2):
+            assert pool.render(html_file, timeout=5) == b"%PDF-<p>Report</p>"
+    finally:
+        pool.close()
+
+    # One browser did both renders, in a tab each, and the virtual time budget started with the navigation
+    assert fake_warm_browser.connections == 1
+    methods = fake_warm_browser.methods
+    assert methods.count("Target.createTarget") == methods.count("Target.closeTarget") == 2
+    assert methods.index("Page.navigate") < methods.index("Emulation.setVirtualTimePolicy")
+
+
+def test_warm_renders_that_time_out_fall_back_to_a_new_browser_process(
+    fake_warm_browser, html_file, settings
+):
+    fake_warm_browser.hang_on = "Page.printToPDF"
+    settings.PDF_EXPORT_POOL_SIZE = 1
+    settings.PDF_EXPORT_TIMEOUT = 2
+    start = time.monotonic()
+    assert render_pdf(html_file) == b"%PDF-fallback"
+    # The warm browser only had its share of the timeout
+    assert time.monotonic() - start < 1.8
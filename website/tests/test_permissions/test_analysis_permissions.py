@@ -0,0 +1,54 @@
+import pytest
+from django.contrib.auth import get_user_model
+
+from website.models import Analysis
+from website.permissions import ANALYSIS_PERMISSION_COUNTRIES, filter_analyses_by_permission
+from website.tests.factories import AnalysisFactory, CountryFactory, UserFactory
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestAnalysisPermissions:
+    @pytest.fixture
+    def user_and_analyses(self):
+        primary, secondary, other = CountryFactory(), CountryFactory(), CountryFactory()
+        user = UserFactory()
+        user.primary_countries.add(primary)
+        user.secondary_countries.add(secondary)
+        analyses = [
+            AnalysisFactory(country=primary),
+            AnalysisFactory(country=secondary),
+            AnalysisFactory(country=other),
+            AnalysisFactory(country=other, owner=user),
+        ]
+        return User.objects.get(pk=user.pk), analyses
+
+    def test_countries_are_loaded_once_per_user_object(self, user_and_analyses, django_assert_num_queries):
+        user, analyses = user_and_analyses
+        with django_assert_num_queries(2):
+            for analysis in analyses:
+                for perm in ANALYSIS_PERMISSION_COUNTRIES:
+                    user.has_perm(perm, analysis)
+
+    def test_bulk_filter_matches_has_perm(self, user_and_analyses, django_assert_num_queries):
+        user, _ = user_and_analyses
+        admin = UserFactory(role=User.ADMIN)
+        for each_user in [user, admin]:
+            for perm in ANALYSIS_PERMISSION_COUNTRIES:
+                analyses = Analysis.objects.order_by("pk")
+                expected = [analysis for analysis in analyses.all() if each_user.has_perm(perm, analysis)]
+                with django_assert_num_queries(1):
+                    assert list(filter_analyses_by_permission(each_user, perm, analyses)) == expected
+
+        assert list(user.all_analyses().order_by("pk")) == list(
+            filter_analyses_by_permission(user, "website.view_analysis").order_by("pk")
+        )
+        assert len(user.all_analyses()) == 3
+
+    def test_changing_countries_is_seen_by_the_same_user_object(self, user_and_analyses):
+        user, analyses = user_and_analyses
+        assert not user.has_perm("website.change_analysis", analyses[2])
+        user.primary_countries.add(analyses[2].country)
+        assert user.has_perm("website.change_analysis", analyses[2])
+        assert analyses[2].country in user.associated_countries
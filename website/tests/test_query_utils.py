@@ -0,0 +1,71 @@
+import pytest
+from django.test import override_settings
+
+from website import stopwatch
+from website.models import Analysis
+from website.models.query_utils import (
+    MissingPrefetch,
+    prefetch_misses,
+    require_prefetch,
+    reset_prefetch_misses,
+    strict_prefetch,
+    top_prefetch_misses,
+)
+from website.tests.factories import AnalysisFactory
+
+
+@pytest.mark.django_db
+class TestRequirePrefetch:
+    @pytest.fixture(autouse=True)
+    def _clean_counts(self):
+        reset_prefetch_misses()
+        yield
+        reset_prefetch_misses()
+
+    def test_prefetched_relation_is_returned_without_recording(self, defaults, django_assert_num_queries):
+        analysis = Analysis.objects.prefetch_related("interventioninstance_set").get(pk=AnalysisFactory().pk)
+        with django_assert_num_queries(0):
+            assert list(require_prefetch(analysis, "interventioninstance_set")) == []
+        assert not prefetch_misses
+
+    def test_miss_falls_back_and_is_counted_per_call_site(self, defaults):
+        analysis = AnalysisFactory()
+        # The test settings make misses raise
+        with strict_prefetch(False):
+            for _ in range(3):
+                assert list(require_prefetch(analysis, "interventioninstance_set")) == []
+
+        [(site, n)] = top_prefetch_misses()
+        assert n == 3
+        assert site.name == "interventioninstance_set"
+        assert site.function == "test_miss_falls_back_and_is_counted_per_call_site"
+        assert site.filename == __file__
+
+    def test_strict_mode_raises(self, defaults):
+        analysis = AnalysisFactory()
+        with strict_prefetch():
+            with pytest.raises(MissingPrefetch):
+                require_prefetch(analysis, "interventioninstance_set")
+        with override_settings(REQUIRE_PREFETCH_STRICT=True):
+            with pytest.raises(MissingPrefetch):
+                require_prefetch(analysis, "interventioninstance_set")
+            with strict_prefetch(False):
+                require_prefetch(analysis, "interventioninstance_set")
+
+    def test_misses_are_aggregated_into_the_stopwatch(self, defaults):
+        analysis = AnalysisFactory()
+        clicks = []
+        stopwatch.activate()
+        try:
+            sw = stopwatch.real_current()
+            sw.record_time = lambda **kwargs: clicks.append(kwargs)
+            with strict_prefetch(False):
+                require_prefetch(analysis, "interventioninstance_set")
+                require_prefetch(analysis, "interventioninstance_set")
+            sw.click_prefetch_misses()
+        finally:
+            stopwatch.reset()
+
+        [click] = clicks
+        assert click["stopwatch_event"] == "prefetch_misses"
+        assert click["prefetch_miss_count"] == 2
@@ -0,0 +1,50 @@
+import time
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def session_writes(queries):
+    return [
+        query["sql"]
+        for query in queries
+        if query["sql"].startswith(("UPDATE", "INSERT")) and '"django_session"' in query["sql"]
+    ]
+
+
+def set_last_request(client, seconds_ago):
+    session = client.session
+    session["last_request"] = time.time() - seconds_ago
+    session.save()
+
+
+@pytest.mark.django_db
+class TestSessionIdleMiddleware:
+    def test_a_burst_of_requests_writes_the_session_once(self, client_with_admin, settings):
+        settings.SESSION_IDLE_GRANULARITY = 60
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(10):
+                assert client_with_admin.get("/help/").status_code == 200
+        assert len(session_writes(queries)) == 1
+        assert client_with_admin.session.get_expire_at_browser_close()
+
+        # Once the time of the last request is old enough, it's saved again
+        set_last_request(client_with_admin, 61)
+        with CaptureQueriesContext(connection) as queries:
+            client_with_admin.get("/help/")
+            client_with_admin.get("/help/")
+        assert len(session_writes(queries)) == 1
+        assert time.time() - client_with_admin.session["last_request"] < 5
+
+    def test_idle_users_are_logged_out(self, client_with_admin, settings):
+        settings.SESSION_IDLE_TIMEOUT = 3600
+        settings.SESSION_IDLE_GRANULARITY = 60
+        client_with_admin.get("/help/")
+        set_last_request(client_with_admin, 3600 + 30)
+        client_with_admin.get("/help/")
+        assert "_auth_user_id" in client_with_admin.session
+
+        set_last_request(client_with_admin, 3600 + 61)
+        client_with_admin.get("/help/")
+        assert "_auth_user_id" not in client_with_admin.session
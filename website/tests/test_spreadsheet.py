@@ -1,11 +1,20 @@
 import io
-from datetime import date
+import json
+import os
+import re
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from types import SimpleNamespace
 
 import pytest
 from django.conf import settings
+from django.urls import reverse
+from django.utils.http import http_date
 from openpyxl.reader.excel import load_workbook
 
-from website.models import AnalysisCostType, AnalysisType, CostType
+from website.models import AnalysisCostType, AnalysisType, CostLineItemInterventionAllocation, CostType
 from website.tests.factories import (
     AnalysisCostTypeCategoryFactory,
     AnalysisCostTypeCategoryGrantFactory,
@@ -16,10 +25,14 @@ from website.tests.factories import (
     CostLineItemInterventionAllocationFactory,
     CountryFactory,
     InterventionFactory,
+    SubcomponentCostAnalysisFactory,
     UserFactory,
 )
+from website.utils.spreadsheet_cache import SpreadsheetCache, spreadsheet_cache
 from website.views.documents import full_cost_model_spreadsheet
 
+test_data_dir = Path(__file__).resolve().parent / "test_data" / "full_cost_model_export"
+
 
 @pytest.fixture
 def spreadsheet_analysis(defaults):
@@ -153,13 +166,70 @@ def spreadsheet_analysis(defaults):
     return analysis
 
 
+@pytest.fixture
+def subcomponent_spreadsheet_analysis(spreadsheet_analysis):
+    SubcomponentCostAnalysisFactory(
+        analysis=spreadsheet_analysis,
+        subcomponent_labels=["Training", "Materials"],
+        subcomponent_labels_confirmed=True,
+    )
+    for each_cost_line_item, allocations in zip(
+        spreadsheet_analysis.cost_line_items.filter(config__analysis_cost_type__isnull=True).order_by(
+            "budget_line_description"
+        ),
+        [{"0": "60", "1": "40"}, {"0": "100", "1": "0"}],
+    ):
+        each_cost_line_item.config.subcomponent_analysis_allocations = allocations
+        each_cost_line_item.config.save()
+    return spreadsheet_analysis
+
+
+def _download(rf, analysis, user=None, **headers):
+    request = rf.get("/", headers=headers)
+    request.user = user or UserFactory()
+    return full_cost_model_spreadsheet(request, analysis.pk)
+
+
+def _export(rf, analysis):
+    response = _download(rf, analysis)
+    assert response.status_code == 200
+    return load_workbook(filename=io.BytesIO(b"".join(response.streaming_content)))
+
+
+def _cells(workbook, analysis) -> dict:
+    """Every written cell's value, number format and styling, and the column widths, by worksheet"""
+    sheets = {}
+    for ws in workbook.worksheets:
+        cells = {}
+        for each_row in ws.iter_rows():
+            for cell in each_row:
+                if cell.value is None:
+                    continue
+                value = cell.value
+                if isinstance(value, datetime):
+                    value = value.isoformat()
+                elif isinstance(value, str):
+                    # Factory sequences name some categories, so those depend on which tests ran first
+                    value = re.sub(r"Test Category \d+", "Test Category <n>", value)
+                    value = value.replace(f"/analysis/{analysis.pk}/", "/analysis/<pk>/")
+                style = [
+                    cell.font.b,
+                    cell.font.color.rgb if cell.font.color and cell.font.color.type == "rgb" else None,
+                    cell.fill.fgColor.rgb if cell.fill.fill_type else None,
+                    cell.border.left.style if cell.border.left else None,
+                    cell.alignment.horizontal,
+                ]
+                cells[cell.coordinate] = [value, cell.number_format, style]
+        widths = {letter: dimension.width for letter, dimension in ws.column_dimensions.items()}
+        sheets[ws.title] = {"cells": cells, "widths": widths}
+    return sheets
+
+
 class TestAnalysisSpreadsheet:
     @pytest.mark.django_db
     def test_full_cost_model_spreadsheet(self, spreadsheet_analysis, rf):
-        rf.user = UserFactory()
-
         # Run method to produce spreadsheet
-        response = full_cost_model_spreadsheet(rf, spreadsheet_analysis.pk)
+        response = _download(rf, spreadsheet_analysis)
         assert response.status_code == 200
 
         virtual_workbook = io.BytesIO()
@@ -195,3 +265,98 @@ class TestAnalysisSpreadsheet:
             == "=FIXED((IFERROR(C34 / (B9 / B11), 0)) + (IFERROR(SUM(E45) / (B9 / B11), 0)), 2)"
         )
         assert worksheet["B25"].value, "=FIXED(SUM(E42) ==  2)"
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize(
+        "analysis_fixture, snapshot",
+        [
+            ("spreadsheet_analysis", "analysis.json"),
+            ("subcomponent_spreadsheet_analysis", "analysis_with_subcomponents.json"),
+        ],
+    )
+    def test_matches_the_in_memory_exporter(self, request, rf, analysis_fixture, snapshot):
+        # The snapshots were taken from the exporter that built the whole workbook in memory and styled
+        # each cell individually
+        analysis = request.getfixturevalue(analysis_fixture)
+        expected = json.loads((test_data_dir / snapshot).read_text())
+        assert _cells(_export(rf, analysis), analysis) == expected
+
+
+@pytest.mark.django_db
+class TestSpreadsheetCache:
+    def test_repeat_downloads_are_served_from_the_cache(self, spreadsheet_analysis, rf, monkeypatch):
+        user = UserFactory()
+        first = _download(rf, spreadsheet_analysis, user)
+        content = b"".join(first.streaming_content)
+
+        def rebuilt():
+            raise AssertionError("The cached spreadsheet was not served")
+
+        monkeypatch.setattr("website.views.documents.full_cost_model_workbook", rebuilt)
+        second = _download(rf, spreadsheet_analysis, user)
+        assert second["ETag"] == first["ETag"]
+        assert b"".join(second.streaming_content) == content
+
+    def test_conditional_get(self, spreadsheet_analysis, rf):
+        response = _download(rf, spreadsheet_analysis)
+
+        assert _download(rf, spreadsheet_analysis, if_none_match=response["ETag"]).status_code == 304
+        assert _download(rf, spreadsheet_analysis, if_none_match='W/"stale"').status_code == 200
+        # The analysis' `updated` doesn't cover the field label overrides or the spreadsheet format
+        assert (
+            _download(rf, spreadsheet_analysis, if_modified_since=http_date(time.time())).status_code == 200
+        )
+
+    def test_incomplete_analyses_redirect_even_when_the_client_has_the_spreadsheet(
+        self, spreadsheet_analysis, rf
+    ):
+        response = _download(rf, spreadsheet_analysis)
+
+        # Removed without going through the workflow, so the ETag is unchanged but allocation is incomplete
+        CostLineItemInterventionAllocation.objects.filter(
+            cli_config__cost_line_item__analysis=spreadsheet_analysis
+        ).delete()
+
+        redirected = _download(rf, spreadsheet_analysis, if_none_match=response["ETag"])
+        assert redirected.status_code == 302
+        assert redirected.url == reverse("analysis", kwargs={"pk": spreadsheet_analysis.pk})
+
+    def test_changes_to_the_allocations_replace_the_spreadsheet(self, spreadsheet_analysis, rf):
+        response = _download(rf, spreadsheet_analysis)
+        cost_line_item = spreadsheet_analysis.cost_line_items.get(
+            budget_line_description="My Budget Line Description 1"
+        )
+        intervention_instance = spreadsheet_analysis.interventioninstance_set.get()
+
+        CostLineItemInterventionAllocation.bulk_set_allocations(
+            spreadsheet_analysis, {cost_line_item.pk: {intervention_instance.pk: Decimal(10)}}
+        )
+        changed = _download(rf, spreadsheet_analysis, if_none_match=response["ETag"])
+        assert changed.status_code == 200
+        assert changed["ETag"] != response["ETag"]
+        assert (
+            len(list(Path(settings.SPREADSHEET_CACHE_DIR).glob(f"analysis-{spreadsheet_analysis.pk}-*"))) == 1
+        )
+
+        CostLineItemInterventionAllocation.bulk_clear_allocations(spreadsheet_analysis, [cost_line_item.pk])
+        spreadsheet_analysis.refresh_from_db()
+        assert spreadsheet_cache.etag(spreadsheet_analysis) != changed["ETag"]
+
+    def test_least_recently_served_spreadsheets_are_evicted(self, settings, tmp_path):
+        settings.SPREADSHEET_CACHE_DIR = str(tmp_path)
+        settings.SPREADSHEET_CACHE_MAX_SIZE = 25
+        cache = SpreadsheetCache()
+        analyses = [SimpleNamespace(pk=pk) for pk in range(3)]
+
+        def saver(content):
+            return lambda path: Path(path).write_bytes(content)
+
+        cache.put(analyses[0], 'W/"a"', saver(b"0" * 10)).close()
+        cache.put(analyses[1], 'W/"b"', saver(b"1" * 10)).close()
+        os.utime(tmp_path / "analysis-0-a.xlsx", (1, 1))
+        os.utime(tmp_path / "analysis-1-b.xlsx", (2, 2))
+        cache.get(analyses[0], 'W/"a"').close()
+        cache.put(analyses[2], 'W/"c"', saver(b"2" * 10)).close()
+
+        assert sorted(path.name for path in tmp_path.iterdir()) == ["analysis-0-a.xlsx", "analysis-2-c.xlsx"]
+        assert cache.get(analyses[1], 'W/"b"') is None
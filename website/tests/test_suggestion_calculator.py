@@ -4,6 +4,8 @@ from unittest.mock import MagicMock
 import pytest
 from django.conf import settings
 
+from website.models import Analysis
+from website.models.analysis.analysis_snapshot import AnalysisSnapshot
 from website.models.cost_type import CostType
 from website.tests.factories import (
     AnalysisCostTypeCategoryFactory,
@@ -148,6 +150,26 @@ class TestSuggestionCalculatorSingleCategory:
         suggested_allocation = self.cost_type_category_grant.suggested_allocation()
         assert suggested_allocation == "36.67%"
 
+    def test_unallocated_items_total(self):
+        """
+        Sum of line items in this category with no allocations, or allocations adding up to 0%.
+        """
+        analysis = self.cost_type_category_grant.cost_type_category.analysis
+        summary = analysis.allocation_summary.total_for([self.cost_type_category_grant])
+        assert summary.unallocated_items_total == 95000.00
+        assert not summary.all_errors
+
+    def test_summary_is_computed_once_per_request(self, django_assert_num_queries):
+        analysis = Analysis.objects.prefetch_related(*AnalysisSnapshot.PREFETCH).get(
+            pk=self.cost_type_category_grant.cost_type_category.analysis_id
+        )
+        self.cost_type_category_grant.cost_type_category.analysis = analysis
+        with django_assert_num_queries(1):
+            assert self.cost_type_category_grant.assigned_items_cost() == 55000.00
+            assert self.cost_type_category_grant.assigned_items_total() == 150000.00
+            assert self.cost_type_category_grant.suggested_allocation() == "36.67%"
+            assert not self.cost_type_category_grant.all_errors()
+
 
 @pytest.mark.django_db
 class TestSuggestionCalculatorSpecialCountries:
@@ -374,7 +396,7 @@ class TestSuggestionCalculatorSpecialCountries:
         self.view.grant_code = "GRANT123"
         self.view.special_cost_line_items = [
             c
-            for c in self.view.analysis.special_country_cost_line_items
+            for c in self.view.analysis.snapshot.special_country_cost_line_items
             if c.grant_code == self.view.grant_code
         ]
 
@@ -389,7 +411,7 @@ class TestSuggestionCalculatorSpecialCountries:
         self.view.grant_code = "GRANT456"
         self.view.special_cost_line_items = [
             c
-            for c in self.view.analysis.special_country_cost_line_items
+            for c in self.view.analysis.snapshot.special_country_cost_line_items
             if c.grant_code == self.view.grant_code
         ]
         context = self.view.get_context_data()
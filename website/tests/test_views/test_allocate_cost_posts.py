@@ -3,7 +3,26 @@ from decimal import Decimal
 import pytest
 from django.urls import reverse
 
-from website.models import Analysis
+from website.models import Analysis, InterventionInstance
+from website.models.cost_line_item import CostLineItemInterventionAllocation
+from website.tests.factories import (
+    AnalysisFactory,
+    CostLineItemConfigFactory,
+    CostLineItemInterventionAllocationFactory,
+    InterventionFactory,
+)
+
+
+def _allocate_url(analysis):
+    cost_type_category_grant = analysis.cost_type_category_grants.first()
+    return reverse(
+        "analysis-allocate-cost_type-grant",
+        kwargs={
+            "pk": analysis.pk,
+            "cost_type_pk": cost_type_category_grant.cost_type_category.cost_type.pk,
+            "grant": cost_type_category_grant.grant,
+        },
+    )
 
 
 @pytest.mark.django_db
@@ -44,3 +63,118 @@ class TestAllocateCostFormSubmissions:
         for cli in updated_analysis.cost_line_items.all():
             for allocation in cli.config.allocations.all():
                 assert allocation.allocation == Decimal("2.00")
+
+    def test_resubmitting_updates_allocations_in_place(
+        self,
+        analysis_workflow_with_allocations,
+        client_with_admin,
+    ):
+        analysis = analysis_workflow_with_allocations.analysis
+        allocation_ids = set(
+            CostLineItemInterventionAllocation.objects.filter(
+                cli_config__cost_line_item__analysis=analysis
+            ).values_list("id", flat=True)
+        )
+        data = {}
+        for cli in analysis.cost_line_items.all():
+            for intervention_instance in analysis.interventioninstance_set.all():
+                data[f"cost_line_item_allocation_{cli.id}_{intervention_instance.id}"] = ""
+
+        response = client_with_admin.post(_allocate_url(analysis), data=data)
+
+        assert response.status_code == 302
+        allocations = CostLineItemInterventionAllocation.objects.filter(
+            cli_config__cost_line_item__analysis=analysis
+        )
+        assert set(allocations.values_list("id", flat=True)) == allocation_ids
+        assert all(allocation.allocation is None for allocation in allocations)
+
+    def test_cells_outside_the_analysis_are_ignored(
+        self,
+        analysis_workflow_with_confirmed_categories_cost_line_item,
+        client_with_admin,
+    ):
+        analysis = analysis_workflow_with_confirmed_categories_cost_line_item.analysis
+        other_config = CostLineItemConfigFactory()
+        other_intervention_instance = InterventionInstance.objects.create(
+            analysis=AnalysisFactory(),
+            intervention=InterventionFactory(),
+        )
+        cli = analysis.cost_line_items.first()
+        intervention_instance = analysis.interventioninstance_set.first()
+        data = {
+            f"cost_line_item_allocation_{cli.id}_{intervention_instance.id}": "5",
+            f"cost_line_item_allocation_{cli.id}_{other_intervention_instance.id}": "5",
+            f"cost_line_item_allocation_{other_config.cost_line_item.id}_{intervention_instance.id}": "5",
+        }
+
+        client_with_admin.post(_allocate_url(analysis), data=data)
+
+        assert list(
+            CostLineItemInterventionAllocation.objects.values_list("cli_config", "intervention_instance")
+        ) == [(cli.config.id, intervention_instance.id)]
+
+    def test_not_a_number_clears_the_line_items_allocations(
+        self,
+        analysis_workflow_with_allocations,
+        client_with_admin,
+    ):
+        analysis = analysis_workflow_with_allocations.analysis
+        bad_cli, good_cli = analysis.cost_line_items.order_by("id")
+        intervention_instance = analysis.interventioninstance_set.first()
+        data = {
+            f"cost_line_item_allocation_{bad_cli.id}_{intervention_instance.id}": "abc",
+            f"cost_line_item_allocation_{good_cli.id}_{intervention_instance.id}": "7",
+        }
+
+        response = client_with_admin.post(_allocate_url(analysis), data=data)
+
+        assert response.status_code == 200
+        assert not CostLineItemInterventionAllocation.objects.filter(
+            cli_config__cost_line_item=bad_cli
+        ).exists()
+        assert CostLineItemInterventionAllocation.objects.get(
+            cli_config__cost_line_item=good_cli, intervention_instance=intervention_instance
+        ).allocation == Decimal("7")
+
+
+@pytest.mark.django_db
+class TestAllocateSupportingCostsFormSubmissions:
+    def test_allocations_and_blank_cells_are_saved(
+        self,
+        analysis_workflow_with_allocations,
+        client_with_admin,
+    ):
+        analysis = analysis_workflow_with_allocations.analysis
+        new_config, existing_config = (
+            CostLineItemConfigFactory(
+                cost_line_item__analysis=analysis,
+                cost_line_item__grant_code="DF119",
+                cost_line_item__is_special_lump_sum=True,
+                cost_type=None,
+                category=None,
+            )
+            for _ in range(2)
+        )
+        intervention_instance = analysis.interventioninstance_set.first()
+        existing_allocation = CostLineItemInterventionAllocationFactory(
+            allocation=Decimal("40"),
+            cli_config=existing_config,
+            intervention_instance=intervention_instance,
+        )
+        data = {
+            f"cost_line_item_allocation_{new_config.cost_line_item.id}_{intervention_instance.id}": "12.5%",
+            f"cost_line_item_allocation_{existing_config.cost_line_item.id}_{intervention_instance.id}": " ",
+        }
+
+        response = client_with_admin.post(
+            reverse("analysis-allocate-supporting-costs", kwargs={"pk": analysis.pk, "grant": "DF119"}),
+            data=data,
+        )
+
+        assert response.status_code == 302
+        assert CostLineItemInterventionAllocation.objects.get(
+            cli_config=new_config, intervention_instance=intervention_instance
+        ).allocation == Decimal("12.5")
+        existing_allocation.refresh_from_db()
+        assert existing_allocation.allocation is None
@@ -0,0 +1,120 @@
+from decimal import Decimal
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from website.models.cost_line_item import CostLineItemInterventionAllocation
+from website.tests.factories import CostLineItemInterventionAllocationFactory
+from website.views.analysis.steps.insights_context import InsightsContextBuilder
+
+
+def _get_insights(client, analysis):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(reverse("analysis-insights", kwargs={"pk": analysis.pk}))
+    assert response.status_code == 200
+    breakdown_queries = [q for q in ctx.captured_queries if "allocated_cost_sum" in q["sql"]]
+    return response, breakdown_queries
+
+
+def _grow_to(analysis, intervention_count):
+    first = analysis.interventioninstance_set.first()
+    while analysis.interventioninstance_set.count() < intervention_count:
+        intervention_instance = analysis.add_intervention(
+            first.intervention,
+            label=f"Copy {analysis.interventioninstance_set.count()}",
+            parameters=first.parameters,
+        )
+        for cli in analysis.cost_line_items.select_related("config"):
+            CostLineItemInterventionAllocationFactory(
+                allocation=Decimal("0.1"),
+                cli_config=cli.config,
+                intervention_instance=intervention_instance,
+            )
+    analysis.calculate_output_costs()
+
+
+@pytest.fixture
+def analysis(analysis_workflow_with_allocations):
+    # Without client time there are no other costs to add, so every step up to Insights is complete
+    analysis = analysis_workflow_with_allocations.analysis
+    analysis.client_time = False
+    analysis.save()
+    return analysis
+
+
+@pytest.mark.django_db
+class TestInsightsContext:
+    def test_cost_breakdown_is_grouped_per_intervention_instance(self, analysis):
+        cost_breakdown = InsightsContextBuilder(analysis).build()["cost_breakdown"]
+
+        assert set(cost_breakdown) == {ii.id for ii in analysis.interventioninstance_set.all()}
+        for intervention_instance_id, breakdown in cost_breakdown.items():
+            expected = sum(
+                a.cli_config.cost_line_item.total_cost * a.allocation / Decimal(100)
+                for a in CostLineItemInterventionAllocation.objects.filter(
+                    intervention_instance_id=intervention_instance_id
+                ).select_related("cli_config__cost_line_item")
+            )
+            assert breakdown["total_cost"] == pytest.approx(expected)
+
+    def test_repeat_views_reuse_the_cached_context(self, analysis, client_with_admin):
+        first_response, first_breakdown_queries = _get_insights(client_with_admin, analysis)
+        second_response, second_breakdown_queries = _get_insights(client_with_admin, analysis)
+
+        assert len(first_breakdown_queries) == 1
+        assert second_breakdown_queries == []
+        assert first_response.context["cost_breakdown"] == second_response.context["cost_breakdown"]
+        assert [
+            metric["efficiency_bar_chart_data"]
+            for metrics in first_response.context["output_metrics_by_intervention"].values()
+            for metric in metrics
+        ] == [
+            metric["efficiency_bar_chart_data"]
+            for metrics in second_response.context["output_metrics_by_intervention"].values()
+            for metric in metrics
+        ]
+
+    def test_recalculating_the_analysis_invalidates_the_cache(self, analysis, client_with_admin):
+        _get_insights(client_with_admin, analysis)
+        version = analysis.data_version
+
+        CostLineItemInterventionAllocation.objects.filter(
+            cli_config__cost_line_item__analysis=analysis
+        ).update(allocation=Decimal("50"))
+        analysis.calculate_output_costs()
+        assert analysis.data_version != version
+
+        _, breakdown_queries = _get_insights(client_with_admin, analysis)
+        assert len(breakdown_queries) == 1
+
+    def test_queries_do_not_grow_with_interventions(self, analysis, client_with_admin):
+        sizes = [1, 10, 30]
+        first = analysis.interventioninstance_set.order_by("id").first()
+        analysis.interventioninstance_set.exclude(pk=first.pk).delete()
+        analysis.calculate_output_costs()
+        builder_queries = []
+        view_queries = []
+        # Anything the first build loads once per process doesn't count
+        InsightsContextBuilder(analysis).build()
+        for size in sizes:
+            _grow_to(analysis, size)
+            with CaptureQueriesContext(connection) as ctx:
+                InsightsContextBuilder(analysis).build()
+            builder_queries.append(len(ctx.captured_queries))
+            cache.clear()
+
+            _, breakdown_queries = _get_insights(client_with_admin, analysis)
+            assert len(breakdown_queries) == 1
+            with CaptureQueriesContext(connection) as ctx:
+                client_with_admin.get(reverse("analysis-insights", kwargs={"pk": analysis.pk}))
+            view_queries.append(len(ctx.captured_queries))
+
+        assert len(set(builder_queries)) == 1
+        # Only the visible cost model page and its allocations are read per intervention
+        for (smaller, fewer), (larger, more) in zip(
+            zip(sizes, view_queries), zip(sizes[1:], view_queries[1:])
+        ):
+            assert more - fewer <= 2 * (larger - smaller)
@@ -0,0 +1,34 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from website.models import Settings
+from website.tests.factories import InterventionFactory
+
+
+def intervention_group_queries(queries):
+    return [query for query in queries if 'FROM "website_interventiongroup"' in query["sql"]]
+
+
+@pytest.mark.django_db
+class TestInterventionMenuCache:
+    def test_menu_is_rendered_once_until_interventions_change(self, client_with_admin):
+        Settings.objects.create()
+        intervention = InterventionFactory(name="Cash Transfers", show_in_menu=True)
+
+        response = client_with_admin.get("/")
+        assert "Cash Transfers" in response.content.decode()
+        with CaptureQueriesContext(connection) as queries:
+            response = client_with_admin.get("/")
+        assert "Cash Transfers" in response.content.decode()
+        assert intervention_group_queries(queries) == []
+
+        intervention.name = "Unconditional Cash Transfers"
+        intervention.save()
+        with CaptureQueriesContext(connection) as queries:
+            response = client_with_admin.get("/")
+        assert "Unconditional Cash Transfers" in response.content.decode()
+        assert len(intervention_group_queries(queries)) == 1
+
+        intervention.delete()
+        assert "Cash Transfers" not in client_with_admin.get("/").content.decode()
@@ -6,7 +6,7 @@ from django.contrib import admin
 from django.urls import include, path, re_path
 from django.views.generic import RedirectView
 
-from website.admin.app_log import SendPendingNotificationsView
+from website.admin.app_log import RestoreAppLogArchiveView, SendPendingNotificationsView
 from website.admin.category import CategorySetDefaultView
 from website.admin.cost_type_category_mapping import (
     ExportCostTypeCategoryMapping,
@@ -321,6 +321,11 @@ urlpatterns = [
         SendPendingNotificationsView.as_view(),
         name="send-notification-subscriptions",
     ),
+    path(
+        "panels/app_log/restore-archive/",
+        RestoreAppLogArchiveView.as_view(),
+        name="restore-app-log-archive",
+    ),
     # Authentication
     re_path(
         r"^accounts/password/reset/key/(?P<uidb36>[0-9A-Za-z]+)-(?P<key>.+)/$",
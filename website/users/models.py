@@ -3,7 +3,7 @@ from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin
 from django.db import models
-from django.db.models import CharField, EmailField, Q
+from django.db.models import CharField, EmailField
 from django.utils.translation import gettext_lazy as _
 
 from ombucore.admin.fields import ForeignKey, ManyToManyField
@@ -127,35 +127,46 @@ class User(AbstractBaseUser, PermissionsMixin):
     def get_short_name(self):
         return self.name
 
+    @property
+    def permission_context(self) -> "PermissionContext":
+        """
+        The user's countries, as used by the analysis permission rules, loaded once per user object, i.e.
+        once per request for `request.user`.
+        """
+        if not hasattr(self, "_permission_context_cache"):
+            self._permission_context_cache = PermissionContext(self)
+        return self._permission_context_cache
+
+    def clear_permission_context(self):
+        self.__dict__.pop("_permission_context_cache", None)
+
     @property
     def associated_countries(self):
         if self.role == self.ADMIN:
             return Country.objects.all()
         else:
-            countries = Country.objects.filter(primary_countries_users=self)
-            countries |= Country.objects.filter(secondary_countries_users=self)
-            return countries.distinct()
+            context = self.permission_context
+            return Country.objects.filter(pk__in=context.primary_country_ids | context.secondary_country_ids)
 
     def all_analyses(self):
-        qs = Analysis.objects.all()
-        qs = qs.order_by("-updated")
-        if self.role != User.ADMIN:
-            # A user can see all the analyses that meet the following criteria:
-            qs = qs.filter(
-                # They are the owner
-                Q(owner=self)
-                |
-                # The Analysis country is in the secondary countries for the User
-                Q(country__in=self.secondary_countries.all())
-                |
-                # The Analysis country is the the same as the User's primary Countries
-                Q(country__in=self.primary_countries.all())
-            )
-
-        return qs
+        # Imported here, as website.permissions needs the user model to be loaded
+        from website.permissions import filter_analyses_by_permission
+
+        # A user can see all the analyses they own, and those in their primary or secondary countries
+        return filter_analyses_by_permission(
+            self, "website.view_analysis", Analysis.objects.order_by("-updated")
+        )
 
     def has_analyses(self) -> bool:
         return self.all_analyses().count() > 0
 
 
+class PermissionContext:
+    """The ids of a user's primary and secondary countries, see `User.permission_context`."""
+
+    def __init__(self, user: User):
+        self.primary_country_ids = frozenset(user.primary_countries.values_list("pk", flat=True))
+        self.secondary_country_ids = frozenset(user.secondary_countries.values_list("pk", flat=True))
+
+
 admin.site.register(User)
@@ -3,7 +3,7 @@ from allauth.account.utils import user_pk_to_url_str
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save
 from django.dispatch import receiver
 from django.template.loader import render_to_string
 from django.urls import reverse
@@ -53,3 +53,14 @@ def add_email_2fa(sender, instance, created, **kwargs):
     """
     if created:
         HOTPEmailDevice.objects.create(user=instance, confirmed=True)
+
+
+@receiver(m2m_changed, sender=User.primary_countries.through)
+@receiver(m2m_changed, sender=User.secondary_countries.through)
+def clear_permission_context(sender, instance, action, reverse, **kwargs):
+    """
+    Have a user's permissions pick up changes to their countries made through the same user object.
+    Objects loaded earlier in the request (`request.user` included) keep the countries they loaded.
+    """
+    if action.startswith("post_") and not reverse:
+        instance.clear_permission_context()
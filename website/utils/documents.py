@@ -1,12 +1,15 @@
+import re
 from decimal import Decimal
 
-from django.conf import settings
 from django.db.models import F, OuterRef, Subquery, Sum, Value
 from django.db.models.functions import Coalesce
-from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
 from openpyxl.styles.colors import WHITE
 from openpyxl.utils import get_column_letter
-from openpyxl.worksheet import worksheet
+from openpyxl.workbook.child import INVALID_TITLE_REGEX
+from openpyxl.worksheet._write_only import WriteOnlyWorksheet
 
 from website.currency import currency_name, currency_symbol
 from website.models import Analysis, AnalysisCostType, FieldLabelOverrides
@@ -14,7 +17,6 @@ from website.models import InterventionInstance
 from website.models.cost_line_item import CostLineItemInterventionAllocation
 from website.models.cost_type import ProgramCost
 from website.models.output_metric import OutputMetric
-from website.workflows import AnalysisWorkflow
 
 _gray_fill = PatternFill(start_color="00DADADA", end_color="00DADADA", fill_type="solid")
 
@@ -23,17 +25,69 @@ _dark_red_fill = PatternFill(start_color="00530000", end_color="00530000", fill_
 _black_side = Side(style="thin", color="000000")
 _black_border = Border(left=_black_side, top=_black_side, right=_black_side, bottom=_black_side)
 
+# Rows of the cost model table are read from the database in chunks of this size
+COST_MODEL_CHUNK_SIZE = 2000
 
-def _write_header_cell(ws, row, col, value):
-    ws.cell(row=row, column=col, value=value)
-    ws.cell(row=row, column=col).fill = _dark_red_fill
-    ws.cell(row=row, column=col).font = Font(color=WHITE)
-    ws.cell(row=row, column=col).border = _black_border
+COLUMN_WIDTH = 26
 
 
-def _write_header_row(ws, row, values):
-    for i, v in enumerate(values, start=1):
-        _write_header_cell(ws, row=row, col=i, value=v)
+def _named_styles() -> list[NamedStyle]:
+    """
+    The styles used by the full cost model spreadsheet.  Each is registered once per workbook and cells
+    refer to it by name, rather than every cell carrying its own font, fill and border.
+    """
+    return [
+        NamedStyle(name="Section Title", font=Font(bold=True)),
+        NamedStyle(name="Table Header", font=Font(color=WHITE), fill=_dark_red_fill, border=_black_border),
+        NamedStyle(name="Bordered", border=_black_border),
+        NamedStyle(name="Bordered Amount", border=_black_border, number_format="#,##0.00"),
+        NamedStyle(name="Bordered Currency Amount", border=_black_border, number_format="$#,##0.00"),
+        NamedStyle(name="Amount", number_format="#,##0.00"),
+        NamedStyle(name="Percentage", number_format="0.00%"),
+        NamedStyle(name="Metadata Label", font=Font(bold=True), fill=_gray_fill, border=_black_border),
+        NamedStyle(
+            name="Metadata Text",
+            fill=_gray_fill,
+            border=_black_border,
+            alignment=Alignment(horizontal="left"),
+        ),
+        NamedStyle(
+            name="Metadata Value",
+            fill=_gray_fill,
+            border=_black_border,
+            alignment=Alignment(horizontal="left"),
+            number_format="#,##0.00",
+        ),
+        NamedStyle(
+            name="Metadata Date",
+            fill=_gray_fill,
+            border=_black_border,
+            alignment=Alignment(horizontal="left"),
+            number_format="yyyy-MM-dd",
+        ),
+    ]
+
+
+def full_cost_model_workbook() -> Workbook:
+    """
+    A write-only workbook for `write_full_cost_model_sheet`.  Rows are streamed to disk as they are
+    appended, so memory use doesn't grow with the size of the cost model.
+    """
+    workbook = Workbook(write_only=True)
+    for style in _named_styles():
+        workbook.add_named_style(style)
+    return workbook
+
+
+def _cell(ws: WriteOnlyWorksheet, value=None, style: str | None = None) -> WriteOnlyCell:
+    cell = WriteOnlyCell(ws, value=value)
+    if style:
+        cell.style = style
+    return cell
+
+
+def _header_row(ws: WriteOnlyWorksheet, values: list) -> list[WriteOnlyCell]:
+    return [_cell(ws, v, "Table Header") for v in values]
 
 
 def _get_other_cost_line_items(an_analysis: Analysis, intervention_instance: InterventionInstance):
@@ -45,6 +99,7 @@ def _get_other_cost_line_items(an_analysis: Analysis, intervention_instance: Int
             ],
             config__allocations__intervention_instance=intervention_instance,
         )
+        .select_related("config")
         .annotate(coalesced_allocation=Coalesce(F("config__allocations__allocation"), Decimal("100.00")))
         .annotate(allocated_cost=F("total_cost") * (F("coalesced_allocation") / Value(100)))
         .order_by("config__analysis_cost_type", "budget_line_description")
@@ -66,24 +121,199 @@ def _get_cost_breakdown_categories_and_cost_types(an_analysis: Analysis):
     )
 
 
-def _write_metadata_table(
-    ws: worksheet,
+def _get_full_cost_model_line_items(an_analysis: Analysis, intervention_instance: InterventionInstance):
+    return (
+        an_analysis.cost_line_items.all()
+        .exclude(config__analysis_cost_type__in=[AnalysisCostType.IN_KIND, AnalysisCostType.CLIENT_TIME])
+        .select_related("config", "config__cost_type", "config__category")
+        .annotate(
+            intervention_allocation=Subquery(
+                CostLineItemInterventionAllocation.objects.filter(
+                    cli_config=OuterRef("config"),
+                    intervention_instance=intervention_instance,
+                ).values("allocation")[:1]
+            )
+        )
+        .annotate(allocated_cost=F("total_cost") * (F("intervention_allocation") / Value(100)))
+        .order_by("-allocated_cost")
+    )
+
+
+def _get_full_cost_model_header(an_analysis: Analysis) -> list[str]:
+    header_row = [
+        "Cost Type",
+        "Category",
+        "Cost Item",
+        FieldLabelOverrides.label_for("ci_grant_code", "Grant"),
+        "Sector Code",
+        FieldLabelOverrides.label_for("tr_site_code", "Site"),
+        FieldLabelOverrides.label_for("ci_total_cost", "Total Cost"),
+        "% to Intervention",
+        "Notes",
+        "Item Total",
+    ]
+
+    if an_analysis.has_confirmed_subcomponent():
+        for each_label in an_analysis.subcomponent_cost_analysis.subcomponent_labels:
+            header_row.append(each_label)
+            header_row.append(each_label + " Total")
+    return header_row
+
+
+def write_full_cost_model_sheet(
+    workbook: Workbook,
+    an_analysis: Analysis,
+    intervention_instance: InterventionInstance,
+    analysis_url: str,
+):
+    """
+    Add a worksheet with the full cost model of one intervention instance to a workbook from
+    `full_cost_model_workbook`.
+
+    A write-only worksheet can only be written top to bottom, so the position of every table is worked
+    out first: the cost model table is counted rather than read, and the smaller tables are built in
+    memory.  That lets the formulas referring to later tables be filled in before anything is written,
+    after which the cost model rows are streamed straight from the database into the sheet.
+    """
+    fixed_title = re.sub(INVALID_TITLE_REGEX, " ", intervention_instance.display_name())
+    # In the Excel spec Worksheet names cannot be longer than 30 characters.
+    ws = workbook.create_sheet(fixed_title[:30])
+
+    full_cost_model_header = _get_full_cost_model_header(an_analysis)
+    for i in range(1, len(full_cost_model_header) + 1):
+        ws.column_dimensions[get_column_letter(i)].width = COLUMN_WIDTH
+
+    # Metadata Section
+    parameter_metadata = {}
+    metadata_rows = _metadata_rows(
+        ws=ws,
+        an_analysis=an_analysis,
+        parameter_metadata=parameter_metadata,
+        intervention_instance=intervention_instance,
+        analysis_url=analysis_url,
+    )
+    row = 1 + len(metadata_rows) + 2
+
+    # Cost Efficiency Section
+    metrics_all_costs_metadata = {}  # used to track references by the subcomponent formulas
+    first_cost_efficiency_row = row
+    cost_efficiency_rows = _cost_efficiency_rows(
+        ws=ws,
+        an_analysis=an_analysis,
+        starting_row=first_cost_efficiency_row,
+        metrics_all_costs_metadata=metrics_all_costs_metadata,
+        intervention_instance=intervention_instance,
+    )
+    row += len(cost_efficiency_rows) + 2
+
+    # Subcomponent Analysis Costs Section
+    first_subcomponent_analysis_cost_summary_row = row
+    subcomponent_rows = []
+    if an_analysis.has_confirmed_subcomponent():
+        subcomponent_rows = _cost_of_each_subcomponent_per_output_metric_rows(
+            ws=ws,
+            an_analysis=an_analysis,
+            intervention_instance=intervention_instance,
+        )
+        row += len(subcomponent_rows) + 2
+
+    # Cost Breakdown Section
+    first_cost_breakdown_row = row
+    cost_breakdown_rows, direct_cost_rows = _cost_breakdown_rows(ws, an_analysis, first_cost_breakdown_row)
+    last_cost_breakdown_row = first_cost_breakdown_row + len(cost_breakdown_rows) - 1
+    row = last_cost_breakdown_row + 2
+
+    # Cost Model Section, whose rows are only counted for now
+    first_full_cost_model_row = row
+    full_cost_model_line_items = _get_full_cost_model_line_items(an_analysis, intervention_instance)
+    last_full_cost_model_row = first_full_cost_model_row + 2 + full_cost_model_line_items.count()
+    row = last_full_cost_model_row + 2
+
+    # Other Cost Model Section
+    other_cost_rows = {
+        int(AnalysisCostType.IN_KIND): [],
+        int(AnalysisCostType.CLIENT_TIME): [],
+    }
+    first_other_cost_model_row = row
+    other_cost_model_rows = _other_cost_model_rows(
+        ws,
+        an_analysis,
+        intervention_instance,
+        other_cost_rows,
+        first_other_cost_model_row,
+    )
+
+    _fill_in_cost_breakdown_functions(
+        cost_breakdown_rows,
+        first_cost_breakdown_row,
+        first_cost_breakdown_row + 2,
+        last_cost_breakdown_row,
+        first_full_cost_model_row + 2,
+        last_full_cost_model_row,
+    )
+
+    _fill_in_cost_efficiency_functions(
+        rows=cost_efficiency_rows,
+        an_analysis=an_analysis,
+        intervention_instance=intervention_instance,
+        parameter_metadata=parameter_metadata,
+        direct_cost_rows=direct_cost_rows,
+        other_cost_rows=other_cost_rows,
+        full_cost_row=last_cost_breakdown_row,
+        efficiency_row=first_cost_efficiency_row + 1,
+        first_row=first_cost_efficiency_row,
+    )
+
+    if subcomponent_rows:
+        _fill_in_subcomponent_cost_efficiency_functions(
+            subcomponent_rows,
+            full_cost_model_header,
+            metrics_all_costs_metadata,
+            first_full_cost_model_row + 2,
+            last_full_cost_model_row,
+        )
+
+    sections = [
+        (1, metadata_rows),
+        (first_cost_efficiency_row, cost_efficiency_rows),
+        (first_subcomponent_analysis_cost_summary_row, subcomponent_rows),
+        (first_cost_breakdown_row, cost_breakdown_rows),
+        (
+            first_full_cost_model_row,
+            _full_cost_model_rows(
+                ws,
+                an_analysis,
+                full_cost_model_header,
+                full_cost_model_line_items,
+                intervention_instance,
+                first_full_cost_model_row,
+            ),
+        ),
+        (first_other_cost_model_row, other_cost_model_rows),
+    ]
+    row = 1
+    for first_row, rows in sections:
+        while row < first_row:
+            ws.append([])
+            row += 1
+        for each_row in rows:
+            ws.append(each_row)
+            row += 1
+
+
+def _metadata_rows(
+    ws: WriteOnlyWorksheet,
     an_analysis: Analysis,
     intervention_instance: InterventionInstance,
     parameter_metadata: dict,
     analysis_url: str,
-    starting_row: int = 1,
-) -> int:
+) -> list[list]:
     """
-    Write the metadata table to the provided worksheet in the upper left corner.
+    Build the metadata table, which goes in the upper left corner of the worksheet.
 
     Mutate the incoming parameter_metadata dictionary to contain row information for each parameter to be used later
     in the spreadsheet workflow
-
-    Returns the last row with data on it to position other things on the page.
     """
-    row = starting_row
-
     metadata = [
         ("Analysis Title", an_analysis.title),
         ("Analysis Type", getattr(an_analysis.analysis_type, "title", "")),
@@ -127,181 +357,147 @@ def _write_metadata_table(
         ("Analysis URL", analysis_url),
     ]
 
+    rows = []
     for key, val in metadata:
-        ws[f"A{row}"] = key
-        ws[f"A{row}"].fill = _gray_fill
-        ws[f"A{row}"].font = Font(bold=True)
-        ws[f"A{row}"].border = _black_border
-
-        ws[f"B{row}"].fill = _gray_fill
-        ws[f"B{row}"].border = _black_border
-        ws[f"B{row}"].alignment = Alignment(horizontal="left")
         if key in [
             "Value of Cash Distributed",
             "Value of Business Grant Amount",
         ]:
             # For these values we format things as currency
-            ws[f"B{row}"] = f"{currency_symbol(an_analysis)}{val:,.2f}"
+            value_cell = _cell(ws, f"{currency_symbol(an_analysis)}{val:,.2f}", "Metadata Text")
         elif key in [
             "Analysis Start Date",
             "Analysis End Date",
         ]:
             # For these values we format things as a date
-            ws[f"B{row}"] = val
-            ws[f"B{row}"].number_format = f"yyyy-MM-dd"
+            value_cell = _cell(ws, val, "Metadata Date")
         else:
-            ws[f"B{row}"] = val
-            ws[f"B{row}"].number_format = "#,##0.00"
-
-        row += 1
+            value_cell = _cell(ws, val, "Metadata Value")
+        rows.append([_cell(ws, key, "Metadata Label"), value_cell])
 
-    return row
+    return rows
 
 
-def _write_cost_efficiency_table(
-    ws: worksheet,
+def _cost_efficiency_rows(
+    ws: WriteOnlyWorksheet,
     an_analysis: Analysis,
     intervention_instance: InterventionInstance,
     starting_row: int = 1,
     metrics_all_costs_metadata: dict | None = None,
-) -> int:
+) -> list[list]:
     """
-    Write the cost efficiency table to the provided worksheet
+    Build the cost efficiency table
 
     metrics_all_costs_metadata: This dict tracks the address for
       values that are referenced by excel functions in other parts of this
       sheet.
-
-    Returns the last row with data on it to position other things on the page.
-
     """
-    row = starting_row
-
-    ws[f"A{row}"] = "Cost Efficiency"
-    ws[f"A{row}"].font = Font(bold=True)
+    rows = [[_cell(ws, "Cost Efficiency", "Section Title")]]
 
-    row += 1
     intervention_metrics = intervention_instance.intervention.output_metric_objects()
     output_costs = an_analysis.output_costs[str(intervention_instance.id)]
     each_metric: OutputMetric
     for idx, each_metric in enumerate(intervention_metrics):
         if each_metric.id not in output_costs:
             continue
-        ws[f"A{row}"] = f"{each_metric.metric_name} Program Costs only"
-        ws[f"A{row}"].border = _black_border
-
-        ws[f"B{row}"] = output_costs[each_metric.id]["direct_only"]
-        ws[f"B{row}"].border = _black_border
-
-        row += 1
-
-        ws[f"A{row}"] = f"{each_metric.metric_name} including Program Costs, Support Costs, Indirect Costs"
-        ws[f"A{row}"].border = _black_border
-
-        metrics_all_costs_metadata[each_metric.metric_name] = f"B{row}"
-
-        ws[f"B{row}"] = output_costs[each_metric.id]["all"]
-        ws[f"B{row}"].border = _black_border
+        rows.append(
+            [
+                _cell(ws, f"{each_metric.metric_name} Program Costs only", "Bordered"),
+                _cell(ws, output_costs[each_metric.id]["direct_only"], "Bordered"),
+            ]
+        )
 
-        row += 1
+        metrics_all_costs_metadata[each_metric.metric_name] = f"B{starting_row + len(rows)}"
+        rows.append(
+            [
+                _cell(
+                    ws,
+                    f"{each_metric.metric_name} including Program Costs, Support Costs, Indirect Costs",
+                    "Bordered",
+                ),
+                _cell(ws, output_costs[each_metric.id]["all"], "Bordered"),
+            ]
+        )
 
         if an_analysis.in_kind_contributions:
-            ws[f"A{row}"] = (
-                f"{each_metric.metric_name} including Program Costs, Support Costs, Indirect"
-                f" Costs, In-Kind Contributions"
+            rows.append(
+                [
+                    _cell(
+                        ws,
+                        f"{each_metric.metric_name} including Program Costs, Support Costs, Indirect"
+                        f" Costs, In-Kind Contributions",
+                        "Bordered",
+                    ),
+                    _cell(ws, output_costs[each_metric.id]["in_kind"], "Bordered"),
+                ]
             )
-            ws[f"A{row}"].border = _black_border
-
-            ws[f"B{row}"] = output_costs[each_metric.id]["in_kind"]
-            ws[f"B{row}"].border = _black_border
-
-            row += 1
 
         if an_analysis.client_time and idx == (len(intervention_metrics) - 1):
-            ws[f"A{row}"] = "Total Cost of Client Time"
-            ws[f"A{row}"].border = _black_border
-
-            ws[f"B{row}"] = output_costs[each_metric.id]["client"]
-            ws[f"B{row}"].border = _black_border
-
-            row += 1
+            rows.append(
+                [
+                    _cell(ws, "Total Cost of Client Time", "Bordered"),
+                    _cell(ws, output_costs[each_metric.id]["client"], "Bordered"),
+                ]
+            )
 
-    return row
+    return rows
 
 
-def _write_cost_of_each_subcomponent_per_output_metric_table(
-    ws: worksheet,
+def _cost_of_each_subcomponent_per_output_metric_rows(
+    ws: WriteOnlyWorksheet,
     an_analysis: Analysis,
     intervention_instance: InterventionInstance,
-    starting_row: int,
-) -> int:
+) -> list[list]:
     """
-    Write the "Cost of Each Sub-component, per OUTPUT METRIC" table to the provided worksheet
-
-    Returns the last row with data on it to position other things on the page.
+    Build the "Cost of Each Sub-component, per OUTPUT METRIC" table
     """
-
-    row = starting_row
-
+    rows = []
+    percentages = an_analysis.subcomponent_cost_analysis.cost_line_item_average(exclude_support_costs=False)
     for output_metric in intervention_instance.intervention.output_metric_objects():
-        ws[f"A{row}"] = f"Cost of Each Sub-component, per {output_metric}"
-        ws[f"A{row}"].font = Font(bold=True)
+        rows.append([_cell(ws, f"Cost of Each Sub-component, per {output_metric}", "Section Title")])
 
-        row += 1
-        percentages = an_analysis.subcomponent_cost_analysis.cost_line_item_average(
-            exclude_support_costs=False
-        )
         for idx, each_percentage in enumerate(percentages):
-            ws[f"A{row}"] = f"{an_analysis.subcomponent_cost_analysis.subcomponent_labels[idx]}"
-            ws[f"A{row}"].border = _black_border
-
-            # This is a placeholder value that is used when building the
-            # excel functions in `_fill_in_subcomponent_cost_efficiency_functions`
-            ws[f"B{row}"] = str(output_metric.metric_name)
-            ws[f"B{row}"].border = _black_border
-
-            row += 1
+            rows.append(
+                [
+                    _cell(
+                        ws, f"{an_analysis.subcomponent_cost_analysis.subcomponent_labels[idx]}", "Bordered"
+                    ),
+                    # This is a placeholder value that is used when building the
+                    # excel functions in `_fill_in_subcomponent_cost_efficiency_functions`
+                    _cell(ws, str(output_metric.metric_name), "Bordered"),
+                ]
+            )
 
-    return row
+    return rows
 
 
-def _write_cost_breakdown_table(
-    ws: worksheet,
+def _cost_breakdown_rows(
+    ws: WriteOnlyWorksheet,
     an_analysis: Analysis,
-    direct_cost_rows: list[int],
     starting_row: int,
-) -> int:
+) -> tuple[list[list], list[int]]:
     """
-    Write the cost breakdown table to the provided worksheet.  The data in this table has
-      functions that are dependent on other tables so this fills in blanks and then another
-      function goes back through and fills them in.
+    Build the cost breakdown table.  The data in this table has functions that are dependent on
+      other tables so this fills in blanks and then `_fill_in_cost_breakdown_functions` fills them in.
 
-    Mutate the incoming direct_cost_rows list to contain row information for each breakdown cost where
-    Cost Type is a Program Cost
-
-    Returns the last row with data on it to position other things on the page.
+    Returns the rows, and the row of each breakdown cost where Cost Type is a Program Cost.  The last
+    row is the total.
     """
-    row = starting_row
-
-    # Cost Breakdown Section
-    ws[f"A{row}"] = "Cost Breakdown"
-    ws[f"A{row}"].font = Font(bold=True)
-    row += 1
-
-    _write_header_row(
-        ws,
-        row,
-        [
-            FieldLabelOverrides.label_for("ci_cost_type", "Cost Type"),
-            "Category",
-            "Amount",
-            "% Of Total Amount",
-        ],
-    )
-
-    row += 1
+    direct_cost_rows = []
+    rows = [
+        [_cell(ws, "Cost Breakdown", "Section Title")],
+        _header_row(
+            ws,
+            [
+                FieldLabelOverrides.label_for("ci_cost_type", "Cost Type"),
+                "Category",
+                "Amount",
+                "% Of Total Amount",
+            ],
+        ),
+    ]
 
-    first_data_row = row
+    first_data_row = starting_row + len(rows)
     breakdown_data = _get_cost_breakdown_categories_and_cost_types(an_analysis)
     for each_breakdown in breakdown_data:
         cost_type_name = "Support"
@@ -322,38 +518,35 @@ def _write_cost_breakdown_table(
                     each_breakdown["config__analysis_cost_type"]
                 )
 
-        ws[f"A{row}"] = cost_type_name
-        ws[f"A{row}"].border = _black_border
-
-        ws[f"B{row}"] = category_name
-        ws[f"B{row}"].border = _black_border
-
-        ws[f"C{row}"] = 0
-        ws[f"C{row}"].number_format = "#,##0.00"
-        ws[f"C{row}"].border = _black_border
-
-        ws[f"D{row}"] = 0
-        ws[f"D{row}"].number_format = "#,##0.00"
-        ws[f"D{row}"].border = _black_border
-
         # Store Program Cost rows necessary to input the proper formula
         if each_breakdown["config__cost_type__type"] == ProgramCost.id:
-            direct_cost_rows.append(row)
-
-        row += 1
-    ws[f"C{row}"] = f"=SUM(C{first_data_row}:C{row - 1})"
-    ws[f"C{row}"].number_format = "#,##0.00"
-    ws[f"C{row}"].border = _black_border
+            direct_cost_rows.append(starting_row + len(rows))
+
+        rows.append(
+            [
+                _cell(ws, cost_type_name, "Bordered"),
+                _cell(ws, category_name, "Bordered"),
+                _cell(ws, 0, "Bordered Amount"),
+                _cell(ws, 0, "Bordered Amount"),
+            ]
+        )
 
-    ws[f"D{row}"] = f"=SUM(D{first_data_row}:D{row - 1})"
-    ws[f"D{row}"].number_format = "#,##0.00"
-    ws[f"D{row}"].border = _black_border
+    row = starting_row + len(rows)
+    rows.append(
+        [
+            None,
+            None,
+            _cell(ws, f"=SUM(C{first_data_row}:C{row - 1})", "Bordered Amount"),
+            _cell(ws, f"=SUM(D{first_data_row}:D{row - 1})", "Bordered Amount"),
+        ]
+    )
 
-    return row
+    return rows, direct_cost_rows
 
 
 def _fill_in_cost_breakdown_functions(
-    ws: worksheet,
+    rows: list[list],
+    first_row: int,
     first_data_row: int,
     last_data_row: int,
     full_cost_model_first_data_row: int,
@@ -362,7 +555,7 @@ def _fill_in_cost_breakdown_functions(
     row = first_data_row
 
     while row < last_data_row:
-        ws[f"C{row}"] = (
+        rows[row - first_row][2].value = (
             f"=SUMIFS("
             f"J{full_cost_model_first_data_row}:J{full_cost_model_last_data_row}, "
             f"A{full_cost_model_first_data_row}:A{full_cost_model_last_data_row}, "
@@ -371,14 +564,14 @@ def _fill_in_cost_breakdown_functions(
             f"B{row}"
             f")"
         )
-        ws[f"D{row}"] = (
-            f"=C{row}/SUM(J{full_cost_model_first_data_row}:J{full_cost_model_last_data_row}) * 100"
-        )
+        rows[row - first_row][
+            3
+        ].value = f"=C{row}/SUM(J{full_cost_model_first_data_row}:J{full_cost_model_last_data_row}) * 100"
         row += 1
 
 
 def _fill_in_cost_efficiency_functions(
-    ws: worksheet,
+    rows: list[list],
     an_analysis: Analysis,
     intervention_instance: InterventionInstance,
     parameter_metadata: dict,
@@ -386,11 +579,16 @@ def _fill_in_cost_efficiency_functions(
     other_cost_rows: dict[int, list[int]],
     full_cost_row: int,
     efficiency_row: int,
+    first_row: int,
 ):
     """
     Retroactively update the Cost Efficiency rows with formula values
     """
 
+    def set_formula(formula: str):
+        if efficiency_row - first_row < len(rows):
+            rows[efficiency_row - first_row][1].value = formula
+
     # Convert list of direct cost rows to an Excel-compatible string (all will be in column C)
     direct_cost_ids = ", ".join([f"C{row}" for row in direct_cost_rows])
 
@@ -412,14 +610,14 @@ def _fill_in_cost_efficiency_functions(
         param_to_excel_map.update({"cost_output_sum": f"SUM({direct_cost_ids})"})
         eq_1 = metric.convert_calculate_to_excel_formula(param_to_excel_map)
         if eq_1:
-            ws[f"B{efficiency_row}"] = f"=FIXED({eq_1}, 2)"
+            set_formula(f"=FIXED({eq_1}, 2)")
             efficiency_row += 1
 
         # Full Cost
         param_to_excel_map.update({"cost_output_sum": f"C{full_cost_row}"})
         eq_2 = metric.convert_calculate_to_excel_formula(param_to_excel_map)
         if eq_2:
-            ws[f"B{efficiency_row}"] = f"=FIXED({eq_2}, 2)"
+            set_formula(f"=FIXED({eq_2}, 2)")
             efficiency_row += 1
 
         # In-Kind Cost
@@ -428,21 +626,20 @@ def _fill_in_cost_efficiency_functions(
             param_to_excel_map.update({"cost_output_sum": f"SUM({in_kind_ids})"})
             eq_3 = metric.convert_calculate_to_excel_formula(param_to_excel_map)
             if eq_3:
-                ws[f"B{efficiency_row}"] = f"=FIXED(({eq_2}) + ({eq_3}), 2)"
+                set_formula(f"=FIXED(({eq_2}) + ({eq_3}), 2)")
                 efficiency_row += 1
 
         # Client Time Cost
         # This value is a standard sum and not calculated on a "per unit" basis
         if an_analysis.client_time and idx == (len(an_analysis_metrics) - 1):
-            ws[f"B{efficiency_row}"] = f"=FIXED(SUM({client_time_ids}), 2)"
+            set_formula(f"=FIXED(SUM({client_time_ids}), 2)")
             efficiency_row += 1
 
 
 def _fill_in_subcomponent_cost_efficiency_functions(
-    ws: worksheet,
+    rows: list[list],
+    full_cost_model_headers: list[str],
     metrics_all_costs_metadata: dict,
-    first_data_row: int,
-    last_data_row: int,
     full_cost_model_first_data_row: int,
     full_cost_model_last_data_row: int,
 ):
@@ -451,17 +648,11 @@ def _fill_in_subcomponent_cost_efficiency_functions(
 
     This is a complex function needing to know the location of a number of dynamic values.
     """
-
-    row = first_data_row
-
-    # Get a list of strings that are the header values.   This is used to lookup a value used in the excel function
-    full_cost_model_headers = [c.value for c in ws[full_cost_model_first_data_row - 1]]
-
-    while row < last_data_row:
+    for each_row in rows:
         # Find which column has the Subcomponent Total for the Subcomponent in this Row
         try:
             subcomponent_column = get_column_letter(
-                full_cost_model_headers.index(ws[f"A{row}"].value + " Total") + 1
+                full_cost_model_headers.index(each_row[0].value + " Total") + 1
             )
         except ValueError:
             # We can assume when this happens it has hit a header for one of the Subcomponent Sub Sections.
@@ -480,14 +671,13 @@ def _fill_in_subcomponent_cost_efficiency_functions(
             #   28      subcomponentlabel1
             #   29      subcomponentlabel2
             #
-            row += 1
             continue
         # Create a function that takes the percentage of the Subcomponent to the relevant Cost Total
         #   and applies that percentage to relevant metric's Efficiency Cost
-        if ws[f"B{row}"].value in metrics_all_costs_metadata:
+        if each_row[1].value in metrics_all_costs_metadata:
             v = (
                 "="
-                + metrics_all_costs_metadata[ws[f"B{row}"].value]
+                + metrics_all_costs_metadata[each_row[1].value]
                 + " * "
                 + f"SUM({subcomponent_column}{full_cost_model_first_data_row}:{subcomponent_column}{full_cost_model_last_data_row})"
                 + " / "
@@ -499,84 +689,28 @@ def _fill_in_subcomponent_cost_efficiency_functions(
             )
         else:
             v = ""
-        c = ws.cell(
-            row=row,
-            column=2,
-            value=v,
-        )
-
-        c.number_format = "$#,##0.00"
-
-        row += 1
+        each_row[1].value = v
+        each_row[1].style = "Bordered Currency Amount"
 
 
-def _write_full_cost_model_table(
-    ws: worksheet,
+def _full_cost_model_rows(
+    ws: WriteOnlyWorksheet,
     an_analysis: Analysis,
-    starting_row: int,
+    header_row: list[str],
+    cost_line_items,
     intervention_instance: InterventionInstance,
-) -> int:
+    starting_row: int,
+):
     """
-    Write the full cost model table to the provided worksheet
-
-    Returns the last row with data on it to position other things on the page.
+    Generate the rows of the full cost model table, reading the cost line items in chunks from a
+    server-side cursor.
     """
-    row = starting_row
+    yield [_cell(ws, "Cost Model", "Section Title")]
+    yield _header_row(ws, header_row)
 
-    ws[f"A{row}"] = "Cost Model"
-    ws[f"A{row}"].font = Font(bold=True)
-    row += 1
-
-    header_row = [
-        "Cost Type",
-        "Category",
-        "Cost Item",
-        FieldLabelOverrides.label_for("ci_grant_code", "Grant"),
-        "Sector Code",
-        FieldLabelOverrides.label_for("tr_site_code", "Site"),
-        FieldLabelOverrides.label_for("ci_total_cost", "Total Cost"),
-        "% to Intervention",
-        "Notes",
-        "Item Total",
-    ]
-
-    if (
-        hasattr(an_analysis, "subcomponent_cost_analysis")
-        and an_analysis.subcomponent_cost_analysis.subcomponent_labels_confirmed
-    ):
-        for each_label in an_analysis.subcomponent_cost_analysis.subcomponent_labels:
-            header_row.append(each_label)
-            header_row.append(each_label + " Total")
-
-    _write_header_row(ws, row, header_row)
-
-    row += 1
-
-    cost_line_items = (
-        an_analysis.cost_line_items.all()
-        .exclude(config__analysis_cost_type__in=[AnalysisCostType.IN_KIND, AnalysisCostType.CLIENT_TIME])
-        .prefetch_related(
-            "config",
-            "config__cost_type",
-            "config__category",
-            "config__allocations",
-        )
-        .annotate(
-            allocated_cost=F("total_cost")
-            * (
-                Subquery(
-                    CostLineItemInterventionAllocation.objects.filter(
-                        cli_config=OuterRef("config"),
-                        intervention_instance=intervention_instance,
-                    ).values("allocation")[:1]
-                )
-                / Value(100)
-            )
-        )
-        .order_by("-allocated_cost")
-    )
-
-    for each_cost_line_item in cost_line_items:
+    has_confirmed_subcomponent = an_analysis.has_confirmed_subcomponent()
+    row = starting_row + 2
+    for each_cost_line_item in cost_line_items.iterator(chunk_size=COST_MODEL_CHUNK_SIZE):
         cost_type_name = "Support"
         if each_cost_line_item.config.cost_type:
             cost_type_name = each_cost_line_item.config.cost_type.name
@@ -589,13 +723,6 @@ def _write_full_cost_model_table(
         elif each_cost_line_item.config.analysis_cost_type:
             category_name = each_cost_line_item.config.get_pretty_analysis_cost_type
 
-        # Use prefetch cache by iterating instead of .get() which bypasses cache
-        cli_allocation = 0
-        for allocation in each_cost_line_item.config.allocations.all():
-            if allocation.intervention_instance_id == intervention_instance.id:
-                cli_allocation = allocation.allocation
-                break
-
         row_data = [
             cost_type_name,
             category_name,
@@ -603,103 +730,81 @@ def _write_full_cost_model_table(
             each_cost_line_item.grant_code,
             each_cost_line_item.sector_code,
             each_cost_line_item.site_code,
-            each_cost_line_item.total_cost,
-            cli_allocation,
+            _cell(ws, each_cost_line_item.total_cost, "Amount"),
+            _cell(ws, each_cost_line_item.intervention_allocation or 0, "Amount"),
             each_cost_line_item.note,
-            f"=(G{row} * H{row})/100",
+            _cell(ws, f"=(G{row} * H{row})/100", "Amount"),
         ]
-        for i, each in enumerate(row_data, start=1):
-            ws.cell(row=row, column=i, value=each)
-
-        ws[f"G{row}"].number_format = "#,##0.00"
-        ws[f"H{row}"].number_format = "#,##0.00"
-        ws[f"J{row}"].number_format = "#,##0.00"
-
-        if (
-            hasattr(an_analysis, "subcomponent_cost_analysis")
-            and an_analysis.subcomponent_cost_analysis.subcomponent_labels_confirmed
-            and getattr(each_cost_line_item.config, "subcomponent_analysis_allocations", None)
-        ):
+
+        if has_confirmed_subcomponent and each_cost_line_item.config.subcomponent_analysis_allocations:
             subcomponent_analysis_start_column = len(row_data) + 1
             for (
                 idx,
                 each_subcomponent_allocation,
             ) in each_cost_line_item.config.subcomponent_analysis_allocations.items():
-                percentage = ws.cell(
-                    row=row,
-                    column=subcomponent_analysis_start_column + (int(idx) * 2),
-                    value=Decimal(each_subcomponent_allocation) / 100,
+                percentage_column = subcomponent_analysis_start_column + (int(idx) * 2)
+                if len(row_data) < percentage_column + 1:
+                    row_data += [None] * (percentage_column + 1 - len(row_data))
+                row_data[percentage_column - 1] = _cell(
+                    ws, Decimal(each_subcomponent_allocation) / 100, "Percentage"
                 )
-                total = ws.cell(
-                    row=row,
-                    column=subcomponent_analysis_start_column + ((int(idx) * 2) + 1),
-                    value=f"={get_column_letter(len(row_data))}{row} * {get_column_letter(subcomponent_analysis_start_column + (int(idx) * 2))}{row}",
+                row_data[percentage_column] = _cell(
+                    ws,
+                    f"=J{row} * {get_column_letter(percentage_column)}{row}",
+                    "Amount",
                 )
-                percentage.number_format = "0.00%"
-                total.number_format = "#,##0.00"
 
+        yield row_data
         row += 1
 
-    return row
-
 
-def _write_other_cost_model_table(
-    ws: worksheet,
+def _other_cost_model_rows(
+    ws: WriteOnlyWorksheet,
     an_analysis: Analysis,
     intervention_instance: InterventionInstance,
     other_cost_rows: dict[int, list[int]],
     starting_row: int,
-) -> int:
+) -> list[list]:
     """
-    Write the other cost model table to the provided worksheet
+    Build the other cost model table
 
-    Returns the last row with data on it to position other things on the page.
+    Mutate the incoming other_cost_rows to contain the row of each In-Kind Contribution and Client Time cost.
     """
-    row = starting_row
-
     # Early exit if there are no other costs for In-Kind Contributions or Client Time
     # Other HQ Costs are included in the standard cost model table
     if not (an_analysis.client_time or an_analysis.in_kind_contributions):
-        return row
-
-    ws[f"A{row}"] = "Other HQ Costs"
-    ws[f"A{row}"].font = Font(bold=True)
-    row += 1
-    _write_header_row(
-        ws,
-        row,
-        [
-            "Category",
-            "Cost Item",
-            "Total Cost",
-            "% of Intervention",
-            "Item Total",
-            "Notes",
-        ],
-    )
-
-    row += 1
+        return []
+
+    rows = [
+        [_cell(ws, "Other HQ Costs", "Section Title")],
+        _header_row(
+            ws,
+            [
+                "Category",
+                "Cost Item",
+                "Total Cost",
+                "% of Intervention",
+                "Item Total",
+                "Notes",
+            ],
+        ),
+    ]
 
     for each_cost_line_item in _get_other_cost_line_items(an_analysis, intervention_instance):
-        ws[f"A{row}"] = each_cost_line_item.config.get_pretty_analysis_cost_type
-        ws[f"B{row}"] = each_cost_line_item.budget_line_description
-        ws[f"C{row}"] = each_cost_line_item.total_cost
-        ws[f"C{row}"].number_format = "#,##0.00"
-        ws[f"D{row}"] = each_cost_line_item.coalesced_allocation
-        ws[f"D{row}"].number_format = "#,##0.00"
-        ws[f"E{row}"] = f"=(C{row} * D{row})/100"
-        ws[f"E{row}"].number_format = "#,##0.00"
-        ws[f"F{row}"] = each_cost_line_item.note
+        row = starting_row + len(rows)
+        rows.append(
+            [
+                each_cost_line_item.config.get_pretty_analysis_cost_type,
+                each_cost_line_item.budget_line_description,
+                _cell(ws, each_cost_line_item.total_cost, "Amount"),
+                _cell(ws, each_cost_line_item.coalesced_allocation, "Amount"),
+                _cell(ws, f"=(C{row} * D{row})/100", "Amount"),
+                each_cost_line_item.note,
+            ]
+        )
 
         cost_type = int(each_cost_line_item.config.analysis_cost_type)
         if cost_type in other_cost_rows:
             other_cost_rows[cost_type].append(row)
 
-        row += 1
-
-    return row
-
-
-def _formatting_pass(ws: worksheet):
-    for i, each_col in enumerate(ws.columns, 1):
-        ws.column_dimensions[get_column_letter(i)].width = 26
+    return rows
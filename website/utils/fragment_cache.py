@@ -0,0 +1,8 @@
+from website.utils.model_cache import VersionStamp
+
+# How long, in seconds, a cached fragment is kept if nothing invalidates it first
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# The intervention groups in the main menu's "Program Design Lessons" dropdown.  Templates cache the menu
+# with `{% cache %}` under this stamp, so every worker renders it again once it's invalidated.
+intervention_menu = VersionStamp("intervention-menu")
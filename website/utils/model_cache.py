@@ -0,0 +1,137 @@
+import functools
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_save
+
+from website.models.cache_version import CacheVersion
+
+# How long, in seconds, a value cached with `model_cache` is kept if nothing invalidates it first
+MODEL_CACHE_TIMEOUT = 60 * 60 * 24
+
+_missing = object()
+
+
+class VersionStamps:
+    """
+    The `CacheVersion` stamps, as this thread last read them.
+
+    All the stamps are read with one query, at most once per request: the snapshot is dropped when a
+    request starts, and outside requests (e.g. management commands) when it's older than `MAX_AGE` seconds.
+    A cache without a row has version 0.
+    """
+
+    MAX_AGE = 5
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get(self, name: str) -> int:
+        stamps = getattr(self._local, "stamps", None)
+        if stamps is None or time.monotonic() - self._local.read_at > self.MAX_AGE:
+            stamps = dict(CacheVersion.objects.values_list("name", "version"))
+            self._local.stamps = stamps
+            self._local.read_at = time.monotonic()
+        return stamps.get(name, 0)
+
+    def bump(self, name: str):
+        """Give `name` a new stamp, in the surrounding transaction if there is one."""
+        version = time.time_ns()
+        CacheVersion.objects.bulk_create(
+            [CacheVersion(name=name, version=version)],
+            update_conflicts=True,
+            unique_fields=["name"],
+            update_fields=["version"],
+        )
+        stamps = getattr(self._local, "stamps", None)
+        if stamps is not None:
+            stamps[name] = version
+
+    def expire(self, **kwargs):
+        """Read the stamps again when next needed."""
+        self._local.stamps = None
+
+
+version_stamps = VersionStamps()
+request_started.connect(version_stamps.expire, dispatch_uid="website.utils.model_cache.expire")
+
+
+class VersionStamp:
+    """
+    One named `CacheVersion` stamp, for a cache of database rows that every worker must drop when they
+    change: the cache is keyed on, or compared with, `get()`, and `invalidate()` sets a new stamp, which
+    each worker reads at its next request.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def get(self) -> int:
+        return version_stamps.get(self.name)
+
+    def invalidate(self, *args, **kwargs):
+        version_stamps.bump(self.name)
+
+
+# Every function decorated with `model_cache`, by name
+model_caches = {}
+
+
+def model_cache(*models, timeout=MODEL_CACHE_TIMEOUT):
+    """
+    Cache what the decorated function, which takes no arguments, returns from the database, until an
+    instance of one of `models` is saved or deleted.
+
+    The value is kept in the shared cache under the function's `CacheVersion` stamp, and in memory for the
+    stamp this process last used.  Saving or deleting an instance of one of `models` (in any worker) sets a
+    new stamp, so each worker computes the value again, or takes it from the shared cache, when next called.
+    Bulk writes don't send the signals, so call the function's `invalidate()` after them.
+
+    The value is shared between callers and must not be mutated.
+    """
+
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        stamp = VersionStamp(name)
+        # The (version, value) this process last used
+        memo = None
+
+        @functools.wraps(func)
+        def wrapper():
+            nonlocal memo
+            version = stamp.get()
+            if memo is not None and memo[0] == version:
+                return memo[1]
+            key = f"model-cache:{name}:{version}"
+            value = cache.get(key, _missing)
+            if value is _missing:
+                value = func()
+                cache.set(key, value, timeout)
+            memo = (version, value)
+            return value
+
+        def cache_clear():
+            """Forget the value this process holds in memory, e.g. between tests."""
+            nonlocal memo
+            memo = None
+
+        wrapper.invalidate = stamp.invalidate
+        wrapper.cache_clear = cache_clear
+        for model in models:
+            for signal in (post_save, post_delete):
+                signal.connect(
+                    stamp.invalidate, sender=model, weak=False, dispatch_uid=f"{name}:{model._meta.label}"
+                )
+        model_caches[name] = wrapper
+        return wrapper
+
+    return decorator
+
+
+def clear_model_caches():
+    """Forget the stamps and values this process holds in memory, e.g. between tests."""
+    version_stamps.expire()
+    for wrapper in model_caches.values():
+        wrapper.cache_clear()
@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import Count, F, OrderBy, Q, Window
+from django.db.models.functions import Mod, RowNumber
+from django.utils.functional import cached_property
+
+
+class KeysetPaginator(Paginator):
+    """
+    A Paginator that seeks to each page by the sort key of its first row (keyset pagination) instead of
+    counting the whole join and then OFFSET scanning up to the page.
+
+    `ordering` must make the order total, e.g. by ending with "id".  Each term the queryset then orders
+    by is annotated as a sort key, so pages are sought on exactly what the rows are sorted by, even
+    when a custom `order_by` (like `CostLineItemQuerySet`'s natural sort) expands a field into several
+    expressions.  The sort keys of each page's first row are picked out in the database by their
+    `row_number()` and cached with the row count under `cache_key` (when given), so page links and counts
+    cost no queries until the key changes.  Each page is then one
+    `WHERE (sort key) >= (first row's key) LIMIT per_page` query, so any prefetches only run for the
+    visible rows.  NULLs sort the way PostgreSQL does: last when ascending, first when descending.
+    """
+
+    def __init__(self, object_list, per_page, ordering: list[str], cache_key: str | None = None, **kwargs):
+        sort_keys = {}
+        self.ordering = []
+        for i, term in enumerate(object_list.order_by(*ordering).query.order_by):
+            if isinstance(term, OrderBy):
+                expression, descending = term.expression, term.descending
+            elif isinstance(term, str):
+                expression, descending = F(term.removeprefix("-")), term.startswith("-")
+            else:
+                expression, descending = term, False
+            name = f"keyset_{i}"
+            sort_keys[name] = expression
+            self.ordering.append(f"-{name}" if descending else name)
+        super().__init__(object_list.annotate(**sort_keys).order_by(*self.ordering), per_page, **kwargs)
+        self.cache_key = cache_key
+
+    @cached_property
+    def _index(self) -> dict:
+        index = cache.get(self.cache_key) if self.cache_key else None
+        if index is None:
+            fields = [field.removeprefix("-") for field in self.ordering]
+            # Only the first row of each page is read, with the row count
+            boundaries = list(
+                self.object_list.annotate(
+                    keyset_row=Window(RowNumber(), order_by=self.ordering),
+                    keyset_count=Window(Count("*")),
+                )
+                .annotate(keyset_offset=Mod(F("keyset_row") - 1, self.per_page))
+                .filter(keyset_offset=0)
+                .order_by("keyset_row")
+                .values_list("keyset_count", *fields)
+            )
+            index = {
+                "count": boundaries[0][0] if boundaries else 0,
+                "page_keys": [row[1:] for row in boundaries],
+            }
+            if self.cache_key:
+                cache.set(self.cache_key, index, settings.INSIGHTS_CACHE_TIMEOUT)
+        return index
+
+    @cached_property
+    def count(self) -> int:
+        return self._index["count"]
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if self.count == 0:
+            return self._get_page([], number, self)
+        page_key = self._index["page_keys"][number - 1]
+        object_list = self.object_list.filter(self._from_key(page_key))[: self.per_page]
+        return self._get_page(list(object_list), number, self)
+
+    def _from_key(self, key: tuple) -> Q:
+        """Rows sorting at or after `key`: after it on some column and equal on every column before that."""
+        condition = Q()
+        equal_so_far = Q()
+        for field, value in zip(self.ordering, key):
+            name = field.removeprefix("-")
+            condition |= equal_so_far & self._after(name, value, descending=field.startswith("-"))
+            equal_so_far &= self._equal(name, value)
+        return condition | equal_so_far
+
+    @staticmethod
+    def _equal(name: str, value) -> Q:
+        if value is None:
+            return Q(**{f"{name}__isnull": True})
+        return Q(**{name: value})
+
+    @staticmethod
+    def _after(name: str, value, descending: bool) -> Q:
+        if value is None:
+            # NULLs come first when descending, so every other value is after them, and last when ascending
+            return Q(**{f"{name}__isnull": False}) if descending else Q(pk__in=[])
+        if descending:
+            return Q(**{f"{name}__lt": value})
+        return Q(**{f"{name}__gt": value}) | Q(**{f"{name}__isnull": True})
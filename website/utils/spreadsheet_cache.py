@@ -0,0 +1,94 @@
+import hashlib
+import json
+import os
+import tempfile
+from collections.abc import Callable
+from pathlib import Path
+from typing import BinaryIO
+
+from django.conf import settings
+from django.forms.models import model_to_dict
+
+from website.models import Analysis
+from website.models.utils import _get_overrides
+
+# Bump when the spreadsheet layout changes, so files generated by the previous version aren't served
+FORMAT_VERSION = 1
+
+
+class SpreadsheetCache:
+    """
+    Generated full cost model spreadsheets, kept on local disk in `SPREADSHEET_CACHE_DIR`.
+
+    Files are keyed by analysis and a digest of its `data_version` (and the field label overrides used in
+    the headers), which doubles as the download's ETag.  A new version of an analysis' spreadsheet
+    replaces the old one, and once the directory grows past `SPREADSHEET_CACHE_MAX_SIZE` bytes the least
+    recently served files are removed.  Each web server process shares the directory, so writes go to a
+    temporary file that is renamed into place.
+    """
+
+    @property
+    def directory(self) -> Path:
+        return Path(settings.SPREADSHEET_CACHE_DIR)
+
+    def etag(self, analysis: Analysis) -> str:
+        overrides = json.dumps(model_to_dict(_get_overrides(), exclude=["id"]), sort_keys=True, default=str)
+        digest = hashlib.sha256(
+            f"{FORMAT_VERSION}:{analysis.data_version}:{overrides}".encode(), usedforsecurity=False
+        ).hexdigest()[:32]
+        return f'W/"{digest}"'
+
+    def _path(self, analysis: Analysis, etag: str) -> Path:
+        return self.directory / f"analysis-{analysis.pk}-{etag[3:-1]}.xlsx"
+
+    def get(self, analysis: Analysis, etag: str) -> BinaryIO | None:
+        """The cached spreadsheet for `etag`, opened, or None."""
+        path = self._path(analysis, etag)
+        try:
+            # Once open, the file can still be read if another process evicts it
+            spreadsheet = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        # The modification time records when a file was last served, for eviction
+        path.touch()
+        return spreadsheet
+
+    def put(self, analysis: Analysis, etag: str, save: Callable[[str], None]) -> BinaryIO:
+        """Store the spreadsheet `save` writes to the path it is given, returning it opened."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(analysis, etag)
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            save(temporary_path)
+            os.replace(temporary_path, path)
+        finally:
+            Path(temporary_path).unlink(missing_ok=True)
+        spreadsheet = open(path, "rb")
+
+        for previous_version in self.directory.glob(f"analysis-{analysis.pk}-*.xlsx"):
+            if previous_version != path:
+                previous_version.unlink(missing_ok=True)
+        self._evict(keep=path)
+        return spreadsheet
+
+    def _evict(self, keep: Path):
+        entries = []
+        for path in self.directory.glob("analysis-*.xlsx"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total_size <= settings.SPREADSHEET_CACHE_MAX_SIZE:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total_size -= size
+
+
+spreadsheet_cache = SpreadsheetCache()
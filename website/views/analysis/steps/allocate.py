@@ -10,7 +10,6 @@ from django_filters.views import FilterView
 from ombucore.admin.views import FilterMixin
 from website.filterset import AllocateCostTypeGrantSiteFilterSet
 from website.models import CostLineItem
-from website.models import InterventionInstance
 from website.models.cost_type import Indirect, ProgramCost, Support
 from website.views.mixins import (
     AllocateMixin,
@@ -69,7 +68,9 @@ class AllocateSupportingCosts(AnalysisPermissionRequiredMixin, AnalysisStepMixin
             self.step = self.parent_step.steps[0]
 
         self.special_cost_line_items = [
-            c for c in self.analysis.special_country_cost_line_items if c.grant_code == self.grant_code
+            c
+            for c in self.analysis.snapshot.special_country_cost_line_items
+            if c.grant_code == self.grant_code
         ]
 
         self.special_cost_line_items = sorted(
@@ -112,10 +113,12 @@ class AllocateSupportingCosts(AnalysisPermissionRequiredMixin, AnalysisStepMixin
             good_data = {key: data[key] for key in data if key not in errors}
             if good_data:
                 self._save_data(good_data)
+            self.analysis.refresh_snapshot()
 
             return self.render_to_response(context)
         else:
             self._save_data(data)
+            self.analysis.refresh_snapshot()
             self.workflow.invalidate_step("insights")
             self.workflow.calculate_if_possible()
         query = f"?{request.GET.urlencode()}" if request.GET else ""
@@ -187,12 +190,6 @@ class AllocateSupportingCosts(AnalysisPermissionRequiredMixin, AnalysisStepMixin
 
         return standard_cost_lines_cost / cost_denom
 
-    def _save_data(self, data):
-        for cost_line_item_id, allocation in data.items():
-            cost_line_item = self.analysis.cost_line_items.get(pk=cost_line_item_id)
-            cost_line_item.config.allocation = allocation
-            cost_line_item.config.save()
-
 
 class AllocateCostTypeGrant(
     FilterMixin,
@@ -227,12 +224,11 @@ class AllocateCostTypeGrant(
                 "cost_type_category",
                 "cost_type_category__category",
             )
-            .prefetch_related(
-                "cost_type_category__analysis__unfiltered_cost_line_items",
-                "cost_type_category__analysis__unfiltered_cost_line_items__config__allocations",
-            )
             .distinct()
         )
+        # Point every grant back at this analysis so their helpers share its snapshot
+        for cost_type_category_grant in self.cost_type_category_grants:
+            cost_type_category_grant.cost_type_category.analysis = self.analysis
 
     def modify_queryset(self, queryset):
         return (
@@ -261,9 +257,12 @@ class AllocateCostTypeGrant(
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
+        snapshot = self.analysis.snapshot
         cost_line_items_count = 0
         for cost_type_category_grant in self.cost_type_category_grants:
-            cost_line_items_count += cost_type_category_grant.get_cost_line_items().count()
+            cost_line_items_count += len(
+                snapshot.cost_line_items_for_cost_type_category_grant(cost_type_category_grant)
+            )
 
         context.update(
             {
@@ -280,7 +279,16 @@ class AllocateCostTypeGrant(
         context["suggested_allocation_calculations"] = {}
         if self.step.cost_type.type_obj().shared:
             suggested_allocations = self.analysis.get_suggested_allocations()
-            for intervention_instance in self.analysis.interventioninstance_set.all():
+            first_cost_line_item = snapshot.cost_line_item(
+                self.cost_type_category_grants.first()
+                .get_cost_line_items()
+                .values_list("id", flat=True)
+                .first()
+            )
+            existing_allocations = (
+                snapshot.allocations_for(first_cost_line_item) if first_cost_line_item else {}
+            )
+            for intervention_instance in snapshot.intervention_instances:
                 (
                     numerator,
                     denominator,
@@ -297,12 +305,7 @@ class AllocateCostTypeGrant(
                     "suggested_allocation": suggested_allocation,
                 }
 
-                existing_allocation_obj = (
-                    self.cost_type_category_grants.first()
-                    .get_cost_line_items()
-                    .first()
-                    .config.allocations.filter(intervention_instance=intervention_instance)
-                ).first()
+                existing_allocation_obj = existing_allocations.get(intervention_instance.id)
                 if (
                     suggested_allocation
                     and existing_allocation_obj
@@ -343,6 +346,8 @@ class AllocateCostTypeGrant(
         if len(errors):
             context = self.get_context_data(errors=errors)
             self._clear_fields_needing_help(errors)
+            self.analysis.refresh_snapshot()
+            snapshot = self.analysis.snapshot
             line_items_needing_help = self._line_item_objects_needing_help(errors)
             for grant in self.cost_type_category_grants:
                 if grant.all_errors():
@@ -351,24 +356,28 @@ class AllocateCostTypeGrant(
                     context["item_costs"] = self.calc_item_costs()
                     context["all_errors_suggest"] = self.calc_all_errors_suggest()
 
+                grant_line_items = snapshot.cost_line_items_for_cost_type_category_grant(grant)
                 for line in line_items_needing_help:
-                    if line in grant.get_cost_line_items():
+                    if line in grant_line_items:
                         grant.show_allocation_calculator = True
 
             # We should attempt to save the items that were not in error
             good_data = {key: data[key] for key in data if key not in errors}
             if good_data:
                 self._save_data(good_data)
+                self.analysis.refresh_snapshot()
 
             return self.render_to_response(context)
         else:
             self._save_data(data)
+            self.analysis.refresh_snapshot()
             self.workflow.invalidate_step("insights")
             self.workflow.calculate_if_possible()
         query = f"?{request.GET.urlencode()}" if request.GET else ""
         return redirect(self.request.path + query)
 
     def _line_item_objects_needing_help(self, errors):
+        snapshot = self.analysis.snapshot
         error_lines = []
         for cost_line_item_id, intervention_allocations_error_messages in errors.items():
             for (
@@ -376,53 +385,28 @@ class AllocateCostTypeGrant(
                 error_message,
             ) in intervention_allocations_error_messages.items():
                 if intervention_id == "all":
-                    c = CostLineItem.objects.get(id=cost_line_item_id)
+                    c = snapshot.cost_line_item(cost_line_item_id) or CostLineItem.objects.get(
+                        id=cost_line_item_id
+                    )
                     error_lines.append(c)
 
                 if error_message == "Not a number":
-                    c = CostLineItem.objects.get(id=cost_line_item_id)
+                    c = snapshot.cost_line_item(cost_line_item_id) or CostLineItem.objects.get(
+                        id=cost_line_item_id
+                    )
                     error_lines.append(c)
         return error_lines
 
     def calc_item_totals(self):
-        total = 0
-        for grant in self.cost_type_category_grants:
-            for line_item in grant.get_cost_line_items():
-                allocated_total = 0
-                for a in line_item.config.allocations.all():
-                    if a.allocation is not None:
-                        allocated_total += a.allocation
-
-                if allocated_total == 0:
-                    total += line_item.total_cost
-
-        return total
+        return self.analysis.allocation_summary.total_for(
+            self.cost_type_category_grants
+        ).unallocated_items_total
 
     def calc_item_costs(self):
-        cost = 0
-        for grant in self.cost_type_category_grants:
-            for line_item in grant.get_cost_line_items():
-                if line_item.config.allocations.count():
-                    allocation_percent = 0
-                    for a in line_item.config.allocations.all():
-                        if a.allocation is not None:
-                            allocation_percent += a.allocation
-
-                    allocation_percent *= Decimal(0.01)
-                    cost += line_item.total_cost * allocation_percent
-
-        return cost
+        return self.analysis.allocation_summary.total_for(self.cost_type_category_grants).assigned_items_cost
 
     def calc_all_errors_suggest(self):
-        if self.calc_item_totals() != 0:
-            allocation = self.calc_item_costs() / self.calc_item_totals()
+        summary = self.analysis.allocation_summary.total_for(self.cost_type_category_grants)
+        if summary.unallocated_items_total != 0:
+            allocation = summary.assigned_items_cost / summary.unallocated_items_total
             return f"{allocation:.2%}"
-
-    def _save_data(self, data):
-        for cost_line_item_id, intervention_allocations in data.items():
-            for intervention_instance_id, allocation in intervention_allocations.items():
-                cost_line_item: CostLineItem = self.analysis.cost_line_items.get(pk=cost_line_item_id)
-                cost_line_item.set_allocation_for_intervention(
-                    intervention_instance=InterventionInstance.objects.get(pk=intervention_instance_id),
-                    allocation=allocation,
-                )
@@ -0,0 +1,438 @@
+from bisect import bisect_left
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.translation import get_language
+from django.utils.translation import gettext as _
+
+from website.currency import currency_symbol, format_currency, get_currency_locale
+from website.models import AnalysisCostType, InterventionInstance
+from website.models.insight_comparison_series import chart_sort_key, insight_comparison_series
+from website.models.output_metric import OUTPUT_METRICS_BY_ID, OutputMetric
+
+
+class InsightsContextBuilder:
+    """
+    Builds the per intervention instance data behind the Insights page: output metric cards, bar charts,
+    comparison charts, cost breakdowns and parameter values.
+
+    Everything that only depends on the analysis is computed with a fixed number of grouped queries and
+    cached under `Analysis.data_version`, so repeat views and the print view reuse it until the analysis
+    is recalculated.  Comparison data is shared between analyses, so its chart points come from the
+    precomputed `insight_comparison_series` and only this analysis' own point is added per build.
+    """
+
+    def __init__(self, analysis):
+        self.analysis = analysis
+
+    @property
+    def cache_key(self) -> str:
+        return f"insights-context:{self.analysis.data_version}:{get_language()}"
+
+    def build(self) -> dict:
+        data = cache.get(self.cache_key)
+        if data is None:
+            data = self._build_analysis_data()
+            cache.set(self.cache_key, data, settings.INSIGHTS_CACHE_TIMEOUT)
+
+        comparison_series = self._get_comparison_series(data["output_metrics_by_intervention"])
+        instances_by_id = {ii.id: ii for ii in self.analysis.snapshot.intervention_instances}
+        output_metrics_by_intervention = {}
+        for intervention_instance_id, serialized_metrics in data["output_metrics_by_intervention"].items():
+            intervention_instance = instances_by_id[intervention_instance_id]
+            output_metrics_by_intervention[intervention_instance_id] = []
+            for serialized_metric in serialized_metrics:
+                output_metric = OUTPUT_METRICS_BY_ID[serialized_metric["output_metric_id"]]
+                output_metrics_by_intervention[intervention_instance_id].append(
+                    {
+                        **serialized_metric,
+                        "output_metric": output_metric,
+                        "insights_chart_data": self._get_insights_chart_data(
+                            output_metric,
+                            intervention_instance,
+                            comparison_series[intervention_instance.intervention_id, output_metric.id],
+                        ),
+                    }
+                )
+
+        return {
+            **data,
+            "output_metrics_by_intervention": output_metrics_by_intervention,
+        }
+
+    def _build_analysis_data(self) -> dict:
+        output_metrics_by_intervention = {}
+        for each_intervention_instance in self.analysis.snapshot.intervention_instances:
+            output_metrics_by_intervention[each_intervention_instance.id] = []
+            output_costs = self.analysis.output_costs.get(str(each_intervention_instance.id))
+            for output_metric in each_intervention_instance.intervention.output_metric_objects():
+                if not output_costs.get(output_metric.id):
+                    continue
+                output_cost_all = output_costs[output_metric.id]["all"]
+                output_cost_direct_only = output_costs[output_metric.id]["direct_only"]
+                output_cost_in_kind = 0
+
+                serialized_metric = {
+                    "output_metric_id": output_metric.id,
+                    "output_metric_slug": output_metric.get_slug(),
+                    "output_cost_all": output_cost_all,
+                    "output_cost_direct_only": output_cost_direct_only,
+                }
+                if self.analysis.in_kind_contributions:
+                    output_cost_in_kind = output_costs[output_metric.id]["in_kind"]
+                    serialized_metric.update({"output_cost_in_kind": output_cost_in_kind})
+
+                # Populate data for efficiency bar chart
+                bar_chart_data = self.get_bar_chart_data(
+                    output_cost_all,
+                    output_cost_direct_only,
+                    output_cost_in_kind,
+                )
+                serialized_metric.update(
+                    {
+                        "efficiency_bar_chart_data": bar_chart_data,
+                        "initial_card_label": bar_chart_data["total"]["label"],
+                    }
+                )
+                output_metrics_by_intervention[each_intervention_instance.id].append(serialized_metric)
+
+        breakdown_rows = self._get_cost_breakdown_rows()
+        return {
+            "output_metrics_by_intervention": output_metrics_by_intervention,
+            "cost_breakdown": {
+                each_intervention_instance.id: self._get_cost_breakdown_data(
+                    breakdown_rows[each_intervention_instance.id]
+                )
+                for each_intervention_instance in self.analysis.snapshot.intervention_instances
+            },
+            "parameters_lookup": self._get_formatted_parameter_values(),
+        }
+
+    def _get_formatted_parameter_values(self):
+        """
+        Here we consolidate the Parameters for all the Output Metrics for each Intervention Instance.
+
+        This originally lived in the template but graduated to here due to the growing complexity of the Output Metrics.
+
+        Specifically this was created to address the scenario where an Intervention has 2 Output
+            Metrics that share one or more parameters.
+
+        """
+        parameter_lookup = {}
+        for each_intervention_instance in self.analysis.snapshot.intervention_instances:
+            parameter_lookup[each_intervention_instance.id] = {}
+            for parameter_id, parameter_value in each_intervention_instance.parameters.items():
+                for output_metric in each_intervention_instance.intervention.output_metric_objects():
+                    # Filter to only show the parameters with labels in the current output metric
+                    if parameter_id not in output_metric.parameters:
+                        continue
+                    label = output_metric.parameters[parameter_id].label
+                    if label in [
+                        "Value of Cash Distributed",
+                        "Value of Business Grant Amount",
+                    ]:
+                        formatted_value = f"{currency_symbol(self.analysis)}{parameter_value:,.2f}"
+                    else:
+                        formatted_value = f"{parameter_value:,.2f}"
+                    parameter_lookup[each_intervention_instance.id][label] = formatted_value
+
+        return parameter_lookup
+
+    def _get_comparison_series(
+        self, output_metrics_by_intervention: dict
+    ) -> dict[tuple[int, str], list[dict]]:
+        instances_by_id = {ii.id: ii for ii in self.analysis.snapshot.intervention_instances}
+        return insight_comparison_series.get_many(
+            (
+                instances_by_id[intervention_instance_id].intervention_id,
+                OUTPUT_METRICS_BY_ID[metric["output_metric_id"]],
+            )
+            for intervention_instance_id, metrics in output_metrics_by_intervention.items()
+            for metric in metrics
+        )
+
+    def _get_insights_chart_data(
+        self,
+        output_metric: OutputMetric,
+        intervention_instance: InterventionInstance,
+        comparison_series: list[dict],
+    ) -> list[dict]:
+        if len(comparison_series) == 0:
+            return []
+        data = []
+        for comparison_point in comparison_series:
+            output_cost_all = comparison_point["raw_output_cost_all"]
+            output_cost_all = float(output_cost_all) if output_cost_all else 0
+            output_cost_direct_only = comparison_point["raw_output_cost_direct_only"]
+            output_cost_direct_only = float(output_cost_direct_only) if output_cost_direct_only else 0
+            data.append(
+                {
+                    "label": comparison_point["label"],
+                    "grants": comparison_point["grants"],
+                    "description": comparison_point["description"],
+                    "tooltip": comparison_point["tooltip"],
+                    "output_cost_all": output_cost_all or "N/A",
+                    "output_cost_direct_only": output_cost_direct_only or "N/A",
+                    "raw_output_cost_all": output_cost_all,
+                    "raw_output_cost_direct_only": output_cost_direct_only,
+                    "highlight": False,
+                }
+            )
+
+        if not self.analysis.currency_code or self.analysis.currency_code == settings.ISO_CURRENCY_CODE:
+            # This program is excluded from comparisons if the currency values don't match to avoid currency
+            # conversion confusion
+            if output_metric.output_as_currency:
+                formatted_total_output = format_currency(
+                    output_metric.total_output(**intervention_instance.parameters),
+                    settings.ISO_CURRENCY_CODE,
+                    locale=get_currency_locale(settings.ISO_CURRENCY_CODE),
+                )
+            else:
+                formatted_total_output = (
+                    f"{output_metric.total_output(**intervention_instance.parameters):,.2f}"
+                )
+
+            output_cost_all = self.analysis.output_costs[str(intervention_instance.id)][output_metric.id][
+                "all"
+            ]
+            output_cost_direct_only = self.analysis.output_costs[str(intervention_instance.id)][
+                output_metric.id
+            ]["direct_only"]
+            this_program = {
+                "label": _("This Program"),
+                "grants": ", ".join(self.analysis.snapshot.grants_list()),
+                "description": f"{output_metric.output_unit}: {formatted_total_output}",
+                "tooltip": self.analysis.title,
+                "output_cost_all": output_cost_all or "N/A",
+                "output_cost_direct_only": output_cost_direct_only or "N/A",
+                "raw_output_cost_all": output_cost_all,
+                "raw_output_cost_direct_only": output_cost_direct_only,
+                "highlight": True,
+            }
+            # The comparison series is already sorted, so this program goes ahead of any ties
+            data.insert(bisect_left(data, chart_sort_key(this_program), key=chart_sort_key), this_program)
+        return data
+
+    def _get_cost_breakdown_rows(self) -> dict[int, list[dict]]:
+        """Allocated cost per cost type and category, for every intervention instance in one query."""
+        rows = defaultdict(list)
+        query_result = (
+            self.analysis.cost_line_items.filter(
+                config__allocations__intervention_instance__isnull=False,
+            )
+            .values(
+                "config__allocations__intervention_instance",
+                "config__cost_type__name",
+                "config__category__name",
+                "config__analysis_cost_type",
+            )
+            .annotate(
+                allocated_cost_sum=Coalesce(
+                    Sum(F("total_cost") * (F("config__allocations__allocation") / Value(100))),
+                    Decimal(0),
+                )
+            )
+            .order_by()
+        )
+        for item in query_result:
+            rows[item["config__allocations__intervention_instance"]].append(item)
+        return rows
+
+    def _get_cost_breakdown_data(self, query_result: list[dict]):
+        data = []
+        for item in query_result:
+            if item["config__analysis_cost_type"] == AnalysisCostType.CLIENT_TIME:
+                # Skip Client Time they live on the Other Costs table
+                continue
+            elif item["config__analysis_cost_type"] == AnalysisCostType.IN_KIND:
+                # Skip In-Kind Contributions they live on the Other Costs table
+                continue
+            elif item["config__analysis_cost_type"] == AnalysisCostType.OTHER_HQ:
+                data.append(
+                    {
+                        "cost_type_name": item["config__cost_type__name"],
+                        "category_name": AnalysisCostType.get_pretty_analysis_cost_type(
+                            item["config__analysis_cost_type"]
+                        ),
+                        "amount": item["allocated_cost_sum"],
+                    }
+                )
+            else:
+                data.append(
+                    {
+                        "cost_type_name": item["config__cost_type__name"] or "Support",
+                        "category_name": item["config__category__name"] or "Other Supporting Costs",
+                        "amount": item["allocated_cost_sum"],
+                    }
+                )
+
+        # Sort by amount but we aren't done...
+        data.sort(key=lambda x: x["amount"], reverse=True)
+
+        total_cost = sum([d["amount"] for d in data])
+
+        for d in data:
+            if total_cost > 0:
+                d["percent_of_total"] = float((d["amount"] / total_cost) * 100)
+                d["percent_of_total_formatted"] = float(format(d["percent_of_total"], ".2f"))
+            else:
+                d["percent_of_total"] = 0
+                d["percent_of_total_formatted"] = 0
+
+        # ICR should never be in the top 5 for this pie chart so we'll remove it and
+        #   make sure it ends up in the All Other Costs section
+        icr_index = next(
+            (index for (index, d) in enumerate(data) if d["category_name"] == "ICR"),
+            None,
+        )
+        if icr_index is not None:
+            icr_data = [data.pop(icr_index)]
+        else:
+            icr_data = []
+
+        # Other Supporting Costs data should be lumped into the All Other Costs section
+        other_index = next(
+            (index for (index, d) in enumerate(data) if d["category_name"] == "Other Supporting Costs"),
+            None,
+        )
+        if other_index is not None:
+            other_supporting_data = [data.pop(other_index)]
+        else:
+            other_supporting_data = []
+
+        chart_data = []
+        for d in data[:5]:
+            if d["percent_of_total_formatted"] < 1:
+                d["percent_of_total_formatted"] = "< 1"
+            elif d["percent_of_total_formatted"] >= 1:
+                d["percent_of_total_formatted"] = round(d["percent_of_total_formatted"])
+
+            chart_data.append(
+                {
+                    "label": f'{d["category_name"]} ({d["cost_type_name"]}) {d["percent_of_total_formatted"]}%',
+                    "percent_of_total": float(format(d["percent_of_total"], ".2f")),
+                }
+            )
+
+        remaining_percent = sum(
+            map(
+                lambda d: d["percent_of_total"],
+                data[5:] + icr_data + other_supporting_data,
+            )
+        )
+        remaining_percent_formatted = float(format(remaining_percent, ".2f"))
+        if remaining_percent > 0:
+            chart_data.append(
+                {
+                    "label": f'{"All other costs"} {round(remaining_percent_formatted)}%',
+                    "percent_of_total": remaining_percent,
+                }
+            )
+
+        # Move ICR and Other Supporting Costs back to where they were.
+        data += icr_data
+        data += other_supporting_data
+        data.sort(key=lambda x: x["amount"], reverse=True)
+
+        return {
+            "total_cost": total_cost,
+            "costs_by_cost_type_category": data,
+            "chart_data": chart_data,
+        }
+
+    def get_bar_chart_data(
+        self,
+        output_cost_all,
+        output_cost_direct_only,
+        output_cost_in_kind=0,
+    ):
+        output_cost_total = output_cost_all
+        if self.analysis.in_kind_contributions:
+            output_cost_total += output_cost_in_kind
+
+        if output_cost_total:
+            direct_percent = round((output_cost_direct_only / output_cost_total) * 100, 2)
+            in_kind_percent = round((output_cost_in_kind / output_cost_total) * 100, 2)
+        else:
+            direct_percent = 0.0
+            in_kind_percent = 0.0
+
+        # So that the total is always exactly 100, even with rounding errors
+        all_percent = round(100 - direct_percent - in_kind_percent, 2)
+
+        currency_override = self.analysis.currency_code or settings.ISO_CURRENCY_CODE
+
+        # Get the individual bar values for each type of cost
+        formatted_direct_only = format_currency(
+            output_cost_direct_only,
+            currency_override,
+            locale=get_currency_locale(currency_override),
+        )
+        formatted_total = format_currency(
+            output_cost_all - output_cost_direct_only,
+            currency_override,
+            locale=get_currency_locale(currency_override),
+        )
+        if output_cost_in_kind:
+            formatted_in_kind = format_currency(
+                output_cost_in_kind,
+                currency_override,
+                locale=get_currency_locale(currency_override),
+            )
+        else:
+            formatted_in_kind = ""
+        # Get the aggregate values to be displayed on the Efficiency Card
+        # Program, Program + Support + Indirect,  Program + Support + Indirect + In-Kind
+        formatted_total_aggregate = format_currency(
+            output_cost_all,
+            currency_override,
+            locale=get_currency_locale(currency_override),
+        )
+        formatted_in_kind_aggregate = format_currency(
+            output_cost_all + output_cost_in_kind,
+            currency_override,
+            locale=get_currency_locale(currency_override),
+        )
+
+        # These key names are referenced within website/static/website/js/insights-charts.js
+        # Please do not change them unless you update that file as well
+
+        formatted_data = {
+            "direct": {
+                "aggregate": formatted_direct_only,
+                "value": formatted_direct_only,
+                "percent": direct_percent,
+                "label": _("Program Costs Only"),
+            },
+            "total": {
+                "aggregate": formatted_total_aggregate,
+                "value": formatted_total,
+                "percent": all_percent,
+                "label": _(
+                    f"""
+                    Including Program Costs ({formatted_direct_only}), Support Costs and Indirect Costs 
+                    ({formatted_total})
+                    """
+                ),
+            },
+        }
+        # We only include this on interventions when it has a value.
+        if formatted_in_kind:
+            formatted_data["in_kind"] = {
+                "aggregate": formatted_in_kind_aggregate,
+                "value": formatted_in_kind,
+                "percent": in_kind_percent,
+                "label": _(
+                    f"""
+                                Including Program Costs ({formatted_direct_only}), Support Costs and Indirect Costs 
+                                ({formatted_total}), In-Kind Contributions ({formatted_in_kind})
+                                """
+                ),
+            }
+
+        return formatted_data
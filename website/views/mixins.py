@@ -204,14 +204,16 @@ class AllocateMixin:
         return data, errors
 
     def _clear_fields_needing_help(self, errors):
-        for cost_line_item_id, intervention_allocation_error_messages in errors.items():
-            for (
-                intervention_id,
-                error_message,
-            ) in intervention_allocation_error_messages.items():
-                if error_message == "Not a number":
-                    c = CostLineItem.objects.get(id=cost_line_item_id)
-                    CostLineItemInterventionAllocation.objects.filter(cli_config=c.config).delete()
+        cost_line_item_ids = [
+            cost_line_item_id
+            for cost_line_item_id, intervention_allocation_error_messages in errors.items()
+            if "Not a number" in intervention_allocation_error_messages.values()
+        ]
+        if cost_line_item_ids:
+            CostLineItemInterventionAllocation.bulk_clear_allocations(self.analysis, cost_line_item_ids)
+
+    def _save_data(self, data):
+        CostLineItemInterventionAllocation.bulk_set_allocations(self.analysis, data)
 
 
 class PostActionHandlerMixin:
@@ -306,15 +306,16 @@ class SubcomponentsAllocatebyCostTypeGrant(
         return redirect(self.request.path + query)
 
     def _save_data(self, data):
-        for cost_line_item_id, allocation in data.items():
-            cost_line_item = self.analysis.cost_line_items.get(pk=cost_line_item_id)
-            if allocation.get("skipped"):
-                cost_line_item.config.subcomponent_analysis_allocations_skipped = True
-                cost_line_item.config.subcomponent_analysis_allocations = {}
-            else:
-                cost_line_item.config.subcomponent_analysis_allocations_skipped = False
-                cost_line_item.config.subcomponent_analysis_allocations = allocation["allocations"]
-            cost_line_item.config.save()
+        with self.analysis.changes_marked_once():
+            for cost_line_item_id, allocation in data.items():
+                cost_line_item = self.analysis.cost_line_items.get(pk=cost_line_item_id)
+                if allocation.get("skipped"):
+                    cost_line_item.config.subcomponent_analysis_allocations_skipped = True
+                    cost_line_item.config.subcomponent_analysis_allocations = {}
+                else:
+                    cost_line_item.config.subcomponent_analysis_allocations_skipped = False
+                    cost_line_item.config.subcomponent_analysis_allocations = allocation["allocations"]
+                cost_line_item.config.save()
 
 
 class SubcomponentsAllocateBulk(
@@ -43,7 +43,7 @@ class Allocate(MultiStep):
 
         # We must include a final step if any Special Country Cost Line Items exist on the Analysis
         unique_grant_codes = sorted(
-            {item.grant_code for item in self.analysis.special_country_cost_line_items}
+            {item.grant_code for item in self.analysis.snapshot.special_country_cost_line_items}
         )
         unique_grant_codes.sort()
         for grant_code in unique_grant_codes:
@@ -79,3 +79,4 @@ class Allocate(MultiStep):
         allocations = CostLineItemInterventionAllocation.objects.filter(cli_config__in=cost_line_item_configs)
 
         allocations.delete()
+        self.analysis.refresh_snapshot()
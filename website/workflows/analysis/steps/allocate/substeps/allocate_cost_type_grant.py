@@ -6,7 +6,6 @@ from django.urls import reverse
 from django.utils.functional import cached_property
 
 from website.models import CostType
-from website.models.query_utils import require_prefetch
 from website.workflows._steps_base import SubStep
 from website.workflows._workflow_base import Workflow
 
@@ -49,45 +48,31 @@ class AllocateCostTypeGrant(SubStep):
          are allocations for those interventions on each cost line item.
         """
 
-        cost_type_categories = require_prefetch(self.analysis, "cost_type_categories")
-        cost_type_categories = [c for c in cost_type_categories if c.cost_type_id == self.cost_type.id]
-        cost_line_items = self.analysis.cost_line_items.prefetch_related(
-            "config",
-            "config__allocations",
-        ).all()
-        intervention_instances = require_prefetch(self.analysis, "interventioninstance_set")
+        snapshot = self.analysis.snapshot
+        cost_type_categories = [
+            c for c in snapshot.cost_type_categories if c.cost_type_id == self.cost_type.id
+        ]
 
         for each_ctc in cost_type_categories:
-            items = []
-
-            for cli in cost_line_items:
-                if (
-                    cli.grant_code == self.grant
-                    and cli.config.category_id == each_ctc.category_id
-                    and cli.config.cost_type_id == self.cost_type.id
-                ):
-
-                    items.append(cli)
-
+            items = snapshot.cost_line_items_for_category(self.cost_type.id, each_ctc.category_id, self.grant)
             if not items:
                 continue
 
             # For every intervention make sure at least one allocation is non-null
-            for each_intervention_instance in intervention_instances:
+            for each_intervention_instance in snapshot.intervention_instances:
                 ok = False
                 for cli in items:
-                    allocs = require_prefetch(cli.config, "allocations")
-                    for a in allocs:
-                        if a.intervention_instance_id == each_intervention_instance.id:
-                            if a.allocation is None:
-                                return False
-                            ok = True
+                    a = snapshot.allocations_for(cli).get(each_intervention_instance.id)
+                    if a is not None:
+                        if a.allocation is None:
+                            return False
+                        ok = True
                 if not ok:
                     return False
         return True
 
     def get_nav_title(self) -> str:
-        if len(self.analysis.grants_list()) > 1:
+        if len(self.analysis.snapshot.grants_list()) > 1:
             return f"{self.cost_type.name}: {self.grant}"
         return self.cost_type.name
 
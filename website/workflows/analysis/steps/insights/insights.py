@@ -2,7 +2,6 @@ from django.urls import reverse
 from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _l
 
-from website.models.query_utils import require_prefetch
 from website.workflows._steps_base import Step
 
 
@@ -43,7 +42,7 @@ class Insights(Step):
         if not self.analysis.output_costs:
             return False
 
-        inst_lookup = {ii.id: ii for ii in require_prefetch(self.analysis, "interventioninstance_set")}
+        inst_lookup = {ii.id: ii for ii in self.analysis.snapshot.intervention_instances}
 
         for each_intervention_instance_key, output_cost_metrics in self.analysis.output_costs.items():
             intervention_instance = inst_lookup.get(int(each_intervention_instance_key))
@@ -49,6 +49,8 @@ class LoadData(Step):
             self.analysis.create_cost_line_items_from_transactions(result["imported_transactions"])
             self.analysis.auto_categorize_cost_line_items()
             self.analysis.ensure_cost_type_category_objects()
+            # Cost line items are created with `betterdb`, which doesn't mark the analysis changed
+            self.analysis.touch()
         return succeeded, result
 
     @betterdb.transaction()
@@ -61,6 +63,8 @@ class LoadData(Step):
             self.analysis.sync_cost_line_items(result["imported_transactions"])
             self.analysis.auto_categorize_cost_line_items()
             self.analysis.ensure_cost_type_category_objects()
+            # Cost line items are created with `betterdb`, which doesn't mark the analysis changed
+            self.analysis.touch()
         return succeeded, result
 
     @betterdb.transaction()
@@ -69,6 +73,8 @@ class LoadData(Step):
         if succeeded:
             self.analysis.auto_categorize_cost_line_items()
             self.analysis.ensure_cost_type_category_objects()
+            # Cost line items are created with `betterdb`, which doesn't mark the analysis changed
+            self.analysis.touch()
         return succeeded, result
 
     @stopwatch.trace()
@@ -47,7 +47,7 @@ class SubcomponentsAllocate(MultiStep):
 
         # We must include a final step if any Special Country Cost Line Items exist on the Analysis
         unique_grant_codes = sorted(
-            {item.grant_code for item in self.analysis.special_country_cost_line_items}
+            {item.grant_code for item in self.analysis.snapshot.special_country_cost_line_items}
         )
         unique_grant_codes.sort()
         for grant_code in unique_grant_codes:
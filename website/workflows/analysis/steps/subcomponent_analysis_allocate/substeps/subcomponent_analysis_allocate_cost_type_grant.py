@@ -68,7 +68,7 @@ class SubcomponentsAllocateCostTypeGrant(SubStep):
         )
 
     def get_nav_title(self) -> str:
-        if len(self.analysis.grants_list()) > 1:
+        if len(self.analysis.snapshot.grants_list()) > 1:
             return f"{self.cost_type.name}: {self.grant}"
         return self.cost_type.name
 